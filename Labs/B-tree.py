@@ -1,12 +1,20 @@
 #B-Trees
 # The degree 't' is a crucial parameter for the B-Tree structure.
 # A node must have between t-1 and 2t-1 keys.
+# Each BTree object has its own degree; T_VALUE is only the default.
+# Large degrees (t = 64..1024) keep the tree shallow, and keys inside a
+# node are located with binary search (bisect) instead of a linear scan.
+from bisect import bisect_left, bisect_right
+
+from ordered import MISSING, OrderedMixin, sort_batch, unique_sorted
+
 T_VALUE = 2
 
 # --- BTree Node Structure (Represented as a Dictionary) ---
 # A node is a dictionary with the following keys:
 # 't': The minimum degree (order/2)
 # 'keys': List of keys in the node
+# 'values': List of values, one per key (values[i] belongs to keys[i])
 # 'children': List of child nodes (dictionaries)
 # 'leaf': Boolean indicating if the node is a leaf
 
@@ -15,319 +23,938 @@ def create_b_tree_node(t, is_leaf=False):
     return {
         't': t,
         'keys': [],
+        'values': [],
         'children': [],
         'leaf': is_leaf
     }
 
-# --- BTree Structure (Represented by the root node and T_VALUE) ---
-# The B-Tree itself is managed by the root node and the global T_VALUE.
-
-# Initialize the BTree (Root is a leaf)
-B_TREE_ROOT = create_b_tree_node(T_VALUE, is_leaf=True)
+# A B+ tree leaf also links to its neighbours in key order
+# 'prev': The leaf holding the next smaller keys (None for the first)
+# 'next': The leaf holding the next larger keys (None for the last)
+def create_bplus_leaf(t):
+    node = create_b_tree_node(t, is_leaf=True)
+    node['prev'] = None
+    node['next'] = None
+    return node
 
 # ----------------------------------------------------------------------
-# ---- SEARCH FUNCTION ----
+# ---- BULK LOAD ----
 # ----------------------------------------------------------------------
-def search(key, node=None):
-    if node is None:
-        node = B_TREE_ROOT
-
-    i = 0
-    # Find the first key greater than or equal to 'key'
-    while i < len(node['keys']) and key > node['keys'][i]:
-        i += 1
 
-    # Check if key is found at the current index
-    if i < len(node['keys']) and node['keys'][i] == key:
-        return True
-
-    # If it's a leaf, key is not in the tree
-    if node['leaf']:
-        return False
-
-    # Recurse into the appropriate child
-    return search(key, node['children'][i])
-
-# ----------------------------------------------------------------------
-# ---- INSERT HELPERS ----
-# ----------------------------------------------------------------------
-def split_child(parent, index, child):
-    t = T_VALUE
-    # Create a new sibling node
-    new_child = create_b_tree_node(t, child['leaf'])
-
-    # Move the median key from 'child' to 'parent'
-    parent['keys'].insert(index, child['keys'][t - 1])
-
-    # Insert the new child node into the parent's children list
-    parent['children'].insert(index + 1, new_child)
-
-    # Move keys from the right half of 'child' to 'new_child'
-    new_child['keys'] = child['keys'][t:]
-
-    # Keep only the left half of the keys in 'child'
-    child['keys'] = child['keys'][:t - 1]
-
-    # If not a leaf, move children pointers as well
-    if not child['leaf']:
-        new_child['children'] = child['children'][t:]
-        child['children'] = child['children'][:t]
-
-def insert_non_full(node, key):
-    t = T_VALUE
-    i = len(node['keys']) - 1
-
-    if node['leaf']:
-        # Insert key into leaf node
-        node['keys'].append(None)
-        while i >= 0 and key < node['keys'][i]:
-            node['keys'][i + 1] = node['keys'][i]
-            i -= 1
-        node['keys'][i + 1] = key
-    else:
-        # Find the appropriate child to descend into
-        while i >= 0 and key < node['keys'][i]:
-            i -= 1
-        i += 1 # i is the index of the child to descend into
-
-        # Check if the child is full, and split if necessary
-        if len(node['children'][i]['keys']) == (2 * t) - 1:
-            split_child(node, i, node['children'][i])
-
-            # After split, key might belong to the new sibling (index i+1)
-            if key > node['keys'][i]:
-                i += 1
-
-        # Recurse into the appropriate child
-        insert_non_full(node['children'][i], key)
-
-# ----------------------------------------------------------------------
-# ---- INSERT FUNCTION ----
-# ----------------------------------------------------------------------
-def insert(key):
-    global B_TREE_ROOT
-    root = B_TREE_ROOT
-    t = T_VALUE
-
-    if len(root['keys']) == (2 * t) - 1:
-        # Root is full, create a new root
-        new_root = create_b_tree_node(t, is_leaf=False)
-        new_root['children'].insert(0, root)
-
-        # Split the old root and make the new root the parent
-        split_child(new_root, 0, root)
-
-        # Update the global root pointer
-        B_TREE_ROOT = new_root
-
-        # Insert the key into the new (non-full) root
-        insert_non_full(new_root, key)
-    else:
-        insert_non_full(root, key)
+# Number of nodes to use for 'count' items when each node should hold about
+# 'per_node' of them, but never fewer than 't' (the minimum fill)
+def _node_count(count, per_node, t):
+    nodes = -(-count // per_node)  # ceil
+    return max(1, min(nodes, count // t))
+
+# Split 'count' items as evenly as possible into 'parts' groups
+def _even_sizes(count, parts):
+    base, extra = divmod(count, parts)
+    return [base + 1 if i < extra else base for i in range(parts)]
+
+# Build a B-Tree bottom-up from keys in ascending order, in a single pass.
+# Leaves are packed to 'fill_factor' of their capacity (2t-1 keys), clamped
+# so that every non-root node still has at least t-1 keys. Each internal
+# level is then built from the level below, with one separator key between
+# every pair of neighbouring children. 'values', if given, line up with
+# 'keys'; a repeated key keeps its last value, like insert().
+def build_from_sorted(keys, t=T_VALUE, fill_factor=1.0, values=None):
+    if not 0 < fill_factor <= 1:
+        raise ValueError("fill_factor must be in (0, 1]")
+    keys, values = unique_sorted(keys, values)
+    per_node = min(2 * t - 1, max(t - 1, 1, round(fill_factor * (2 * t - 1))))
+
+    # Leaf level: n keys -> L leaves plus L-1 separators for the level above
+    n = len(keys)
+    leaf_count = _node_count(n + 1, per_node + 1, t)
+    level = []
+    separators = []
+    pos = 0
+    for size in _even_sizes(n - (leaf_count - 1), leaf_count):
+        if level:
+            separators.append((keys[pos], values[pos]))
+            pos += 1
+        leaf = create_b_tree_node(t, is_leaf=True)
+        leaf['keys'] = keys[pos:pos + size]
+        leaf['values'] = values[pos:pos + size]
+        pos += size
+        level.append(leaf)
+
+    # Internal levels: C children -> P parents, promoting P-1 separators
+    while len(level) > 1:
+        parent_count = _node_count(len(level), per_node + 1, t)
+        parents = []
+        promoted = []
+        pos = 0
+        for size in _even_sizes(len(level), parent_count):
+            if parents:
+                promoted.append(separators[pos - 1])
+            parent = create_b_tree_node(t, is_leaf=False)
+            parent['children'] = level[pos:pos + size]
+            inner = separators[pos:pos + size - 1]
+            parent['keys'] = [key for key, _ in inner]
+            parent['values'] = [value for _, value in inner]
+            pos += size
+            parents.append(parent)
+        level, separators = parents, promoted
+
+    return level[0]
+
+# The same for a B+ tree (see BPlusTree): every key goes into a leaf, the
+# leaves are chained, and each internal node holds one separator per child
+# after the first, the smallest key under that child
+def build_bplus_from_sorted(keys, t=T_VALUE, fill_factor=1.0, values=None):
+    if not 0 < fill_factor <= 1:
+        raise ValueError("fill_factor must be in (0, 1]")
+    keys, values = unique_sorted(keys, values)
+    per_node = min(2 * t - 1, max(t - 1, 1, round(fill_factor * (2 * t - 1))))
+
+    level = []
+    pos = 0
+    for size in _even_sizes(len(keys), _node_count(len(keys), per_node, t)):
+        leaf = create_bplus_leaf(t)
+        leaf['keys'] = keys[pos:pos + size]
+        leaf['values'] = values[pos:pos + size]
+        if level:
+            level[-1]['next'] = leaf
+            leaf['prev'] = level[-1]
+        pos += size
+        level.append(leaf)
+    lows = [leaf['keys'][0] if leaf['keys'] else None for leaf in level]
+
+    while len(level) > 1:
+        parents = []
+        parent_lows = []
+        pos = 0
+        for size in _even_sizes(len(level), _node_count(len(level), per_node + 1, t)):
+            parent = create_b_tree_node(t, is_leaf=False)
+            parent['children'] = level[pos:pos + size]
+            parent['keys'] = lows[pos + 1:pos + size]
+            parent_lows.append(lows[pos])
+            pos += size
+            parents.append(parent)
+        level, lows = parents, parent_lows
+
+    return level[0]
+
+
+# --- BTree Structure (Represented by the root node and its degree) ---
+class BTree(OrderedMixin):
+    # Inserts into a wide node are cheap (a bisect and a list insert), so
+    # a rebuild only pays off once the batch is about half the tree
+    rebuild_fraction = 0.5
+
+    def __init__(self, t=T_VALUE):
+        if t < 2:
+            raise ValueError("the minimum degree t must be at least 2")
+        self.t = t
+        # Initialize the BTree (Root is a leaf)
+        self.root = self._new_node(is_leaf=True)
+        # Number of keys in the tree
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return self.search(key)
+
+    # Build a tree from keys in ascending order (see build_from_sorted)
+    @classmethod
+    def from_sorted(cls, keys, values=None, *, t=T_VALUE, fill_factor=1.0):
+        tree = cls(t)
+        tree._load_sorted(keys, values, fill_factor)
+        return tree
+
+    # Build a tree from keys in any order
+    @classmethod
+    def bulk_load(cls, keys, values=None, *, t=T_VALUE, fill_factor=1.0):
+        return cls.from_sorted(*sort_batch(keys, values), t=t, fill_factor=fill_factor)
+
+    # Replace the contents with a tree built bottom-up from sorted keys
+    def _load_sorted(self, keys, values, fill_factor=1.0):
+        self.root = build_from_sorted(keys, self.t, fill_factor, values)
+        self.size = self.count_keys(self.root)
+
+    def _snapshot_meta(self):
+        return {"t": self.t}
+
+    def count_keys(self, node):
+        if node['leaf']:
+            return len(node['keys'])
+        return len(node['keys']) + sum(self.count_keys(child) for child in node['children'])
+
+    # Storage hooks: every node is made by _new_node() and handed to _free()
+    # once the tree drops it. Here nodes are plain dictionaries; DiskBTree
+    # (disk_btree.py) keeps them in pages of a memory-mapped file instead.
+    def _new_node(self, is_leaf):
+        return create_b_tree_node(self.t, is_leaf)
+
+    def _free(self, node):
+        pass
+
+    # ----------------------------------------------------------------------
+    # ---- SEARCH FUNCTION ----
+    # ----------------------------------------------------------------------
+    def search(self, key):
+        return self.find(key) is not None
+
+    # Return (node, index) for the slot holding 'key', or None
+    def find(self, key):
+        node = self.root
+        while True:
+            keys = node['keys']
+            # Find the first key greater than or equal to 'key'
+            i = bisect_left(keys, key)
+
+            # Check if key is found at the current index
+            if i < len(keys) and keys[i] == key:
+                return node, i
+
+            # If it's a leaf, key is not in the tree
+            if node['leaf']:
+                return None
+
+            # Descend into the appropriate child
+            node = node['children'][i]
+
+    def get(self, key, default=None):
+        found = self.find(key)
+        if found is None:
+            return default
+        node, i = found
+        return node['values'][i]
+
+    # Look up many keys in one walk: the batch is sorted and handed down the
+    # tree, each node splitting its slice between its children, so every
+    # node shared by several keys is visited once per batch
+    def _lookup_many(self, keys):
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        batch = [keys[i] for i in order]
+        found = [MISSING] * len(batch)
+        stack = [(self.root, 0, len(batch))]
+        while stack:
+            node, lo, hi = stack.pop()
+            node_keys = node['keys']
+            start = lo
+            while start < hi:
+                i = bisect_left(node_keys, batch[start])
+                # Batch keys up to node_keys[i] share position i: the ones
+                # equal to it are found here, the smaller ones go to child i
+                if i < len(node_keys):
+                    end = bisect_right(batch, node_keys[i], start, hi)
+                    below = bisect_left(batch, node_keys[i], start, end)
+                    for j in range(below, end):
+                        found[order[j]] = node['values'][i]
+                else:
+                    end = below = hi
+                if start < below and not node['leaf']:
+                    stack.append((node['children'][i], start, below))
+                start = end
+        return found
+
+    # ----------------------------------------------------------------------
+    # ---- INSERT HELPERS ----
+    # ----------------------------------------------------------------------
+    def split_child(self, parent, index, child):
+        t = self.t
+        # Create a new sibling node
+        new_child = self._new_node(child['leaf'])
+
+        # Move the median key (and its value) from 'child' to 'parent'
+        parent['keys'].insert(index, child['keys'][t - 1])
+        parent['values'].insert(index, child['values'][t - 1])
+
+        # Insert the new child node into the parent's children list
+        parent['children'].insert(index + 1, new_child)
+
+        # Move keys from the right half of 'child' to 'new_child'
+        new_child['keys'] = child['keys'][t:]
+        new_child['values'] = child['values'][t:]
+
+        # Keep only the left half of the keys in 'child'
+        del child['keys'][t - 1:]
+        del child['values'][t - 1:]
+
+        # If not a leaf, move children pointers as well
+        if not child['leaf']:
+            new_child['children'] = child['children'][t:]
+            del child['children'][t:]
+
+    # Returns True if the key was added, False if an existing key got the new value
+    def insert_non_full(self, node, key, value=None):
+        full = 2 * self.t - 1
+        while True:
+            keys = node['keys']
+            i = bisect_left(keys, key)
+
+            # The key is already here: replace its value in place
+            if i < len(keys) and keys[i] == key:
+                node['values'][i] = value
+                return False
+
+            if node['leaf']:
+                # Insert key into leaf node
+                keys.insert(i, key)
+                node['values'].insert(i, value)
+                return True
+
+            # Check if the child is full, and split if necessary
+            if len(node['children'][i]['keys']) == full:
+                self.split_child(node, i, node['children'][i])
+
+                # After split, key might belong to the new sibling (index i+1)
+                # or be the median that just moved up
+                if key > keys[i]:
+                    i += 1
+                elif key == keys[i]:
+                    node['values'][i] = value
+                    return False
+
+            # Descend into the appropriate child
+            node = node['children'][i]
+
+    # ----------------------------------------------------------------------
+    # ---- INSERT FUNCTION ----
+    # ----------------------------------------------------------------------
+    def insert(self, key, value=None):
+        root = self.root
+        t = self.t
+
+        if len(root['keys']) == (2 * t) - 1:
+            # Root is full, create a new root
+            new_root = self._new_node(is_leaf=False)
+            new_root['children'].insert(0, root)
+
+            # Split the old root and make the new root the parent
+            self.split_child(new_root, 0, root)
+
+            # Update the root pointer
+            self.root = new_root
+            root = new_root
+
+        # Insert the key into the (non-full) root
+        added = self.insert_non_full(root, key, value)
+        if added:
+            self.size += 1
+        return added
+
+    # ----------------------------------------------------------------------
+    # ---- DELETE HELPERS ----
+    # ----------------------------------------------------------------------
+
+    # Helper to find the predecessor key and its value
+    def get_pred(self, node, idx):
+        cur = node['children'][idx]
+        while not cur['leaf']:
+            cur = cur['children'][-1]
+        return cur['keys'][-1], cur['values'][-1]
+
+    # Helper to find the successor key and its value
+    def get_succ(self, node, idx):
+        cur = node['children'][idx + 1]
+        while not cur['leaf']:
+            cur = cur['children'][0]
+        return cur['keys'][0], cur['values'][0]
+
+    # Helper to merge a child with its next sibling
+    def merge(self, node, idx):
+        child = node['children'][idx]
+        sibling = node['children'][idx + 1]
+
+        # Move the key from the parent to the end of the child's keys
+        child['keys'].append(node['keys'].pop(idx))
+        child['values'].append(node['values'].pop(idx))
+
+        # Move all keys from the sibling to the child
+        child['keys'].extend(sibling['keys'])
+        child['values'].extend(sibling['values'])
+
+        # Move all children from the sibling to the child
+        if not child['leaf']:
+            child['children'].extend(sibling['children'])
+
+        # Remove the sibling from the parent's children list
+        node['children'].pop(idx + 1)
+        self._free(sibling)
+
+    # Helper to borrow a key from the previous sibling
+    def borrow_prev(self, node, idx):
+        child = node['children'][idx]
+        sibling = node['children'][idx - 1]
+
+        # Move key from parent to the start of child's keys
+        child['keys'].insert(0, node['keys'][idx - 1])
+        child['values'].insert(0, node['values'][idx - 1])
+
+        # Move key from end of sibling to parent
+        node['keys'][idx - 1] = sibling['keys'].pop()
+        node['values'][idx - 1] = sibling['values'].pop()
+
+        # If not a leaf, move the last child pointer from sibling to child
+        if not child['leaf']:
+            child['children'].insert(0, sibling['children'].pop())
+
+    # Helper to borrow a key from the next sibling
+    def borrow_next(self, node, idx):
+        child = node['children'][idx]
+        sibling = node['children'][idx + 1]
+
+        # Move key from parent to the end of child's keys
+        child['keys'].append(node['keys'][idx])
+        child['values'].append(node['values'][idx])
+
+        # Move key from start of sibling to parent
+        node['keys'][idx] = sibling['keys'].pop(0)
+        node['values'][idx] = sibling['values'].pop(0)
+
+        # If not a leaf, move the first child pointer from sibling to child
+        if not child['leaf']:
+            child['children'].append(sibling['children'].pop(0))
+
+    # Helper to ensure the child node at index 'idx' has at least 't' keys
+    def fill(self, node, idx):
+        t = self.t
+
+        # Case 1: Borrow from previous sibling (if it has enough keys)
+        if idx != 0 and len(node['children'][idx - 1]['keys']) >= t:
+            self.borrow_prev(node, idx)
+        # Case 2: Borrow from next sibling (if it has enough keys)
+        elif idx != len(node['children']) - 1 and len(node['children'][idx + 1]['keys']) >= t:
+            self.borrow_next(node, idx)
+        # Case 3: Merge with a sibling
+        else:
+            if idx != len(node['children']) - 1:
+                # Merge with next sibling
+                self.merge(node, idx)
+            else:
+                # Merge with previous sibling
+                self.merge(node, idx - 1)
+
+    # ----------------------------------------------------------------------
+    # ---- DELETE CORE FUNCTION ----
+    # ----------------------------------------------------------------------
+    # Returns True if the key was found and removed
+    def _delete(self, node, key):
+        t = self.t
+
+        # One binary search gives both "is it here?" and the child index
+        idx = bisect_left(node['keys'], key)
+
+        if idx < len(node['keys']) and node['keys'][idx] == key:
+            if node['leaf']:
+                # Case 1: Key is in a leaf node
+                node['keys'].pop(idx)
+                node['values'].pop(idx)
+                return True
+            else:
+                # Case 2: Key is in an internal node
+
+                # Case 2a: Left child has at least 't' keys
+                if len(node['children'][idx]['keys']) >= t:
+                    pred, pred_value = self.get_pred(node, idx)
+                    node['keys'][idx] = pred
+                    node['values'][idx] = pred_value
+                    return self._delete(node['children'][idx], pred)
+                # Case 2b: Right child has at least 't' keys
+                elif len(node['children'][idx + 1]['keys']) >= t:
+                    succ, succ_value = self.get_succ(node, idx)
+                    node['keys'][idx] = succ
+                    node['values'][idx] = succ_value
+                    return self._delete(node['children'][idx + 1], succ)
+                # Case 2c: Both children have t-1 keys
+                else:
+                    self.merge(node, idx)
+                    return self._delete(node['children'][idx], key)
+        else:
+            if node['leaf']:
+                # Key not found
+                return False
+
+            # 'idx' is already the child index to descend into
+            child_to_descend = node['children'][idx]
+
+            # Case 3: Ensure child has at least 't' keys before descending
+            if len(child_to_descend['keys']) < t:
+                self.fill(node, idx)
+
+            # After fill(), the structure might have changed (e.g., merge)
+            # We need to determine the correct child to descend into *after* fill.
+
+            # If fill resulted in a merge with the right sibling, the key might now be in a merged node
+            if idx > len(node['keys']): # This means a merge happened and the original child index 'idx' is now gone
+                return self._delete(node['children'][idx - 1], key)
+            # If the key is now greater than the parent key at idx (due to borrow/merge), go right
+            elif idx < len(node['keys']) and key > node['keys'][idx]:
+                return self._delete(node['children'][idx + 1], key)
+            else:
+                # Otherwise, descend into the (potentially modified) child at index 'idx'
+                return self._delete(node['children'][idx], key)
+
+    # ----------------------------------------------------------------------
+    # ---- DELETE FUNCTION (Public Interface) ----
+    # ----------------------------------------------------------------------
+    # Returns True if the key was found and removed
+    def delete(self, key):
+        removed = self._delete(self.root, key)
+        if removed:
+            self.size -= 1
+
+        # If root becomes empty and is not a leaf, its first child becomes the new root
+        if len(self.root['keys']) == 0 and not self.root['leaf']:
+            old_root = self.root
+            self.root = old_root['children'][0]
+            self._free(old_root)
+        return removed
+
+    # ----------------------------------------------------------------------
+    # ---- ORDERED ACCESS ----
+    # ----------------------------------------------------------------------
+    def cursor(self, items=False):
+        return Cursor(self, items)
+
+    # ----------------------------------------------------------------------
+    # ---- DISPLAY FUNCTIONS ----
+    # ----------------------------------------------------------------------
+    def display_node(self, node, level=0):
+        print("Level", level, "Keys:", list(node['keys']))
+        for child in node['children']:
+            self.display_node(child, level + 1)
+
+    def display(self):
+        print("\nB-Tree Structure:")
+        self.display_node(self.root)
+        print()
 
 # ----------------------------------------------------------------------
-# ---- DELETE HELPERS ----
+# ---- CURSOR ----
 # ----------------------------------------------------------------------
-
-# Helper to find the predecessor key
-def get_pred(node, idx):
-    cur = node['children'][idx]
-    while not cur['leaf']:
-        cur = cur['children'][-1]
-    return cur['keys'][-1]
-
-# Helper to find the successor key
-def get_succ(node, idx):
-    cur = node['children'][idx + 1]
-    while not cur['leaf']:
-        cur = cur['children'][0]
-    return cur['keys'][0]
-
-# Helper to merge a child with its next sibling
-def merge(node, idx):
-    child = node['children'][idx]
-    sibling = node['children'][idx + 1]
-
-    # Move the key from the parent to the end of the child's keys
-    child['keys'].append(node['keys'].pop(idx))
-
-    # Move all keys from the sibling to the child
-    child['keys'].extend(sibling['keys'])
-
-    # Move all children from the sibling to the child
-    if not child['leaf']:
-        child['children'].extend(sibling['children'])
-
-    # Remove the sibling from the parent's children list
-    node['children'].pop(idx + 1)
-
-# Helper to borrow a key from the previous sibling
-def borrow_prev(node, idx):
-    child = node['children'][idx]
-    sibling = node['children'][idx - 1]
-
-    # Move key from parent to the start of child's keys
-    child['keys'].insert(0, node['keys'][idx - 1])
-
-    # Move key from end of sibling to parent
-    node['keys'][idx - 1] = sibling['keys'].pop()
-
-    # If not a leaf, move the last child pointer from sibling to child
-    if not child['leaf']:
-        child['children'].insert(0, sibling['children'].pop())
-
-# Helper to borrow a key from the next sibling
-def borrow_next(node, idx):
-    child = node['children'][idx]
-    sibling = node['children'][idx + 1]
-
-    # Move key from parent to the end of child's keys
-    child['keys'].append(node['keys'][idx])
-
-    # Move key from start of sibling to parent
-    node['keys'][idx] = sibling['keys'].pop(0)
-
-    # If not a leaf, move the first child pointer from sibling to child
-    if not child['leaf']:
-        child['children'].append(sibling['children'].pop(0))
-
-# Helper to ensure the child node at index 'idx' has at least 't' keys
-def fill(node, idx):
-    t = T_VALUE
-
-    # Case 1: Borrow from previous sibling (if it has enough keys)
-    if idx != 0 and len(node['children'][idx - 1]['keys']) >= t:
-        borrow_prev(node, idx)
-    # Case 2: Borrow from next sibling (if it has enough keys)
-    elif idx != len(node['children']) - 1 and len(node['children'][idx + 1]['keys']) >= t:
-        borrow_next(node, idx)
-    # Case 3: Merge with a sibling
-    else:
-        if idx != len(node['children']) - 1:
-            # Merge with next sibling
-            merge(node, idx)
+# The cursor keeps the path from the root as [node, i] pairs. For the last
+# pair, node['keys'][i] is the next key; for every pair above it, i is the
+# child we went down into, which is the same gap between keys[i-1] and
+# keys[i]. An empty path means "at the end".
+class Cursor:
+    def __init__(self, tree, items=False):
+        self.tree = tree
+        self.items = items
+        self.seek_first()
+
+    def _entry(self, node, i):
+        return (node['keys'][i], node['values'][i]) if self.items else node['keys'][i]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+
+    def seek_first(self):
+        self.path = []
+        node = self.tree.root
+        while True:
+            self.path.append([node, 0])
+            if node['leaf']:
+                break
+            node = node['children'][0]
+        if not node['keys']:
+            self.path = []  # empty tree
+
+    def seek_end(self):
+        self.path = []
+
+    # Move before the first key >= key: the deepest pair on the search
+    # path that still has a key to its right
+    def seek(self, key):
+        self.path = []
+        keep = 0
+        node = self.tree.root
+        while True:
+            i = bisect_left(node['keys'], key)
+            self.path.append([node, i])
+            if i < len(node['keys']):
+                keep = len(self.path)
+            if node['leaf']:
+                break
+            node = node['children'][i]
+        del self.path[keep:]
+
+    def next(self):
+        path = self.path
+        if not path:
+            raise StopIteration
+        node, i = path[-1]
+        entry = self._entry(node, i)
+        if not node['leaf']:
+            # Successor is the first key of the leftmost leaf under children[i+1]
+            path[-1][1] = i + 1
+            node = node['children'][i + 1]
+            while True:
+                path.append([node, 0])
+                if node['leaf']:
+                    break
+                node = node['children'][0]
+        elif i + 1 < len(node['keys']):
+            path[-1][1] = i + 1
         else:
-            # Merge with previous sibling
-            merge(node, idx - 1)
+            # Leaf used up: climb to the first ancestor with a key to the right
+            path.pop()
+            while path and path[-1][1] == len(path[-1][0]['keys']):
+                path.pop()
+        return entry
+
+    def prev(self):
+        path = self.path
+        if not path:
+            # From the end: the predecessor is the largest key
+            node = self.tree.root
+            if not node['keys']:
+                raise StopIteration
+            while not node['leaf']:
+                path.append([node, len(node['keys'])])
+                node = node['children'][-1]
+            path.append([node, len(node['keys']) - 1])
+            return self._entry(node, -1)
+        node, i = path[-1]
+        if not node['leaf']:
+            # Predecessor is the last key of the rightmost leaf under children[i]
+            node = node['children'][i]
+            while not node['leaf']:
+                path.append([node, len(node['keys'])])
+                node = node['children'][-1]
+            path.append([node, len(node['keys']) - 1])
+            return self._entry(node, -1)
+        if i > 0:
+            path[-1][1] = i - 1
+            return self._entry(node, i - 1)
+        # Start of a leaf: climb to the first ancestor with a key to the left
+        depth = len(path) - 1
+        while depth > 0 and path[depth - 1][1] == 0:
+            depth -= 1
+        if depth == 0:
+            raise StopIteration
+        del path[depth:]
+        path[-1][1] -= 1
+        node, i = path[-1]
+        return self._entry(node, i)
 
 # ----------------------------------------------------------------------
-# ---- DELETE CORE FUNCTION ----
+# ---- B+ TREE ----
 # ----------------------------------------------------------------------
-def _delete(node, key):
-    t = T_VALUE
-
-    if key in node['keys']:
-        idx = node['keys'].index(key)
-
+# In a B+ tree every key and value sits in a leaf, and the leaves form a
+# doubly linked list in key order. Internal nodes only route: keys[i]
+# separates children[i] (keys < keys[i]) from children[i+1] (keys >=
+# keys[i]), and they carry no values. A scan finds its first leaf once and
+# then follows 'next' pointers, with no descent per key.
+#
+# The rebalancing is BTree's: insert splits full nodes on the way down and
+# delete fills thin ones with fill() (borrow from a sibling, else merge).
+# Only the leaf cases of split_child/merge/borrow_* differ: a separator is
+# a copy of the right leaf's first key, not a key that moves up or down.
+# A deleted key may stay behind as a separator; it still separates.
+class BPlusTree(BTree):
+
+    def _new_node(self, is_leaf):
+        if is_leaf:
+            return create_bplus_leaf(self.t)
+        return create_b_tree_node(self.t, is_leaf)
+
+    def _load_sorted(self, keys, values, fill_factor=1.0):
+        self.root = build_bplus_from_sorted(keys, self.t, fill_factor, values)
+        self.size = self.count_keys(self.root)
+
+    def count_keys(self, node):
         if node['leaf']:
-            # Case 1: Key is in a leaf node
-            node['keys'].pop(idx)
-        else:
-            # Case 2: Key is in an internal node
-
-            # Case 2a: Left child has at least 't' keys
-            if len(node['children'][idx]['keys']) >= t:
-                pred = get_pred(node, idx)
-                node['keys'][idx] = pred
-                _delete(node['children'][idx], pred)
-            # Case 2b: Right child has at least 't' keys
-            elif len(node['children'][idx + 1]['keys']) >= t:
-                succ = get_succ(node, idx)
-                node['keys'][idx] = succ
-                _delete(node['children'][idx + 1], succ)
-            # Case 2c: Both children have t-1 keys
-            else:
-                merge(node, idx)
-                _delete(node['children'][idx], key)
-    else:
-        if node['leaf']:
-            # Key not found
+            return len(node['keys'])
+        return sum(self.count_keys(child) for child in node['children'])
+
+    # The leaf where 'key' is or would be
+    def _leaf_for(self, key):
+        node = self.root
+        while not node['leaf']:
+            node = node['children'][bisect_right(node['keys'], key)]
+        return node
+
+    def first_leaf(self):
+        node = self.root
+        while not node['leaf']:
+            node = node['children'][0]
+        return node
+
+    def last_leaf(self):
+        node = self.root
+        while not node['leaf']:
+            node = node['children'][-1]
+        return node
+
+    # ----------------------------------------------------------------------
+    # ---- SEARCH ----
+    # ----------------------------------------------------------------------
+    def find(self, key):
+        leaf = self._leaf_for(key)
+        keys = leaf['keys']
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return leaf, i
+        return None
+
+    # Same walk as BTree._lookup_many, but every key ends at a leaf
+    def _lookup_many(self, keys):
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        batch = [keys[i] for i in order]
+        found = [MISSING] * len(batch)
+        stack = [(self.root, 0, len(batch))]
+        while stack:
+            node, lo, hi = stack.pop()
+            node_keys = node['keys']
+            if node['leaf']:
+                for j in range(lo, hi):
+                    i = bisect_left(node_keys, batch[j])
+                    if i < len(node_keys) and node_keys[i] == batch[j]:
+                        found[order[j]] = node['values'][i]
+                continue
+            start = lo
+            while start < hi:
+                # Batch keys below separator i go to child i
+                i = bisect_right(node_keys, batch[start])
+                end = bisect_left(batch, node_keys[i], start, hi) if i < len(node_keys) else hi
+                stack.append((node['children'][i], start, end))
+                start = end
+        return found
+
+    # ----------------------------------------------------------------------
+    # ---- INSERT ----
+    # ----------------------------------------------------------------------
+    def split_child(self, parent, index, child):
+        if not child['leaf']:
+            # Internal node: the median separator moves up, as in a B-tree
+            t = self.t
+            new_child = self._new_node(is_leaf=False)
+            parent['keys'].insert(index, child['keys'][t - 1])
+            parent['children'].insert(index + 1, new_child)
+            new_child['keys'] = child['keys'][t:]
+            new_child['children'] = child['children'][t:]
+            del child['keys'][t - 1:]
+            del child['children'][t:]
             return
 
-        # Find the child index to descend into
-        idx = 0
-        while idx < len(node['keys']) and key > node['keys'][idx]:
-            idx += 1
-
-        child_to_descend = node['children'][idx]
-
-        # Case 3: Ensure child has at least 't' keys before descending
-        if len(child_to_descend['keys']) < t:
-            fill(node, idx)
-
-        # After fill(), the structure might have changed (e.g., merge)
-        # We need to determine the correct child to descend into *after* fill.
+        # Leaf: the right half (t keys) moves to a new leaf, and a copy of
+        # its first key becomes the separator
+        t = self.t
+        new_child = self._new_node(is_leaf=True)
+        new_child['keys'] = child['keys'][t - 1:]
+        new_child['values'] = child['values'][t - 1:]
+        del child['keys'][t - 1:]
+        del child['values'][t - 1:]
+        parent['keys'].insert(index, new_child['keys'][0])
+        parent['children'].insert(index + 1, new_child)
+
+        new_child['prev'] = child
+        new_child['next'] = child['next']
+        if child['next'] is not None:
+            child['next']['prev'] = new_child
+        child['next'] = new_child
+
+    def insert_non_full(self, node, key, value=None):
+        full = 2 * self.t - 1
+        while not node['leaf']:
+            i = bisect_right(node['keys'], key)
+            if len(node['children'][i]['keys']) == full:
+                self.split_child(node, i, node['children'][i])
+                if key >= node['keys'][i]:
+                    i += 1
+            node = node['children'][i]
+
+        keys = node['keys']
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            node['values'][i] = value
+            return False
+        keys.insert(i, key)
+        node['values'].insert(i, value)
+        return True
 
-        # If fill resulted in a merge with the right sibling, the key might now be in a merged node
-        if idx > len(node['keys']): # This means a merge happened and the original child index 'idx' is now gone
-            _delete(node['children'][idx - 1], key)
-        # If the key is now greater than the parent key at idx (due to borrow/merge), go right
-        elif idx < len(node['keys']) and key > node['keys'][idx]:
-            _delete(node['children'][idx + 1], key)
+    # ----------------------------------------------------------------------
+    # ---- DELETE ----
+    # ----------------------------------------------------------------------
+    def merge(self, node, idx):
+        child = node['children'][idx]
+        sibling = node['children'][idx + 1]
+        if child['leaf']:
+            # The separator just goes: it was a copy of sibling's first key
+            del node['keys'][idx]
+            child['values'].extend(sibling['values'])
+            child['next'] = sibling['next']
+            if sibling['next'] is not None:
+                sibling['next']['prev'] = child
         else:
-            # Otherwise, descend into the (potentially modified) child at index 'idx'
-            _delete(node['children'][idx], key)
-
-
-# ----------------------------------------------------------------------
-# ---- DELETE FUNCTION (Public Interface) ----
-# ----------------------------------------------------------------------
-def delete(key):
-    global B_TREE_ROOT
-    _delete(B_TREE_ROOT, key)
-
-    # If root becomes empty and is not a leaf, its first child becomes the new root
-    if len(B_TREE_ROOT['keys']) == 0 and not B_TREE_ROOT['leaf']:
-        B_TREE_ROOT = B_TREE_ROOT['children'][0]
-
-# ----------------------------------------------------------------------
-# ---- DISPLAY FUNCTIONS ----
-# ----------------------------------------------------------------------
-def display_node(node, level=0):
-    print("Level", level, "Keys:", node['keys'])
-    for child in node['children']:
-        display_node(child, level + 1)
+            child['keys'].append(node['keys'].pop(idx))
+            child['children'].extend(sibling['children'])
+        child['keys'].extend(sibling['keys'])
+        node['children'].pop(idx + 1)
+        self._free(sibling)
+
+    def borrow_prev(self, node, idx):
+        child = node['children'][idx]
+        sibling = node['children'][idx - 1]
+        if child['leaf']:
+            child['keys'].insert(0, sibling['keys'].pop())
+            child['values'].insert(0, sibling['values'].pop())
+            node['keys'][idx - 1] = child['keys'][0]
+        else:
+            child['keys'].insert(0, node['keys'][idx - 1])
+            node['keys'][idx - 1] = sibling['keys'].pop()
+            child['children'].insert(0, sibling['children'].pop())
+
+    def borrow_next(self, node, idx):
+        child = node['children'][idx]
+        sibling = node['children'][idx + 1]
+        if child['leaf']:
+            child['keys'].append(sibling['keys'].pop(0))
+            child['values'].append(sibling['values'].pop(0))
+            node['keys'][idx] = sibling['keys'][0]
+        else:
+            child['keys'].append(node['keys'][idx])
+            node['keys'][idx] = sibling['keys'].pop(0)
+            child['children'].append(sibling['children'].pop(0))
+
+    # Walk down to the leaf, making sure every child we enter has at least
+    # t keys (so the leaf can lose one), then remove the key there
+    def _delete(self, node, key):
+        t = self.t
+        while not node['leaf']:
+            idx = bisect_right(node['keys'], key)
+            if len(node['children'][idx]['keys']) < t:
+                self.fill(node, idx)
+                # A borrow moves a separator and a merge removes one
+                idx = bisect_right(node['keys'], key)
+            node = node['children'][idx]
+
+        keys = node['keys']
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+            del node['values'][i]
+            return True
+        return False
 
-def display_b_tree():
-    print("\nB-Tree Structure:")
-    display_node(B_TREE_ROOT)
-    print()
+    # ----------------------------------------------------------------------
+    # ---- ORDERED ACCESS ----
+    # ----------------------------------------------------------------------
+    def cursor(self, items=False):
+        return LeafCursor(self, items)
+
+    # Walk the leaf chain instead of stepping a cursor key by key
+    def _walk(self, lo, hi, reverse, items):
+        if not reverse:
+            leaf = self.first_leaf() if lo is None else self._leaf_for(lo)
+            i = 0 if lo is None else bisect_left(leaf['keys'], lo)
+            while leaf is not None:
+                keys = leaf['keys']
+                end = len(keys) if hi is None else bisect_left(keys, hi, i)
+                if items:
+                    yield from zip(keys[i:end], leaf['values'][i:end])
+                else:
+                    yield from keys[i:end]
+                if end < len(keys):
+                    return
+                leaf = leaf['next']
+                i = 0
+        else:
+            leaf = self.last_leaf() if hi is None else self._leaf_for(hi)
+            end = len(leaf['keys']) if hi is None else bisect_left(leaf['keys'], hi)
+            while leaf is not None:
+                keys = leaf['keys']
+                start = 0 if lo is None else bisect_left(keys, lo, 0, end)
+                for i in range(end - 1, start - 1, -1):
+                    yield (keys[i], leaf['values'][i]) if items else keys[i]
+                if start > 0:
+                    return
+                leaf = leaf['prev']
+                if leaf is not None:
+                    end = len(leaf['keys'])
+
+
+# A B+ tree cursor is a position in one leaf: it sits before
+# leaf['keys'][i] (i may equal the leaf's length) and moves between leaves
+# through the 'next' and 'prev' links.
+class LeafCursor:
+    def __init__(self, tree, items=False):
+        self.tree = tree
+        self.items = items
+        self.seek_first()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+
+    def seek_first(self):
+        self.leaf = self.tree.first_leaf()
+        self.i = 0
+
+    def seek_end(self):
+        self.leaf = self.tree.last_leaf()
+        self.i = len(self.leaf['keys'])
+
+    def seek(self, key):
+        self.leaf = self.tree._leaf_for(key)
+        self.i = bisect_left(self.leaf['keys'], key)
+
+    def next(self):
+        leaf, i = self.leaf, self.i
+        while i == len(leaf['keys']):
+            if leaf['next'] is None:
+                self.leaf, self.i = leaf, i
+                raise StopIteration
+            leaf, i = leaf['next'], 0
+        self.leaf, self.i = leaf, i + 1
+        return (leaf['keys'][i], leaf['values'][i]) if self.items else leaf['keys'][i]
+
+    def prev(self):
+        leaf, i = self.leaf, self.i
+        while i == 0:
+            if leaf['prev'] is None:
+                self.leaf, self.i = leaf, i
+                raise StopIteration
+            leaf = leaf['prev']
+            i = len(leaf['keys'])
+        self.leaf, self.i = leaf, i - 1
+        return (leaf['keys'][i - 1], leaf['values'][i - 1]) if self.items else leaf['keys'][i - 1]
 
 # ----------------------------------------------------------------------
 # ---- USER INPUT MENU ----
 # ----------------------------------------------------------------------
+if __name__ == "__main__":
+    tree = BTree(T_VALUE)
+    print("B-Tree Operations")
+    print("Options: 1:insert, 2:search, 3:delete, 4:display, 5: exit")
+    while True:
+        choice = input("\nEnter operation: ").lower()
+
+        if choice == "1":
+            print("Enter numbers to insert into tree :")
+            nums=list(map(int,input().split()))
+            tree.insert_many(nums)
+
+        elif choice == "2":
+            val = int(input("Enter value to search: "))
+            if tree.search(val):
+                print(val, "is found in B-Tree.")
+            else:
+                print(val, "is NOT found in B-Tree.")
 
-# Re-initialize the root before starting the menu
-B_TREE_ROOT = create_b_tree_node(T_VALUE, is_leaf=True)
-print("B-Tree Operations")
-print("Options: 1:insert, 2:search, 3:delete, 4:display, 5: exit")
-while True:
-    choice = input("\nEnter operation: ").lower()
-
-    if choice == "1":
-        print("Enter numbers to insert into tree :")
-        nums=list(map(int,input().split()))
-        for num in nums:
-          insert(num) # Corrected: only pass num, operate on global B_TREE_ROOT
-
-    elif choice == "2":
-        val = int(input("Enter value to search: "))
-        if search(val): # Corrected: only pass val, search starts from global B_TREE_ROOT
-            print(val, "is found in B-Tree.")
-        else:
-            print(val, "is NOT found in B-Tree.")
-
-    elif choice == "3":
-        val = int(input("Enter value to delete: "))
-        delete(val) # Corrected: only pass val, operate on global B_TREE_ROOT
-        print(val, "deleted (if it existed).")
+        elif choice == "3":
+            val = int(input("Enter value to delete: "))
+            tree.delete(val)
+            print(val, "deleted (if it existed).")
 
-    elif choice == "4":
-        display_b_tree()
+        elif choice == "4":
+            tree.display()
 
-    elif choice == "5":
-        print("Exiting program.")
-        break
+        elif choice == "5":
+            print("Exiting program.")
+            break
 
-    else:
-        print("Invalid choice! Try again.")
+        else:
+            print("Invalid choice! Try again.")
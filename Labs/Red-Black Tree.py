@@ -1,259 +1,534 @@
 #2nd version with operation like insertion and delete
 # Simple Red-Black Tree in Python (Beginner-friendly)
-# No classes, just functions and dictionaries
-
-# Create NIL node (used instead of None for leaves)
-NIL = {"key": None, "color": "B", "left": None, "right": None, "parent": None}
-
-# Root of tree (starts empty)
-root = NIL
-
-# ------------------- Helper Functions -------------------
-
-def create_node(key):
-    """Create a new red node"""
-    return {"key": key, "color": "R", "left": NIL, "right": NIL, "parent": None}
-
-def left_rotate(x):
-    """Perform a left rotation"""
-    global root
-    y = x["right"]
-    x["right"] = y["left"]
-    if y["left"] != NIL:
-        y["left"]["parent"] = x
-    y["parent"] = x["parent"]
-    if x["parent"] == None:
-        root = y
-    elif x == x["parent"]["left"]:
-        x["parent"]["left"] = y
-    else:
-        x["parent"]["right"] = y
-    y["left"] = x
-    x["parent"] = y
-
-def right_rotate(x):
-    """Perform a right rotation"""
-    global root
-    y = x["left"]
-    x["left"] = y["right"]
-    if y["right"] != NIL:
-        y["right"]["parent"] = y
-    y["parent"] = x["parent"]
-    if x["parent"] == None:
-        root = y
-    elif x == x["parent"]["right"]:
-        x["parent"]["right"] = y
-    else:
-        x["parent"]["left"] = y
-    y["right"] = x
-    x["parent"] = y
-
-# ------------------- Insert Operations -------------------
-
-def insert(key):
-    """Insert a key into the Red-Black Tree"""
-    global root
-    node = create_node(key)
-    y = None
-    x = root
-
-    while x != NIL and x["key"] is not None:
-        y = x
-        if node["key"] < x["key"]:
-            x = x["left"]
+# Nodes are small objects with __slots__, and every check against the
+# NIL sentinel or another node uses identity ("is"), never "==".
+# Each RedBlackTree object owns its own root and NIL, so a program can
+# keep as many independent trees as it needs.
+
+from operator import attrgetter
+
+from ordered import MISSING, OrderedMixin, find_sorted, sort_batch, unique_sorted
+
+RED = "R"
+BLACK = "B"
+
+
+class Node:
+    """A tree node (slots keep it compact: no per-node __dict__).
+    'size' counts the nodes in its subtree, for rank/select/count."""
+    __slots__ = ("key", "value", "color", "left", "right", "parent", "size")
+
+    def __init__(self, key, color=RED, left=None, right=None, parent=None, size=1, value=None):
+        self.key = key
+        self.value = value
+        self.color = color
+        self.left = left
+        self.right = right
+        self.parent = parent
+        self.size = size
+
+
+class RedBlackTree(OrderedMixin):
+    """A Red-Black tree with its own root and NIL sentinel"""
+
+    # RB inserts rotate far less than AVL ones, so a rebuild pays off later
+    rebuild_fraction = 0.5
+
+    # Called as _fix_step("fix_insert") / _fix_step("fix_delete") once per
+    # pass of the fix-up loops while instrument.py is counting; None otherwise
+    _fix_step = None
+
+    def __init__(self):
+        # Create NIL node (used instead of None for leaves)
+        self.nil = Node(None, BLACK, size=0)
+        # Root of tree (starts empty)
+        self.root = self.nil
+
+    @classmethod
+    def from_sorted(cls, keys, values=None):
+        """Build a tree from keys in ascending order in O(n)"""
+        tree = cls()
+        tree._load_sorted(*unique_sorted(keys, values))
+        return tree
+
+    @classmethod
+    def bulk_load(cls, keys, values=None):
+        """Build a tree from keys in any order"""
+        tree = cls()
+        tree._load_sorted(*sort_batch(keys, values))
+        return tree
+
+    def __len__(self):
+        return self.root.size
+
+    def __contains__(self, key):
+        return self.search(key)
+
+    def __iter__(self):
+        """Yield the keys in sorted order"""
+        nil = self.nil
+        stack = []
+        node = self.root
+        while stack or node is not nil:
+            while node is not nil:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.key
+            node = node.right
+
+    # ------------------- Helper Functions -------------------
+
+    def create_node(self, key, value=None):
+        """Create a new red node"""
+        return Node(key, RED, self.nil, self.nil, None, value=value)
+
+    def left_rotate(self, x):
+        """Perform a left rotation"""
+        y = x.right
+        x.right = y.left
+        if y.left is not self.nil:
+            y.left.parent = x
+        y.parent = x.parent
+        if x.parent is None:
+            self.root = y
+        elif x is x.parent.left:
+            x.parent.left = y
         else:
-            x = x["right"]
-
-    node["parent"] = y
-    if y == None:
-        root = node
-    elif node["key"] < y["key"]:
-        y["left"] = node
-    else:
-        y["right"] = node
-
-    node["left"] = NIL
-    node["right"] = NIL
-    node["color"] = "R"
-
-    fix_insert(node)
-
-def fix_insert(k):
-    """Fix the tree after insertion"""
-    global root
-    while k["parent"] and k["parent"]["color"] == "R":
-        if k["parent"] == k["parent"]["parent"]["left"]:
-            u = k["parent"]["parent"]["right"]
-            if u["color"] == "R":  # Case 1: uncle is red
-                k["parent"]["color"] = "B"
-                u["color"] = "B"
-                k["parent"]["parent"]["color"] = "R"
-                k = k["parent"]["parent"]
+            x.parent.right = y
+        y.left = x
+        x.parent = y
+        y.size = x.size
+        x.size = 1 + x.left.size + x.right.size
+
+    def right_rotate(self, x):
+        """Perform a right rotation"""
+        y = x.left
+        x.left = y.right
+        if y.right is not self.nil:
+            y.right.parent = x
+        y.parent = x.parent
+        if x.parent is None:
+            self.root = y
+        elif x is x.parent.right:
+            x.parent.right = y
+        else:
+            x.parent.left = y
+        y.right = x
+        x.parent = y
+        y.size = x.size
+        x.size = 1 + x.left.size + x.right.size
+
+    # ------------------- Search -------------------
+
+    def find_node(self, key):
+        """Return the node holding key, or NIL"""
+        nil = self.nil
+        x = self.root
+        while x is not nil and x.key != key:
+            if key < x.key:
+                x = x.left
+            else:
+                x = x.right
+        return x
+
+    def search(self, key):
+        """Return True if key is in the tree"""
+        return self.find_node(key) is not self.nil
+
+    def get(self, key, default=None):
+        """Return the value stored under key, or default"""
+        node = self.find_node(key)
+        return default if node is self.nil else node.value
+
+    # ------------------- Insert Operations -------------------
+
+    def insert(self, key, value=None):
+        """Insert a key into the Red-Black Tree.
+        An existing key keeps its node and just gets the new value;
+        returns True if the key is new."""
+        nil = self.nil
+        y = None
+        x = self.root
+
+        while x is not nil:
+            if key < x.key:
+                y = x
+                x = x.left
+            elif x.key < key:
+                y = x
+                x = x.right
             else:
-                if k == k["parent"]["right"]:  # Case 2: triangle
-                    k = k["parent"]
-                    left_rotate(k)
-                # Case 3: line
-                k["parent"]["color"] = "B"
-                k["parent"]["parent"]["color"] = "R"
-                right_rotate(k["parent"]["parent"])
+                x.value = value
+                self.shrink_path(y)  # undo the size increments on the way down
+                return False
+            y.size += 1  # the new node will sit below every node on this path
+
+        node = self.create_node(key, value)
+        node.parent = y
+        if y is None:
+            self.root = node
+        elif key < y.key:
+            y.left = node
         else:
-            u = k["parent"]["parent"]["left"]
-            if u["color"] == "R":
-                k["parent"]["color"] = "B"
-                u["color"] = "B"
-                k["parent"]["parent"]["color"] = "R"
-                k = k["parent"]["parent"]
+            y.right = node
+
+        self.fix_insert(node)
+        return True
+
+    def fix_insert(self, k):
+        """Fix the tree after insertion"""
+        while k.parent is not None and k.parent.color == RED:
+            if self._fix_step is not None:
+                self._fix_step("fix_insert")
+            parent = k.parent
+            grandparent = parent.parent
+            if parent is grandparent.left:
+                u = grandparent.right
+                if u.color == RED:  # Case 1: uncle is red
+                    parent.color = BLACK
+                    u.color = BLACK
+                    grandparent.color = RED
+                    k = grandparent
+                else:
+                    if k is parent.right:  # Case 2: triangle
+                        k = parent
+                        self.left_rotate(k)
+                    # Case 3: line
+                    k.parent.color = BLACK
+                    k.parent.parent.color = RED
+                    self.right_rotate(k.parent.parent)
             else:
-                if k == k["parent"]["left"]:
-                    k = k["parent"]
-                    right_rotate(k)
-                k["parent"]["color"] = "B"
-                k["parent"]["parent"]["color"] = "R"
-                left_rotate(k["parent"]["parent"])
-    root["color"] = "B"
-
-# ------------------- Delete Operations -------------------
-
-def transplant(u, v):
-    """Replace one subtree with another"""
-    global root
-    if u["parent"] == None:
-        root = v
-    elif u == u["parent"]["left"]:
-        u["parent"]["left"] = v
-    else:
-        u["parent"]["right"] = v
-    v["parent"] = u["parent"]
-
-def tree_minimum(x):
-    while x["left"] != NIL:
-        x = x["left"]
-    return x
-
-def delete(key):
-    """Delete a key from the tree"""
-    global root
-    z = root
-    while z != NIL and z["key"] != key:
-        if key < z["key"]:
-            z = z["left"]
+                u = grandparent.left
+                if u.color == RED:
+                    parent.color = BLACK
+                    u.color = BLACK
+                    grandparent.color = RED
+                    k = grandparent
+                else:
+                    if k is parent.left:
+                        k = parent
+                        self.right_rotate(k)
+                    k.parent.color = BLACK
+                    k.parent.parent.color = RED
+                    self.left_rotate(k.parent.parent)
+        self.root.color = BLACK
+
+    # ------------------- Delete Operations -------------------
+
+    def transplant(self, u, v):
+        """Replace one subtree with another"""
+        if u.parent is None:
+            self.root = v
+        elif u is u.parent.left:
+            u.parent.left = v
         else:
-            z = z["right"]
-
-    if z == NIL:
-        print("Key not found!")
-        return
-
-    y = z
-    y_original_color = y["color"]
-    if z["left"] == NIL:
-        x = z["right"]
-        transplant(z, z["right"])
-    elif z["right"] == NIL:
-        x = z["left"]
-        transplant(z, z["left"])
-    else:
-        y = tree_minimum(z["right"])
-        y_original_color = y["color"]
-        x = y["right"]
-        if y["parent"] == z:
-            x["parent"] = y
+            u.parent.right = v
+        v.parent = u.parent
+
+    def tree_minimum(self, x):
+        while x.left is not self.nil:
+            x = x.left
+        return x
+
+    def tree_maximum(self, x):
+        while x.right is not self.nil:
+            x = x.right
+        return x
+
+    def successor(self, x):
+        """Next node in key order, or NIL"""
+        if x.right is not self.nil:
+            return self.tree_minimum(x.right)
+        y = x.parent
+        while y is not None and x is y.right:
+            x = y
+            y = y.parent
+        return self.nil if y is None else y
+
+    def predecessor(self, x):
+        """Previous node in key order, or NIL"""
+        if x.left is not self.nil:
+            return self.tree_maximum(x.left)
+        y = x.parent
+        while y is not None and x is y.left:
+            x = y
+            y = y.parent
+        return self.nil if y is None else y
+
+    def delete(self, key):
+        """Delete a key from the tree; return False if it was not there"""
+        nil = self.nil
+        z = self.find_node(key)
+        if z is nil:
+            return False
+
+        # Every ancestor of the node that physically leaves its place loses
+        # one descendant: that is z itself, or z's successor if z has two children
+        if z.left is nil or z.right is nil:
+            self.shrink_path(z.parent)
+        else:
+            self.shrink_path(self.tree_minimum(z.right).parent)
+
+        y = z
+        y_original_color = y.color
+        if z.left is nil:
+            x = z.right
+            self.transplant(z, z.right)
+        elif z.right is nil:
+            x = z.left
+            self.transplant(z, z.left)
         else:
-            transplant(y, y["right"])
-            y["right"] = z["right"]
-            y["right"]["parent"] = y
-        transplant(z, y)
-        y["left"] = z["left"]
-        y["left"]["parent"] = y
-        y["color"] = z["color"]
-    if y_original_color == "B":
-        fix_delete(x)
-
-def fix_delete(x):
-    """Fix tree after deletion"""
-    global root
-    while x != root and x["color"] == "B":
-        if x == x["parent"]["left"]:
-            s = x["parent"]["right"]
-            if s["color"] == "R":
-                s["color"] = "B"
-                x["parent"]["color"] = "R"
-                left_rotate(x["parent"])
-                s = x["parent"]["right"]
-            if s["left"]["color"] == "B" and s["right"]["color"] == "B":
-                s["color"] = "R"
-                x = x["parent"]
+            y = self.tree_minimum(z.right)
+            y_original_color = y.color
+            x = y.right
+            if y.parent is z:
+                x.parent = y
+            else:
+                self.transplant(y, y.right)
+                y.right = z.right
+                y.right.parent = y
+            self.transplant(z, y)
+            y.left = z.left
+            y.left.parent = y
+            y.color = z.color
+            y.size = z.size
+        if y_original_color == BLACK:
+            self.fix_delete(x)
+        return True
+
+    def shrink_path(self, x):
+        """Decrease the subtree size of x and all of its ancestors by one"""
+        while x is not None:
+            x.size -= 1
+            x = x.parent
+
+    def fix_delete(self, x):
+        """Fix tree after deletion"""
+        while x is not self.root and x.color == BLACK:
+            if self._fix_step is not None:
+                self._fix_step("fix_delete")
+            if x is x.parent.left:
+                s = x.parent.right
+                if s.color == RED:
+                    s.color = BLACK
+                    x.parent.color = RED
+                    self.left_rotate(x.parent)
+                    s = x.parent.right
+                if s.left.color == BLACK and s.right.color == BLACK:
+                    s.color = RED
+                    x = x.parent
+                else:
+                    if s.right.color == BLACK:
+                        s.left.color = BLACK
+                        s.color = RED
+                        self.right_rotate(s)
+                        s = x.parent.right
+                    s.color = x.parent.color
+                    x.parent.color = BLACK
+                    s.right.color = BLACK
+                    self.left_rotate(x.parent)
+                    x = self.root
+            else:
+                s = x.parent.left
+                if s.color == RED:
+                    s.color = BLACK
+                    x.parent.color = RED
+                    self.right_rotate(x.parent)
+                    s = x.parent.left
+                if s.right.color == BLACK and s.left.color == BLACK:
+                    s.color = RED
+                    x = x.parent
+                else:
+                    if s.left.color == BLACK:
+                        s.right.color = BLACK
+                        s.color = RED
+                        self.left_rotate(s)
+                        s = x.parent.left
+                    s.color = x.parent.color
+                    x.parent.color = BLACK
+                    s.left.color = BLACK
+                    self.right_rotate(x.parent)
+                    x = self.root
+        x.color = BLACK
+
+    # ------------------- Bulk Building -------------------
+
+    def _load_sorted(self, keys, values):
+        """Replace the contents with ascending unique keys, without rotations.
+        The midpoint split keeps every leaf on one of the two deepest levels;
+        colouring just the nodes on the deepest level red (when it is not the
+        root) gives every path the same number of black nodes."""
+        self.root = self._build(keys, values, 0, len(keys), 1, len(keys).bit_length())
+        self.root.parent = None
+
+    def _build(self, keys, values, lo, hi, depth, deepest):
+        if lo >= hi:
+            return self.nil
+        mid = (lo + hi) // 2
+        color = RED if depth == deepest and depth > 1 else BLACK
+        node = Node(keys[mid], color, size=hi - lo, value=values[mid])
+        node.left = self._build(keys, values, lo, mid, depth + 1, deepest)
+        node.right = self._build(keys, values, mid + 1, hi, depth + 1, deepest)
+        if node.left is not self.nil:
+            node.left.parent = node
+        if node.right is not self.nil:
+            node.right.parent = node
+        return node
+
+    # ------------------- Batched Lookup -------------------
+
+    def _lookup_many(self, keys):
+        """Look up many keys in one walk (see ordered.find_sorted)"""
+        nil = self.nil
+        nodes = find_sorted(self.root, keys, attrgetter("left"), attrgetter("right"),
+                            attrgetter("key"), nil)
+        return [MISSING if node is nil else node.value for node in nodes]
+
+    # ------------------- Order Statistics -------------------
+
+    def rank(self, key):
+        """Number of keys smaller than key"""
+        nil = self.nil
+        x = self.root
+        smaller = 0
+        while x is not nil:
+            if key <= x.key:
+                x = x.left
+            else:
+                smaller += x.left.size + 1
+                x = x.right
+        return smaller
+
+    def select(self, i):
+        """The i-th smallest key (0-based; negative i counts from the end)"""
+        if i < 0:
+            i += self.root.size
+        if not 0 <= i < self.root.size:
+            raise IndexError("select index out of range")
+        x = self.root
+        while True:
+            left = x.left.size
+            if i < left:
+                x = x.left
+            elif i == left:
+                return x.key
             else:
-                if s["right"]["color"] == "B":
-                    s["left"]["color"] = "B"
-                    s["color"] = "R"
-                    right_rotate(s)
-                    s = x["parent"]["right"]
-                s["color"] = x["parent"]["color"]
-                x["parent"]["color"] = "B"
-                s["right"]["color"] = "B"
-                left_rotate(x["parent"])
-                x = root
+                i -= left + 1
+                x = x.right
+
+    def count(self, lo=None, hi=None):
+        """Number of keys k with lo <= k < hi (None = unbounded)"""
+        upper = self.root.size if hi is None else self.rank(hi)
+        lower = 0 if lo is None else self.rank(lo)
+        return max(0, upper - lower)
+
+    # ------------------- Ordered Access -------------------
+
+    def cursor(self, items=False):
+        return Cursor(self, items)
+
+    # ------------------- Display -------------------
+
+    def inorder(self, node=None):
+        """Inorder traversal"""
+        if node is None:
+            node = self.root
+        if node is not self.nil:
+            self.inorder(node.left)
+            print(f"{node.key}({node.color})", end=" ")
+            self.inorder(node.right)
+
+class Cursor:
+    """Cursor over a RedBlackTree (see ordered.py); it remembers the node
+    holding the next key and moves with the parent links"""
+
+    def __init__(self, tree, items=False):
+        self.tree = tree
+        self.items = items
+        self.seek_first()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+
+    def seek_first(self):
+        tree = self.tree
+        if tree.root is tree.nil:
+            self.node = tree.nil
         else:
-            s = x["parent"]["left"]
-            if s["color"] == "R":
-                s["color"] = "B"
-                x["parent"]["color"] = "R"
-                right_rotate(x["parent"])
-                s = x["parent"]["left"]
-            if s["right"]["color"] == "B" and s["left"]["color"] == "B":
-                s["color"] = "R"
-                x = x["parent"]
+            self.node = tree.tree_minimum(tree.root)
+
+    def seek_end(self):
+        self.node = self.tree.nil
+
+    def seek(self, key):
+        """Move before the first key >= key"""
+        nil = self.tree.nil
+        x = self.tree.root
+        best = nil
+        while x is not nil:
+            if key <= x.key:
+                best = x
+                x = x.left
             else:
-                if s["left"]["color"] == "B":
-                    s["right"]["color"] = "B"
-                    s["color"] = "R"
-                    left_rotate(s)
-                    s = x["parent"]["left"]
-                s["color"] = x["parent"]["color"]
-                x["parent"]["color"] = "B"
-                s["left"]["color"] = "B"
-                right_rotate(x["parent"])
-                x = root
-    x["color"] = "B"
-
-# ------------------- Display -------------------
-
-def inorder(node):
-    """Inorder traversal"""
-    if node != NIL and node["key"] is not None:
-        inorder(node["left"])
-        print(f"{node['key']}({node['color']})", end=" ")
-        inorder(node["right"])
+                x = x.right
+        self.node = best
+
+    def next(self):
+        node = self.node
+        if node is self.tree.nil:
+            raise StopIteration
+        self.node = self.tree.successor(node)
+        return (node.key, node.value) if self.items else node.key
+
+    def prev(self):
+        tree = self.tree
+        if self.node is tree.nil:
+            if tree.root is tree.nil:
+                raise StopIteration
+            self.node = tree.tree_maximum(tree.root)
+        else:
+            node = tree.predecessor(self.node)
+            if node is tree.nil:
+                raise StopIteration
+            self.node = node
+        node = self.node
+        return (node.key, node.value) if self.items else node.key
 
 # ------------------- Main Menu -------------------
 
-print("Red-Black Tree Operations")
-print("Options: 1:insert, 2:delete , 3:inorder, 4: exit")
+if __name__ == "__main__":
+    tree = RedBlackTree()
+
+    print("Red-Black Tree Operations")
+    print("Options: 1:insert, 2:delete , 3:inorder, 4: exit")
 
-while True:
-    choice = input("\nEnter operation: ").lower()
+    while True:
+        choice = input("\nEnter operation: ").lower()
 
-    if choice == "1":
-        print("Enter numbers to insert into tree :")
-        nums=list(map(int,input().split()))
-        for num in nums:
-          insert(num)
+        if choice == "1":
+            print("Enter numbers to insert into tree :")
+            nums=list(map(int,input().split()))
+            tree.insert_many(nums)
 
-    elif choice == "2":
-        val = int(input("Enter value to delete: "))
-        delete(val)
-        print(val, "deleted (if it existed).")
+        elif choice == "2":
+            val = int(input("Enter value to delete: "))
+            if tree.delete(val):
+                print(val, "deleted.")
+            else:
+                print("Key not found!")
 
-    elif choice == "3":
-        print("Inorder traversal:", end=" ")
-        inorder(root)
-        print()
+        elif choice == "3":
+            print("Inorder traversal:", end=" ")
+            tree.inorder()
+            print()
 
-    elif choice == "4":
-        print("Exiting program.")
-        break
+        elif choice == "4":
+            print("Exiting program.")
+            break
 
-    else:
-        print("Invalid choice! Try again.")
+        else:
+            print("Invalid choice! Try again.")
@@ -1,10 +1,19 @@
 #AVL Trees
-def new_node(key):
-    return {"key": key, "left": None, "right": None, "height": 1}
+from operator import itemgetter
+
+from ordered import MISSING, OrderedMixin, PathCursor, find_sorted, sort_batch, unique_sorted
+
+# Each node also stores "size", the number of nodes in its subtree, which
+# gives rank/select/count in O(log n) (see "Order statistics" below)
+def new_node(key, value=None):
+    return {"key": key, "value": value, "left": None, "right": None, "height": 1, "size": 1}
 
 def height(node):
     return node["height"] if node else 0
 
+def size(node):
+    return node["size"] if node else 0
+
 def get_balance(node):
     return height(node["left"]) - height(node["right"]) if node else 0
 
@@ -17,6 +26,8 @@ def right_rotate(y):
 
     y["height"] = 1 + max(height(y["left"]), height(y["right"]))
     x["height"] = 1 + max(height(x["left"]), height(x["right"]))
+    x["size"] = y["size"]
+    y["size"] = 1 + size(y["left"]) + size(y["right"])
 
     return x
 
@@ -29,18 +40,25 @@ def left_rotate(x):
 
     x["height"] = 1 + max(height(x["left"]), height(x["right"]))
     y["height"] = 1 + max(height(y["left"]), height(y["right"]))
+    y["size"] = x["size"]
+    x["size"] = 1 + size(x["left"]) + size(x["right"])
 
     return y
 
-def insert(root, key):
+# Inserting a key that is already there replaces its value in place
+def insert(root, key, value=None):
     if not root:
-        return new_node(key)
+        return new_node(key, value)
     if key < root["key"]:
-        root["left"] = insert(root["left"], key)
+        root["left"] = insert(root["left"], key, value)
+    elif key > root["key"]:
+        root["right"] = insert(root["right"], key, value)
     else:
-        root["right"] = insert(root["right"], key)
+        root["value"] = value
+        return root
 
     root["height"] = 1 + max(height(root["left"]), height(root["right"]))
+    root["size"] = 1 + size(root["left"]) + size(root["right"])
     balance = get_balance(root)
 
     if balance > 1 and key < root["left"]["key"]:
@@ -79,9 +97,11 @@ def delete(root, key):
             return root["left"]
         temp = min_value_node(root["right"])
         root["key"] = temp["key"]
+        root["value"] = temp["value"]
         root["right"] = delete(root["right"], temp["key"])
 
     root["height"] = 1 + max(height(root["left"]), height(root["right"]))
+    root["size"] = 1 + size(root["left"]) + size(root["right"])
     balance = get_balance(root)
 
     if balance > 1 and get_balance(root["left"]) >= 0:
@@ -107,48 +127,173 @@ def search(root, key):
         return search(root["left"], key)
     return search(root["right"], key)
 
+# Batched lookup (see ordered.find_sorted)
+# Returns the matching node (or None) for each key, in the order given.
+def find_many(root, keys):
+    return find_sorted(root, keys, itemgetter("left"), itemgetter("right"), itemgetter("key"))
+
+# Bulk loading
+# Build a height-balanced AVL tree straight from sorted keys in O(n):
+# no rotations, and each height is set once from its children
+# (values, if given, line up with keys; see ordered.unique_sorted)
+def from_sorted(keys, values=None):
+    keys, values = unique_sorted(keys, values)
+    return _build_balanced(keys, values, 0, len(keys))
+
+# Build from keys in any order (Timsort is linear on presorted input)
+def bulk_load(keys, values=None):
+    keys, values = sort_batch(keys, values)
+    return _build_balanced(keys, values, 0, len(keys))
+
+def _build_balanced(keys, values, lo, hi):
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    node = new_node(keys[mid], values[mid])
+    node["left"] = _build_balanced(keys, values, lo, mid)
+    node["right"] = _build_balanced(keys, values, mid + 1, hi)
+    node["height"] = 1 + max(height(node["left"]), height(node["right"]))
+    node["size"] = hi - lo
+    return node
+
+# Order statistics
+# rank(root, key): how many keys are smaller than key
+def rank(root, key):
+    smaller = 0
+    while root:
+        if key <= root["key"]:
+            root = root["left"]
+        else:
+            smaller += size(root["left"]) + 1
+            root = root["right"]
+    return smaller
+
+# select(root, i): the i-th smallest key (0-based; negative i counts from the end)
+def select(root, i):
+    if i < 0:
+        i += size(root)
+    if not 0 <= i < size(root):
+        raise IndexError("select index out of range")
+    while True:
+        left = size(root["left"])
+        if i < left:
+            root = root["left"]
+        elif i == left:
+            return root["key"]
+        else:
+            i -= left + 1
+            root = root["right"]
+
+# count(root, lo, hi): how many keys k have lo <= k < hi (None = unbounded)
+def count(root, lo=None, hi=None):
+    upper = size(root) if hi is None else rank(root, hi)
+    lower = 0 if lo is None else rank(root, lo)
+    return max(0, upper - lower)
+
 def inorder(root):
     if root:
         inorder(root["left"])
         print(root["key"], end=" ")
         inorder(root["right"])
 
+# ---------------- Cursor and tree object ----------------
+# A PathCursor (see ordered.py) over the dictionary nodes
+class Cursor(PathCursor):
+    def __init__(self, root, items=False):
+        super().__init__(root, itemgetter("left"), itemgetter("right"),
+                         itemgetter("key"), itemgetter("value"), items)
+
+class AVLTree(OrderedMixin):
+    """An AVL tree object holding its root; the functions above do the work"""
+
+    def __init__(self, root=None):
+        self.root = root
+
+    @classmethod
+    def from_sorted(cls, keys, values=None):
+        return cls(from_sorted(keys, values))
+
+    @classmethod
+    def bulk_load(cls, keys, values=None):
+        return cls(bulk_load(keys, values))
+
+    def insert(self, key, value=None):
+        before = size(self.root)
+        self.root = insert(self.root, key, value)
+        return size(self.root) > before
+
+    def delete(self, key):
+        before = size(self.root)
+        self.root = delete(self.root, key)
+        return size(self.root) < before
+
+    def search(self, key):
+        return search(self.root, key) is not None
+
+    def get(self, key, default=None):
+        node = search(self.root, key)
+        return default if node is None else node["value"]
+
+    def _lookup_many(self, keys):
+        return [MISSING if node is None else node["value"] for node in find_many(self.root, keys)]
+
+    def _load_sorted(self, keys, values):
+        self.root = from_sorted(keys, values)
+
+    def __contains__(self, key):
+        return search(self.root, key) is not None
+
+    def __len__(self):
+        return size(self.root)
+
+    def rank(self, key):
+        return rank(self.root, key)
+
+    def select(self, i):
+        return select(self.root, i)
+
+    def count(self, lo=None, hi=None):
+        return count(self.root, lo, hi)
+
+    def cursor(self, items=False):
+        return Cursor(self.root, items)
+
         #-------main--------#
 
-root = None
+if __name__ == "__main__":
+    tree = AVLTree()
 
-print("AVL Tree Operations")
-print("Options: 1:insert, 2:search, 3:delete, 4:inorder,5: exit")
+    print("AVL Tree Operations")
+    print("Options: 1:insert, 2:search, 3:delete, 4:inorder,5: exit")
 
-while True:
-    choice = input("\nEnter operation: ").lower()
+    while True:
+        choice = input("\nEnter operation: ").lower()
 
-    if choice == "1":
-        print("Enter numbers to insert into tree :")
-        nums=list(map(int,input().split()))
-        for num in nums:
-          root=insert(root,num)
+        if choice == "1":
+            print("Enter numbers to insert into tree :")
+            nums=list(map(int,input().split()))
+            tree.insert_many(nums)
 
-    elif choice == "2":
-        val = int(input("Enter value to search: "))
-        if search(root, val):
-            print(val, "is found in AVL Tree.")
-        else:
-            print(val, "is NOT found in AVL Tree.")
+        elif choice == "2":
+            val = int(input("Enter value to search: "))
+            if tree.search(val):
+                print(val, "is found in AVL Tree.")
+            else:
+                print(val, "is NOT found in AVL Tree.")
 
-    elif choice == "3":
-        val = int(input("Enter value to delete: "))
-        root = delete(root, val)
-        print(val, "deleted (if it existed).")
+        elif choice == "3":
+            val = int(input("Enter value to delete: "))
+            tree.delete(val)
+            print(val, "deleted (if it existed).")
 
-    elif choice == "4":
-        print("Inorder traversal:", end=" ")
-        inorder(root)
-        print()
+        elif choice == "4":
+            print("Inorder traversal:", end=" ")
+            inorder(tree.root)
+            print()
 
-    elif choice == "5":
-        print("Exiting program.")
-        break
+        elif choice == "5":
+            print("Exiting program.")
+            break
 
-    else:
-        print("Invalid choice! Try again.")
+        else:
+            print("Invalid choice! Try again.")
@@ -0,0 +1,311 @@
+# AVL tree stored in parallel arrays
+# The AVL tree from avl.py keeps every node as a dictionary, which costs
+# a few hundred bytes per key. ArrayAVLTree stores node i as entry i of a
+# set of typed columns instead:
+#   _key      keys ('q' = int64 by default, 'd' for floats)
+#   _value    values (a plain list, since values can be anything)
+#   _left     index of the left child   (int32)
+#   _right    index of the right child  (int32)
+#   _height   subtree height            (int8; an AVL tree of 2**31 keys is
+#                                        under 45 levels tall)
+#   _size     nodes in the subtree      (int32, for rank/select/count)
+# which is about 30 bytes per key. Slot 0 is a sentinel (height 0, size 0)
+# standing for "no child", like the NIL node of the Red-Black tree, so
+# height and size never need a None check. Slots of deleted nodes go on a
+# free list (linked through _left) and are reused by later inserts.
+#
+# insert/delete/search behave like AVLTree's: inserting an existing key
+# replaces its value.
+from array import array
+
+from ordered import OrderedMixin, PathCursor, sort_batch, unique_sorted
+
+NIL = 0
+
+
+class ArrayAVLTree(OrderedMixin):
+    """An AVL tree whose nodes live in typed arrays (see above)"""
+
+    def __init__(self, typecode='q'):
+        self.typecode = typecode
+        self._reset()
+
+    def _reset(self):
+        self._key = array(self.typecode, [0])
+        self._value = [None]
+        self._left = array('i', [NIL])
+        self._right = array('i', [NIL])
+        self._height = array('b', [0])
+        self._size = array('i', [0])
+        self.root = NIL
+        self._free = NIL
+
+    @classmethod
+    def from_sorted(cls, keys, values=None, typecode='q'):
+        tree = cls(typecode)
+        tree._load_sorted(*unique_sorted(keys, values))
+        return tree
+
+    @classmethod
+    def bulk_load(cls, keys, values=None, typecode='q'):
+        tree = cls(typecode)
+        tree._load_sorted(*sort_batch(keys, values))
+        return tree
+
+    def __len__(self):
+        return self._size[self.root]
+
+    def __contains__(self, key):
+        return self._find(key) != NIL
+
+    # ----------------------------------------------------------------------
+    # ---- SLOTS ----
+    # ----------------------------------------------------------------------
+    # The key is stored first: it is the one column that can reject a value
+    # (wrong type, out of range), and then nothing has changed yet
+    def _new_slot(self, key, value):
+        i = self._free
+        if i != NIL:
+            self._key[i] = key
+            self._free = self._left[i]
+            self._value[i] = value
+            self._left[i] = NIL
+            self._right[i] = NIL
+            self._height[i] = 1
+            self._size[i] = 1
+            return i
+        self._key.append(key)
+        self._value.append(value)
+        self._left.append(NIL)
+        self._right.append(NIL)
+        self._height.append(1)
+        self._size.append(1)
+        return len(self._key) - 1
+
+    def _free_slot(self, i):
+        self._value[i] = None
+        self._left[i] = self._free
+        self._free = i
+
+    # ----------------------------------------------------------------------
+    # ---- BALANCING ----
+    # ----------------------------------------------------------------------
+    def _update(self, i):
+        left, right, height = self._left[i], self._right[i], self._height
+        self._height[i] = 1 + max(height[left], height[right])
+        self._size[i] = 1 + self._size[left] + self._size[right]
+
+    def _balance_factor(self, i):
+        return self._height[self._left[i]] - self._height[self._right[i]]
+
+    def _right_rotate(self, y):
+        x = self._left[y]
+        self._left[y] = self._right[x]
+        self._right[x] = y
+        self._update(y)
+        self._update(x)
+        return x
+
+    def _left_rotate(self, x):
+        y = self._right[x]
+        self._right[x] = self._left[y]
+        self._left[y] = x
+        self._update(x)
+        self._update(y)
+        return y
+
+    # Recompute node i after a change below it and rotate if it is out of
+    # balance; returns the root of its subtree. These are the four cases of
+    # avl.delete(), which also cover insertion.
+    def _rebalance(self, i):
+        self._update(i)
+        balance = self._balance_factor(i)
+        if balance > 1:
+            if self._balance_factor(self._left[i]) < 0:
+                self._left[i] = self._left_rotate(self._left[i])
+            return self._right_rotate(i)
+        if balance < -1:
+            if self._balance_factor(self._right[i]) > 0:
+                self._right[i] = self._right_rotate(self._right[i])
+            return self._left_rotate(i)
+        return i
+
+    # 'path' holds (node, went_left) from the root down, and 'sub' is the
+    # new subtree hanging below its last node, which gained or lost one key
+    # (delta = +1 / -1): relink and rebalance upwards. Once a node keeps its
+    # place and its height, nothing above it changes shape and only the
+    # subtree sizes are left to adjust.
+    def _retrace(self, path, sub, delta):
+        height, size = self._height, self._size
+        for depth in range(len(path) - 1, -1, -1):
+            i, went_left = path[depth]
+            if went_left:
+                self._left[i] = sub
+            else:
+                self._right[i] = sub
+            old_height = height[i]
+            sub = self._rebalance(i)
+            if sub == i and height[i] == old_height:
+                for j, _ in path[:depth]:
+                    size[j] += delta
+                return
+        self.root = sub
+
+    # ----------------------------------------------------------------------
+    # ---- INSERT / DELETE / SEARCH ----
+    # ----------------------------------------------------------------------
+    def insert(self, key, value=None):
+        keys, left, right = self._key, self._left, self._right
+        path = []
+        i = self.root
+        while i != NIL:
+            if key < keys[i]:
+                path.append((i, True))
+                i = left[i]
+            elif key > keys[i]:
+                path.append((i, False))
+                i = right[i]
+            else:
+                self._value[i] = value
+                return False
+        self._retrace(path, self._new_slot(key, value), 1)
+        return True
+
+    def delete(self, key):
+        keys, left, right = self._key, self._left, self._right
+        path = []
+        i = self.root
+        while i != NIL and keys[i] != key:
+            went_left = key < keys[i]
+            path.append((i, went_left))
+            i = left[i] if went_left else right[i]
+        if i == NIL:
+            return False
+
+        if left[i] == NIL or right[i] == NIL:
+            sub = left[i] if left[i] != NIL else right[i]
+            self._free_slot(i)
+        else:
+            # Two children: take over the successor's key and value, then
+            # unlink the successor (it has no left child)
+            path.append((i, False))
+            succ = right[i]
+            while left[succ] != NIL:
+                path.append((succ, True))
+                succ = left[succ]
+            keys[i] = keys[succ]
+            self._value[i] = self._value[succ]
+            sub = right[succ]
+            self._free_slot(succ)
+        self._retrace(path, sub, -1)
+        return True
+
+    def _find(self, key):
+        keys, left, right = self._key, self._left, self._right
+        i = self.root
+        while i != NIL:
+            k = keys[i]
+            if key < k:
+                i = left[i]
+            elif key > k:
+                i = right[i]
+            else:
+                return i
+        return NIL
+
+    def search(self, key):
+        return self._find(key) != NIL
+
+    def get(self, key, default=None):
+        i = self._find(key)
+        return default if i == NIL else self._value[i]
+
+    # Replace the contents with ascending unique keys. Slots are handed out
+    # in key order, so the key column is just the sorted keys. The columns
+    # are built aside and swapped in at the end, so a key the key column
+    # rejects leaves the tree as it was.
+    def _load_sorted(self, keys, values):
+        key = array(self.typecode, [0])
+        key.extend(keys)
+        count = len(keys)
+        left = array('i', [NIL]) * (count + 1)
+        right = array('i', [NIL]) * (count + 1)
+        height = array('b', bytes(count + 1))
+        size = array('i', [0]) * (count + 1)
+        root = self._build(left, right, height, size, 1, count + 1)
+        self._key, self._value = key, [None, *values]
+        self._left, self._right, self._height, self._size = left, right, height, size
+        self.root = root
+        self._free = NIL
+
+    # Link slots lo..hi-1 into a balanced subtree and return its root
+    def _build(self, left, right, height, size, lo, hi):
+        if lo >= hi:
+            return NIL
+        mid = (lo + hi) // 2
+        left[mid] = self._build(left, right, height, size, lo, mid)
+        right[mid] = self._build(left, right, height, size, mid + 1, hi)
+        height[mid] = 1 + max(height[left[mid]], height[right[mid]])
+        size[mid] = hi - lo
+        return mid
+
+    def _snapshot_meta(self):
+        return {"typecode": self.typecode}
+
+    # ----------------------------------------------------------------------
+    # ---- ORDER STATISTICS ----
+    # ----------------------------------------------------------------------
+    def rank(self, key):
+        """Number of keys smaller than key"""
+        smaller = 0
+        i = self.root
+        while i != NIL:
+            if key <= self._key[i]:
+                i = self._left[i]
+            else:
+                smaller += self._size[self._left[i]] + 1
+                i = self._right[i]
+        return smaller
+
+    def select(self, i):
+        """The i-th smallest key (0-based; negative i counts from the end)"""
+        total = len(self)
+        if i < 0:
+            i += total
+        if not 0 <= i < total:
+            raise IndexError("select index out of range")
+        node = self.root
+        while True:
+            left = self._size[self._left[node]]
+            if i < left:
+                node = self._left[node]
+            elif i == left:
+                return self._key[node]
+            else:
+                i -= left + 1
+                node = self._right[node]
+
+    def count(self, lo=None, hi=None):
+        """Number of keys k with lo <= k < hi (None = unbounded)"""
+        upper = len(self) if hi is None else self.rank(hi)
+        lower = 0 if lo is None else self.rank(lo)
+        return max(0, upper - lower)
+
+    def cursor(self, items=False):
+        return Cursor(self, items)
+
+    # Bytes used by the columns (not counting the value objects themselves)
+    def column_bytes(self):
+        columns = (self._key, self._left, self._right, self._height, self._size)
+        total = sum(len(column) * column.itemsize for column in columns)
+        return total + 8 * len(self._value)
+
+
+# ----------------------------------------------------------------------
+# ---- CURSOR ----
+# ----------------------------------------------------------------------
+# A PathCursor (see ordered.py) over slot numbers, with NIL for "no child"
+class Cursor(PathCursor):
+    def __init__(self, tree, items=False):
+        super().__init__(tree.root, tree._left.__getitem__, tree._right.__getitem__,
+                         tree._key.__getitem__, tree._value.__getitem__, items, NIL)
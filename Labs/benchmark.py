@@ -0,0 +1,311 @@
+# Benchmarks for the lab tree implementations
+# Usage: python benchmark.py {rb,bulk,btree-degree} [--keys N] [--seed S]
+#        python benchmark.py suite [--trees ...] [--sizes ...] [--patterns ...]
+#                                  [--output report.json]   (see bench_suite)
+import argparse
+import random
+import sys
+import time
+import timeit
+
+import tree_loader
+
+
+def timed(fn, keys):
+    """Call fn once per key and return the elapsed seconds"""
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return time.perf_counter() - start
+
+def report(name, n, seconds):
+    print(f"  {name:<22} {seconds:8.3f} s  {n / seconds:12,.0f} ops/s")
+
+# ----------------------------------------------------------------------
+# ---- RED-BLACK TREE ----
+# ----------------------------------------------------------------------
+def rb_height(tree):
+    """Height of a RedBlackTree, counted without recursion"""
+    best = 0
+    stack = [(tree.root, 1)] if tree.root is not tree.nil else []
+    while stack:
+        node, depth = stack.pop()
+        best = max(best, depth)
+        for child in (node.left, node.right):
+            if child is not tree.nil:
+                stack.append((child, depth + 1))
+    return best
+
+def bench_rb(n, seed):
+    rb = tree_loader.load("rb")
+    keys = list(range(n))
+    random.Random(seed).shuffle(keys)
+
+    print(f"Red-Black tree, {n:,} keys")
+
+    # Per-node footprint: slotted node vs the old 5-entry dict node
+    slotted = sys.getsizeof(rb.Node(0))
+    as_dict = sys.getsizeof({"key": 0, "color": "R", "left": None, "right": None, "parent": None})
+    print(f"  node size: {slotted} bytes slotted, {as_dict} bytes as a dict")
+
+    # Cost of one sentinel check: identity vs dict equality
+    tree = rb.RedBlackTree()
+    node = tree.create_node(1)
+    dict_node = {"key": 1, "color": "R", "left": None, "right": None, "parent": None}
+    dict_nil = {"key": None, "color": "B", "left": None, "right": None, "parent": None}
+    loops = 1_000_000
+    is_cost = timeit.timeit("node is NIL", globals={"node": node, "NIL": tree.nil}, number=loops)
+    eq_cost = timeit.timeit("node != NIL", globals={"node": dict_node, "NIL": dict_nil}, number=loops)
+    print(f"  sentinel check: {is_cost / loops * 1e9:.1f} ns by identity, "
+          f"{eq_cost / loops * 1e9:.1f} ns by dict equality")
+
+    for label, order in (("sequential", sorted(keys)), ("random", keys)):
+        tree = rb.RedBlackTree()
+        report(f"insert ({label})", n, timed(tree.insert, order))
+        print(f"  height {rb_height(tree)} (red-black bound: at most {2 * (n + 1).bit_length()})")
+        report(f"delete ({label})", n, timed(tree.delete, order))
+
+# ----------------------------------------------------------------------
+# ---- BULK LOADING (BST / AVL) ----
+# ----------------------------------------------------------------------
+def bench_bulk(n, seed):
+    keys = list(range(n))
+    random.Random(seed).shuffle(keys)
+
+    for name in ("bst", "avl"):
+        module = tree_loader.load(name)
+        print(f"{name.upper()}, {n:,} keys")
+
+        start = time.perf_counter()
+        module.bulk_load(keys)
+        report("bulk_load (random)", n, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        module.from_sorted(range(n))
+        report("from_sorted", n, time.perf_counter() - start)
+
+        root = None
+        start = time.perf_counter()
+        for key in keys:
+            root = module.insert(root, key)
+        report("insert one by one", n, time.perf_counter() - start)
+
+# ----------------------------------------------------------------------
+# ---- B-TREE DEGREE SWEEP ----
+# ----------------------------------------------------------------------
+BTREE_DEGREES = (2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+def btree_height(tree):
+    height = 1
+    node = tree.root
+    while not node['leaf']:
+        node = node['children'][0]
+        height += 1
+    return height
+
+def bench_btree_degree(n, seed):
+    btree = tree_loader.load("btree")
+    keys = list(range(n))
+    random.Random(seed).shuffle(keys)
+    lookups = keys[:]
+    random.Random(seed + 1).shuffle(lookups)
+
+    print(f"B-tree degree sweep, {n:,} random keys")
+    print(f"  {'t':>5} {'height':>6} {'insert ops/s':>14} {'search ops/s':>14}")
+    results = []
+    for t in BTREE_DEGREES:
+        tree = btree.BTree(t)
+        insert_rate = n / timed(tree.insert, keys)
+        search_rate = n / timed(tree.search, lookups)
+        results.append((t, insert_rate, search_rate))
+        print(f"  {t:>5} {btree_height(tree):>6} {insert_rate:>14,.0f} {search_rate:>14,.0f}")
+
+    best_insert = max(results, key=lambda row: row[1])
+    best_search = max(results, key=lambda row: row[2])
+    print(f"  peak insert at t={best_insert[0]}, peak search at t={best_search[0]}")
+
+# ----------------------------------------------------------------------
+# ---- WORKLOAD SUITE (JSON) ----
+# ----------------------------------------------------------------------
+# Every (tree, size, key pattern) case runs in a fresh worker process, so
+# its peak RSS is its own and a case that runs too long can be stopped.
+# A case inserts n keys, looks n keys up, runs n mixed operations, then
+# deletes n keys, each in the case's key pattern:
+#   sequential  0, 1, 2, ...
+#   random      the same keys shuffled
+#   zipf        n draws from a Zipf distribution over the keys (a few hot
+#               keys, a long tail), so keys repeat and some never appear
+# Latency is timed on up to LATENCY_SAMPLES evenly spread operations per
+# phase; ops/s comes from the whole phase.
+SUITE_TREES = ("bst", "avl", "rb", "btree")
+SUITE_PATTERNS = ("sequential", "random", "zipf")
+SUITE_SIZES = (1_000, 10_000, 100_000)
+# Pairs that degenerate to a linked list and go quadratic: cases above the cap
+# are recorded as skipped instead of running out the whole timeout
+SUITE_SIZE_CAPS = {("bst", "sequential"): 10_000}
+LATENCY_SAMPLES = 100_000
+MIXED_READS = 0.8       # share of lookups in the mixed phase; the rest split insert/delete
+
+def tree_height(kind, tree):
+    if kind == "rb":
+        return rb_height(tree)
+    if kind == "btree":
+        return btree_height(tree)
+    # BST and AVL: dictionary nodes
+    best = 0
+    stack = [(tree.root, 1)] if tree.root is not None else []
+    while stack:
+        node, depth = stack.pop()
+        best = max(best, depth)
+        for child in (node["left"], node["right"]):
+            if child is not None:
+                stack.append((child, depth + 1))
+    return best
+
+def pattern_keys(pattern, n, rng, zipf_s):
+    if pattern == "sequential":
+        return list(range(n))
+    keys = list(range(n))
+    rng.shuffle(keys)
+    if pattern == "random":
+        return keys
+    # Rank r (1-based) is drawn with weight 1 / r**s; rank r is keys[r - 1]
+    cumulative = []
+    total = 0.0
+    for rank in range(1, n + 1):
+        total += rank ** -zipf_s
+        cumulative.append(total)
+    return rng.choices(keys, cum_weights=cumulative, k=n)
+
+def run_phase(calls):
+    """Run a list of (fn, key) calls; returns ops/s and latency percentiles"""
+    step = max(1, len(calls) // LATENCY_SAMPLES)
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for i, (fn, key) in enumerate(calls):
+        if i % step:
+            fn(key)
+        else:
+            begin = clock()
+            fn(key)
+            latencies.append(clock() - begin)
+    elapsed = (clock() - start) / 1e9
+    latencies.sort()
+    return {
+        "ops_per_sec": round(len(calls) / elapsed) if elapsed else None,
+        "p50_us": round(latencies[len(latencies) // 2] / 1000, 3),
+        "p99_us": round(latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] / 1000, 3),
+    }
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+def run_case(kind, n, pattern, seed, zipf_s):
+    rng = random.Random(seed)
+    keys = pattern_keys(pattern, n, rng, zipf_s)
+    lookups = pattern_keys(pattern, n, rng, zipf_s)
+    base_rss = peak_rss_mb()
+
+    tree = tree_loader.make_tree(kind)
+    result = {"tree": kind, "keys": n, "pattern": pattern}
+    phases = result["phases"] = {}
+    phases["insert"] = run_phase([(tree.insert, key) for key in keys])
+    result["size"] = len(tree)
+    result["height"] = tree_height(kind, tree)
+    phases["lookup"] = run_phase([(tree.search, key) for key in lookups])
+
+    writes = (tree.insert, tree.delete)
+    mixed = []
+    for i, key in enumerate(pattern_keys(pattern, n, rng, zipf_s)):
+        mixed.append((tree.search if rng.random() < MIXED_READS else writes[i % 2], key))
+    phases["mixed"] = run_phase(mixed)
+    phases["delete"] = run_phase([(tree.delete, key) for key in keys])
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["base_rss_mb"] = base_rss
+    return result
+
+def bench_suite(trees, sizes, patterns, seed, zipf_s, timeout, output):
+    import json
+    import multiprocessing
+    import platform
+
+    summary = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "zipf_s": zipf_s,
+        "results": [],
+    }
+    for n in sizes:
+        for kind in trees:
+            for pattern in patterns:
+                print(f"{kind} {pattern} {n:,} keys", file=sys.stderr)
+                case = {"tree": kind, "keys": n, "pattern": pattern}
+                cap = SUITE_SIZE_CAPS.get((kind, pattern))
+                if cap is not None and n > cap:
+                    case["skipped"] = f"degenerate above {cap:,} keys"
+                    summary["results"].append(case)
+                    continue
+                pool = multiprocessing.Pool(1)
+                try:
+                    case = pool.apply_async(run_case, (kind, n, pattern, seed, zipf_s)).get(timeout)
+                except multiprocessing.TimeoutError:
+                    case["error"] = f"timed out after {timeout} s"
+                except Exception as error:
+                    case["error"] = f"{type(error).__name__}: {error}"
+                finally:
+                    pool.terminate()
+                    pool.join()
+                summary["results"].append(case)
+
+    text = json.dumps(summary, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lab tree implementations")
+    parser.add_argument("workload", choices=["rb", "bulk", "btree-degree", "suite"])
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    suite = parser.add_argument_group("suite options")
+    suite.add_argument("--trees", default=",".join(SUITE_TREES),
+                       help="comma-separated tree types (default: %(default)s)")
+    suite.add_argument("--sizes", default=",".join(map(str, SUITE_SIZES)),
+                       help="comma-separated key counts, e.g. 1e3,1e5,1e7 (default: %(default)s)")
+    suite.add_argument("--patterns", default=",".join(SUITE_PATTERNS),
+                       help="comma-separated key patterns (default: %(default)s)")
+    suite.add_argument("--zipf-s", type=float, default=1.0, help="Zipf exponent (default: 1.0)")
+    suite.add_argument("--timeout", type=float, default=600,
+                       help="seconds allowed per case (default: 600)")
+    suite.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.workload == "rb":
+        bench_rb(args.keys, args.seed)
+    elif args.workload == "bulk":
+        bench_bulk(args.keys, args.seed)
+    elif args.workload == "btree-degree":
+        bench_btree_degree(args.keys, args.seed)
+    elif args.workload == "suite":
+        trees = args.trees.split(",")
+        patterns = args.patterns.split(",")
+        for name, chosen, known in (("tree", trees, SUITE_TREES), ("pattern", patterns, SUITE_PATTERNS)):
+            for item in chosen:
+                if item not in known:
+                    parser.error(f"unknown {name} {item!r} (choose from {', '.join(known)})")
+        sizes = [int(float(size)) for size in args.sizes.split(",")]
+        bench_suite(trees, sizes, patterns, args.seed, args.zipf_s, args.timeout, args.output)
+
+
+if __name__ == "__main__":
+    main()
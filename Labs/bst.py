@@ -1,27 +1,58 @@
+from operator import itemgetter
+
+from ordered import MISSING, OrderedMixin, PathCursor, find_sorted, sort_batch, unique_sorted
+
 # Function to create a new node
-def create_node(value):
-    return {"data": value, "left": None, "right": None}
+# "data" is the value the tree is ordered by; "payload" is anything stored with it
+def create_node(value, payload=None):
+    return {"data": value, "payload": payload, "left": None, "right": None}
 
 # Function to insert a new value into the BST
-def insert(root, value):
+# (iterative, so a degenerate tree from sorted input cannot hit the recursion limit)
+# Inserting a value that is already there replaces its payload.
+def insert(root, value, payload=None):
+    return _insert(root, value, payload)[0]
+
+# The same in one walk, returning (root, True if the value was new)
+def _insert(root, value, payload=None):
     if root is None:
-        return create_node(value)
-    if value < root["data"]:
-        root["left"] = insert(root["left"], value)
-    elif value > root["data"]:
-        root["right"] = insert(root["right"], value)
-    return root
+        return create_node(value, payload), True
+    cur = root
+    while True:
+        if value < cur["data"]:
+            if cur["left"] is None:
+                cur["left"] = create_node(value, payload)
+                return root, True
+            cur = cur["left"]
+        elif value > cur["data"]:
+            if cur["right"] is None:
+                cur["right"] = create_node(value, payload)
+                return root, True
+            cur = cur["right"]
+        else:
+            cur["payload"] = payload
+            return root, False
+
+# Function to find the node holding a value (None if it is not there)
+def find(root, value):
+    cur = root
+    while cur is not None:
+        if cur["data"] == value:
+            return cur
+        elif value < cur["data"]:
+            cur = cur["left"]
+        else:
+            cur = cur["right"]
+    return None
 
 # Function to search for a value in the BST
 def search(root, value):
-    if root is None:
-        return False
-    if root["data"] == value:
-        return True
-    elif value < root["data"]:
-        return search(root["left"], value)
-    else:
-        return search(root["right"], value)
+    return find(root, value) is not None
+
+# Batched lookup (see ordered.find_sorted)
+# Returns the matching node (or None) for each value, in the order given.
+def find_many(root, values):
+    return find_sorted(root, values, itemgetter("left"), itemgetter("right"), itemgetter("data"))
 
 # Helper to find minimum node (used in deletion)
 def find_min(root):
@@ -31,30 +62,74 @@ def find_min(root):
 
 # Function to delete a value from the BST
 def delete(root, value):
-    if root is None:
-        return None
-    if value < root["data"]:
-        root["left"] = delete(root["left"], value)
-    elif value > root["data"]:
-        root["right"] = delete(root["right"], value)
+    return _delete(root, value)[0]
+
+# The same in one walk, returning (root, True if the value was there)
+def _delete(root, value):
+    parent = None
+    cur = root
+    while cur is not None and cur["data"] != value:
+        parent = cur
+        cur = cur["left"] if value < cur["data"] else cur["right"]
+    if cur is None:
+        return root, False
+
+    # Node with two children: copy the successor up, then unlink the successor
+    if cur["left"] is not None and cur["right"] is not None:
+        succ_parent = cur
+        succ = cur["right"]
+        while succ["left"] is not None:
+            succ_parent = succ
+            succ = succ["left"]
+        cur["data"] = succ["data"]
+        cur["payload"] = succ["payload"]
+        parent, cur = succ_parent, succ
+
+    # Node with at most one child
+    child = cur["left"] if cur["left"] is not None else cur["right"]
+    if parent is None:
+        return child, True
+    if parent["left"] is cur:
+        parent["left"] = child
     else:
-        # Node found
-        if root["left"] is None:
-            return root["right"]
-        elif root["right"] is None:
-            return root["left"]
-        # Node with two children
-        temp = find_min(root["right"])
-        root["data"] = temp["data"]
-        root["right"] = delete(root["right"], temp["data"])
-    return root
+        parent["right"] = child
+    return root, True
+
+# Bulk loading
+# Build a height-balanced BST straight from sorted values in O(n),
+# instead of one insert (and one descent) per value
+# (payloads, if given, line up with values; see ordered.unique_sorted)
+def from_sorted(values, payloads=None):
+    values, payloads = unique_sorted(values, payloads)
+    return _build_balanced(values, payloads, 0, len(values))
+
+# Build from values in any order (Timsort is linear on presorted input)
+def bulk_load(values, payloads=None):
+    values, payloads = sort_batch(values, payloads)
+    return _build_balanced(values, payloads, 0, len(values))
+
+def _build_balanced(values, payloads, lo, hi):
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    node = create_node(values[mid], payloads[mid])
+    node["left"] = _build_balanced(values, payloads, lo, mid)
+    node["right"] = _build_balanced(values, payloads, mid + 1, hi)
+    return node
 
 # Traversals
+# inorder is a generator driven by an explicit stack, so it needs no
+# recursion and yields values instead of printing them
 def inorder(root):
-    if root:
-        inorder(root["left"])
-        print(root["data"], end=" ")
-        inorder(root["right"])
+    stack = []
+    cur = root
+    while stack or cur is not None:
+        while cur is not None:
+            stack.append(cur)
+            cur = cur["left"]
+        cur = stack.pop()
+        yield cur["data"]
+        cur = cur["right"]
 
 # def preorder(root):
 #     if root:
@@ -68,41 +143,97 @@ def inorder(root):
 #         postorder(root["right"])
 #         print(root["data"], end=" ")
 
+# ---------------- Cursor and tree object ----------------
+# A PathCursor (see ordered.py) over the dictionary nodes
+class Cursor(PathCursor):
+    def __init__(self, root, items=False):
+        super().__init__(root, itemgetter("left"), itemgetter("right"),
+                         itemgetter("data"), itemgetter("payload"), items)
+
+class BinarySearchTree(OrderedMixin):
+    """A BST object holding its root; the functions above do the work"""
+
+    def __init__(self, root=None):
+        self.root = root
+        self.size = sum(1 for _ in inorder(root))
+
+    @classmethod
+    def from_sorted(cls, keys, values=None):
+        return cls(from_sorted(keys, values))
+
+    @classmethod
+    def bulk_load(cls, keys, values=None):
+        return cls(bulk_load(keys, values))
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, key, value=None):
+        self.root, added = _insert(self.root, key, value)
+        self.size += added
+        return added
+
+    def delete(self, key):
+        self.root, removed = _delete(self.root, key)
+        self.size -= removed
+        return removed
+
+    def search(self, key):
+        return search(self.root, key)
+
+    def get(self, key, default=None):
+        node = find(self.root, key)
+        return default if node is None else node["payload"]
+
+    def __contains__(self, key):
+        return search(self.root, key)
+
+    def __iter__(self):
+        return inorder(self.root)
+
+    def _lookup_many(self, keys):
+        return [MISSING if node is None else node["payload"] for node in find_many(self.root, keys)]
+
+    def _load_sorted(self, keys, values):
+        self.root = from_sorted(keys, values)
+        self.size = len(keys)
+
+    def cursor(self, items=False):
+        return Cursor(self.root, items)
+
 # ---------------- Main Program ----------------
-root = None
+if __name__ == "__main__":
+    tree = BinarySearchTree()
 
-print("Binary Search Tree Operations")
-print("Options: 1:insert, 2:search, 3:delete, 4:inorder,5: exit")
+    print("Binary Search Tree Operations")
+    print("Options: 1:insert, 2:search, 3:delete, 4:inorder,5: exit")
 
-while True:
-    choice = input("\nEnter operation: ").lower()
+    while True:
+        choice = input("\nEnter operation: ").lower()
 
-    if choice == "1":
-        print("Enter numbers to insert into tree :")
-        nums=list(map(int,input().split()))
-        for num in nums:
-          root=insert(root,num)
+        if choice == "1":
+            print("Enter numbers to insert into tree :")
+            nums=list(map(int,input().split()))
+            tree.insert_many(nums)
 
-    elif choice == "2":
-        val = int(input("Enter value to search: "))
-        if search(root, val):
-            print(val, "is found in BST.")
-        else:
-            print(val, "is NOT found in BST.")
+        elif choice == "2":
+            val = int(input("Enter value to search: "))
+            if tree.search(val):
+                print(val, "is found in BST.")
+            else:
+                print(val, "is NOT found in BST.")
 
-    elif choice == "3":
-        val = int(input("Enter value to delete: "))
-        root = delete(root, val)
-        print(val, "deleted (if it existed).")
+        elif choice == "3":
+            val = int(input("Enter value to delete: "))
+            tree.delete(val)
+            print(val, "deleted (if it existed).")
 
-    elif choice == "4":
-        print("Inorder traversal:", end=" ")
-        inorder(root)
-        print()
+        elif choice == "4":
+            print("Inorder traversal:", *tree)
 
-    elif choice == "5":
-        print("Exiting program.")
-        break
+        elif choice == "5":
+            print("Exiting program.")
+            break
 
-    else:
-        print("Invalid choice! Try again.")
+        else:
+            print("Invalid choice! Try again.")
@@ -1,3 +1,10 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # optional: ImplicitTree falls back to plain Python
+
 # Create a new node as a dictionary
 def make_node(value):
     return {"data": value, "left": None, "right": None}
@@ -40,16 +47,107 @@ def print_tree(root, space=0, level_space=5):
     print(" " * (space - level_space) + str(root["data"]))
     print_tree(root["left"], space)
 
+# -------- Implicit (array) tree --------
+# The level-order array already is the tree: node i has children 2*i+1 and
+# 2*i+2 and parent (i-1)//2. ImplicitTree keeps the array as it is and
+# gets each traversal as a permutation of indices, from where every node
+# sits in the perfect tree of the same height. For node i at depth d, the
+# j-th node of its level, in a tree of h levels (span = 2**(h-d)):
+#   inorder    (2j + 1) * span/2 - 1
+#   preorder   d + j * span - popcount(j)
+#   postorder  j * span - popcount(j) + span - 2
+# An array that stops part-way through its last level is the perfect tree
+# with some bottom nodes missing, and that keeps the others in the same
+# order: scatter the indices to their positions and drop the holes.
+# With NumPy each level is a few vector operations and the traversal is a
+# single gather, values[order]; without it the same arithmetic runs in
+# plain Python. Either way there is no recursion and no list copying.
+_POSITION = {
+    "inorder": lambda d, j, ones, span: (2 * j + 1) * (span // 2) - 1,
+    "preorder": lambda d, j, ones, span: d + j * span - ones,
+    "postorder": lambda d, j, ones, span: j * span - ones + span - 2,
+}
+
+def traversal_order(n, kind="inorder"):
+    """Indices of an n-node level-order array in inorder, preorder or
+    postorder: a NumPy int64 array if NumPy is installed, else array('q')"""
+    position = _POSITION[kind]
+    h = n.bit_length()
+    if np is not None:
+        slots = np.full((1 << h) - 1, -1, dtype=np.int64)
+        ones = np.zeros(1, dtype=np.int64)  # popcount(j) for every j of the level
+        for d in range(h):
+            first = (1 << d) - 1
+            count = min(1 << d, n - first)
+            j = np.arange(count, dtype=np.int64)
+            slots[position(d, j, ones[:count], 1 << (h - d))] = j + first
+            if d + 1 < h:
+                ones = np.concatenate((ones, ones + 1))
+        return slots[slots >= 0]
+
+    slots = [-1] * ((1 << h) - 1)
+    ones = [0]
+    for d in range(h):
+        first = (1 << d) - 1
+        span = 1 << (h - d)
+        for j in range(min(1 << d, n - first)):
+            slots[position(d, j, ones[j], span)] = j + first
+        if d + 1 < h:
+            ones += [count + 1 for count in ones]
+    return array('q', [i for i in slots if i >= 0])
+
+class ImplicitTree:
+    """A binary tree stored as its level-order array (a list, an array or a
+    NumPy array), which is used as is, without building nodes"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def height(self):
+        return len(self.values).bit_length()
+
+    def left(self, i):
+        return 2 * i + 1 if 2 * i + 1 < len(self.values) else None
+
+    def right(self, i):
+        return 2 * i + 2 if 2 * i + 2 < len(self.values) else None
+
+    def parent(self, i):
+        return (i - 1) // 2 if i > 0 else None
+
+    # A NumPy array of values gives a NumPy array back; anything else a list
+    def _gather(self, order):
+        values = self.values
+        if np is not None:
+            if isinstance(values, np.ndarray):
+                return values[order]
+            return np.asarray(values, dtype=object)[order].tolist()
+        return [values[i] for i in order]
+
+    def inorder(self):
+        return self._gather(traversal_order(len(self.values), "inorder"))
+
+    def preorder(self):
+        return self._gather(traversal_order(len(self.values), "preorder"))
+
+    def postorder(self):
+        return self._gather(traversal_order(len(self.values), "postorder"))
+
 
 # -------- Main Program --------
-print("Enter elements of the Binary Tree (space separated):")
-arr = list(map(int, input().split()))
+if __name__ == "__main__":
+    print("Enter elements of the Binary Tree (space separated):")
+    arr = list(map(int, input().split()))
 
-root = insert_level_order(arr, 0, len(arr))
+    root = insert_level_order(arr, 0, len(arr))
 
-print("\nBinary Tree Structure:")
-print_tree(root)
+    print("\nBinary Tree Structure:")
+    print_tree(root)
 
-print("\nInorder Traversal:", inorder(root))
-print("Preorder Traversal:", preorder(root))
-print("Postorder Traversal:", postorder(root))
+    tree = ImplicitTree(arr)
+    print("\nInorder Traversal:", tree.inorder())
+    print("Preorder Traversal:", tree.preorder())
+    print("Postorder Traversal:", tree.postorder())
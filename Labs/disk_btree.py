@@ -0,0 +1,440 @@
+# Disk-backed B-Tree
+# DiskBTree is the B-Tree from "B-tree.py" with its nodes stored as
+# fixed-size pages of one file, accessed through mmap. Opening a file only
+# maps it and reads the header page, so a large index opens at once and
+# the OS faults in just the pages a search or update touches.
+#
+# Keys and values are signed 64-bit integers. A missing value (None) is
+# stored as NO_VALUE, the smallest int64, which is not accepted as a value.
+# Each page holds one node:
+#   leaf flag, key count              2 x uint32
+#   keys[2t-1], values[2t-1]          int64 each
+#   children[2t]                      int64 page numbers
+# and is rounded up to a power of two so that with the default degree one
+# node is exactly one 4 KiB OS page. Page 0 is the file header; pages
+# dropped by merges are kept on a free list and reused.
+#
+# The insert/delete code (split_child, merge, borrow_prev/borrow_next,
+# fill, ...) is the B-tree's own: a page is decoded into a dict node whose
+# 'keys' and 'values' are arrays and whose 'children' list holds page
+# numbers.
+#
+# Decoded nodes live in a buffer pool (see "BUFFER POOL" below) so hot
+# upper levels are not decoded again on every search. Changes reach the
+# file when a dirty page is evicted, and all of them on flush()/close().
+import mmap
+import os
+import struct
+from array import array
+from collections import OrderedDict
+
+import tree_loader
+from ordered import MISSING, sort_batch
+from snapshot import read_snapshot
+
+btree = tree_loader.load("btree")
+
+# Degree that fills a 4 KiB page: 8 + 8 * (6t - 2) <= 4096
+DISK_T_VALUE = 85
+
+MAGIC = b"LABBTREE"
+VERSION = 2
+# magic, version, t, root page, key count, pages in use, free list head
+FILE_HEADER = struct.Struct("<8sIIqqqq")
+# leaf flag, key count
+NODE_HEADER = struct.Struct("<II")
+INT64 = struct.Struct("<q")
+
+# Stored in place of a None value
+NO_VALUE = -(1 << 63)
+
+# Pages the file starts with; it doubles whenever it runs out
+INITIAL_PAGES = 16
+
+# Default buffer pool budget, in bytes of pages
+CACHE_BYTES = 64 * 1024 * 1024
+
+
+def page_size_for(t):
+    used = NODE_HEADER.size + 8 * (2 * (2 * t - 1) + 2 * t)
+    size = max(used, FILE_HEADER.size)
+    return 1 << (size - 1).bit_length()
+
+
+# A node read from a page: the same dictionary layout as create_b_tree_node(),
+# remembering which page it came from
+class Page(dict):
+    __slots__ = ("page_no",)
+
+
+# The 'children' list of a Page. It stores page numbers and hands out the
+# child nodes, so the B-tree code can index, slice, insert, pop and extend
+# it exactly like a list of nodes.
+class ChildList:
+    __slots__ = ("tree", "pages")
+
+    def __init__(self, tree, pages=()):
+        self.tree = tree
+        self.pages = array('q', pages)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return ChildList(self.tree, self.pages[i])
+        return self.tree._node(self.pages[i])
+
+    def __delitem__(self, i):
+        del self.pages[i]
+
+    def __iter__(self):
+        for page_no in self.pages:
+            yield self.tree._node(page_no)
+
+    def insert(self, i, node):
+        self.pages.insert(i, node.page_no)
+
+    def append(self, node):
+        self.pages.append(node.page_no)
+
+    def extend(self, other):
+        self.pages.extend(other.pages)
+
+    def pop(self, i=-1):
+        return self.tree._node(self.pages.pop(i))
+
+
+class DiskBTree(btree.BTree):
+    """A B-Tree kept in the file at 'path', created with degree t if the
+    file is new or empty, caching up to cache_bytes of pages in memory.
+    Use close() (or a with block) when done."""
+
+    def __init__(self, path, t=None, cache_bytes=CACHE_BYTES):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "w+b" if new else "r+b")
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()   # page number -> node, least recent first
+        self._dirty = set()           # cached pages that differ from the file
+        self._touched = None          # pages used by the running update
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if new:
+            t = DISK_T_VALUE if t is None else t
+            if t < 2:
+                self.file.close()
+                raise ValueError("the minimum degree t must be at least 2")
+            self.t = t
+            self.page_size = page_size_for(t)
+            self.file.truncate(INITIAL_PAGES * self.page_size)
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+            self.size = 0
+            self._page_count = 1
+            self._free_head = 0
+            self._begin()
+            self.root = self._new_node(is_leaf=True)
+            self._commit()
+            self.flush()
+        else:
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+            magic, version, file_t, root, size, pages, free = FILE_HEADER.unpack_from(self.mm, 0)
+            error = None
+            if magic != MAGIC or version != VERSION:
+                error = f"{path} is not a B-tree file"
+            elif t is not None and t != file_t:
+                error = f"{path} was created with t={file_t}, not t={t}"
+            if error:
+                # Leave the file untouched: no flush()
+                self.mm.close()
+                self.file.close()
+                raise ValueError(error)
+            self.t = file_t
+            self.page_size = page_size_for(file_t)
+            self._root_page = root
+            self.size = size
+            self._page_count = pages
+            self._free_head = free
+
+    # Build a tree in the file at 'path' (replacing what it held) from keys
+    # in ascending order, or from keys in any order
+    @classmethod
+    def from_sorted(cls, path, keys, values=None, *, t=None, fill_factor=1.0, cache_bytes=CACHE_BYTES):
+        tree = cls(path, t, cache_bytes)
+        try:
+            tree._load_sorted(keys, values, fill_factor)
+        except BaseException:
+            tree.close()
+            raise
+        return tree
+
+    @classmethod
+    def bulk_load(cls, path, keys, values=None, *, t=None, fill_factor=1.0, cache_bytes=CACHE_BYTES):
+        keys, values = sort_batch(keys, values)
+        return cls.from_sorted(path, keys, values, t=t, fill_factor=fill_factor,
+                               cache_bytes=cache_bytes)
+
+    # Build a tree in the file at 'path' (replacing what it held) from a
+    # snapshot written by save(); t defaults to the degree of the tree saved
+    @classmethod
+    def load(cls, snapshot, path, *, t=None, cache_bytes=CACHE_BYTES):
+        with open(snapshot, "rb") as f:
+            keys, values, meta = read_snapshot(f)
+        if t is None:
+            t = meta.get("t")
+        return cls.from_sorted(path, keys, values, t=t, cache_bytes=cache_bytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Write every dirty page and the header, and push them to the file
+    def flush(self):
+        for page_no in self._dirty:
+            self._write(self._cache[page_no])
+        self._dirty.clear()
+        FILE_HEADER.pack_into(self.mm, 0, MAGIC, VERSION, self.t, self._root_page,
+                              self.size, self._page_count, self._free_head)
+        self.mm.flush()
+
+    def close(self):
+        if not self.mm.closed:
+            self.flush()
+            self.mm.close()
+        self.file.close()
+
+    # ----------------------------------------------------------------------
+    # ---- PAGES ----
+    # ----------------------------------------------------------------------
+    @property
+    def root(self):
+        return self._node(self._root_page)
+
+    @root.setter
+    def root(self, node):
+        self._root_page = node.page_no
+
+    # Decode the node stored in page 'page_no'
+    def _read(self, page_no):
+        mm = self.mm
+        start = page_no * self.page_size
+        leaf, count = NODE_HEADER.unpack_from(mm, start)
+        slots = 2 * self.t - 1
+        keys_at = start + NODE_HEADER.size
+        values_at = keys_at + 8 * slots
+        children_at = values_at + 8 * slots
+
+        node = Page(t=self.t, leaf=bool(leaf))
+        node.page_no = page_no
+        node['keys'] = array('q', mm[keys_at:keys_at + 8 * count])
+        node['values'] = array('q', mm[values_at:values_at + 8 * count])
+        children = ChildList(self)
+        if not leaf:
+            children.pages.frombytes(mm[children_at:children_at + 8 * (count + 1)])
+        node['children'] = children
+        return node
+
+    def _write(self, node):
+        mm = self.mm
+        start = node.page_no * self.page_size
+        count = len(node['keys'])
+        slots = 2 * self.t - 1
+        keys_at = start + NODE_HEADER.size
+        values_at = keys_at + 8 * slots
+        children_at = values_at + 8 * slots
+
+        NODE_HEADER.pack_into(mm, start, node['leaf'], count)
+        mm[keys_at:keys_at + 8 * count] = node['keys'].tobytes()
+        mm[values_at:values_at + 8 * count] = node['values'].tobytes()
+        if not node['leaf']:
+            children = node['children'].pages
+            mm[children_at:children_at + 8 * len(children)] = children.tobytes()
+
+    def _new_node(self, is_leaf):
+        if self._free_head:
+            page_no = self._free_head
+            self._free_head = INT64.unpack_from(self.mm, page_no * self.page_size)[0]
+        else:
+            page_no = self._page_count
+            self._page_count += 1
+            if self._page_count * self.page_size > len(self.mm):
+                self._grow()
+
+        node = Page(t=self.t, leaf=is_leaf)
+        node.page_no = page_no
+        node['keys'] = array('q')
+        node['values'] = array('q')
+        node['children'] = ChildList(self)
+        self._cache[page_no] = node
+        self._touched.add(page_no)
+        return node
+
+    # Put a dropped page on the free list (its first 8 bytes link to the next)
+    def _free(self, node):
+        self._forget(node.page_no)
+        INT64.pack_into(self.mm, node.page_no * self.page_size, self._free_head)
+        self._free_head = node.page_no
+
+    # Double the file. Nodes are decoded copies, not views into the map,
+    # so it is safe to map the file again.
+    def _grow(self):
+        self.mm.close()
+        self.file.truncate(2 * self._page_count * self.page_size)
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+
+    # ----------------------------------------------------------------------
+    # ---- BUFFER POOL ----
+    # ----------------------------------------------------------------------
+    # Every node access (the root, and each child fetched by search,
+    # insert_non_full, _delete, the cursor, ...) goes through _node(). The
+    # pool keeps the most recently used pages up to cache_bytes and evicts
+    # least recently used first, writing a page back only if it is dirty.
+    #
+    # The B-tree code holds on to nodes while it restructures them, so a page
+    # must stay the same object for a whole update: during one, the pool may
+    # grow past its budget, and it is trimmed when the update ends.
+    def _node(self, page_no):
+        node = self._cache.get(page_no)
+        if node is not None:
+            self.hits += 1
+            self._cache.move_to_end(page_no)
+        else:
+            self.misses += 1
+            node = self._read(page_no)
+            self._cache[page_no] = node
+            if self._touched is None:
+                self._evict()
+        if self._touched is not None:
+            self._touched.add(page_no)
+        return node
+
+    def _evict(self):
+        limit = max(1, self.cache_bytes // self.page_size)
+        cache = self._cache
+        while len(cache) > limit:
+            page_no, node = cache.popitem(last=False)
+            if page_no in self._dirty:
+                self._write(node)
+                self._dirty.discard(page_no)
+            self.evictions += 1
+
+    # Drop a page from the pool without writing it
+    def _forget(self, page_no):
+        self._cache.pop(page_no, None)
+        self._dirty.discard(page_no)
+        if self._touched is not None:
+            self._touched.discard(page_no)
+
+    # An update runs between _begin() and _commit(). The B-tree code changes
+    # nodes in place without saying which, so every page it used is counted
+    # as dirty.
+    def _begin(self):
+        self._touched = set()
+
+    def _commit(self):
+        self._dirty |= self._touched
+        self._touched = None
+        self._evict()
+
+    def cache_info(self):
+        """Buffer pool counters, for sizing cache_bytes against a workload"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pages": len(self._cache),
+            "dirty": len(self._dirty),
+            "bytes": len(self._cache) * self.page_size,
+            "limit": self.cache_bytes,
+        }
+
+    # ----------------------------------------------------------------------
+    # ---- READS ----
+    # ----------------------------------------------------------------------
+    def get(self, key, default=None):
+        value = super().get(key, MISSING)
+        if value is MISSING:
+            return default
+        return None if value == NO_VALUE else value
+
+    def _lookup_many(self, keys):
+        return [None if value == NO_VALUE else value for value in super()._lookup_many(keys)]
+
+    def cursor(self, items=False):
+        return DiskCursor(self, items)
+
+    # ----------------------------------------------------------------------
+    # ---- UPDATES ----
+    # ----------------------------------------------------------------------
+    def insert(self, key, value=None):
+        value = _stored_value(value)
+        # Check the key fits in 64 bits before the tree is touched
+        INT64.pack(key)
+        self._begin()
+        try:
+            return super().insert(key, value)
+        finally:
+            self._commit()
+
+    def delete(self, key):
+        self._begin()
+        try:
+            return super().delete(key)
+        finally:
+            self._commit()
+
+    # Replace the contents with a tree built from sorted keys. The new tree
+    # is built in memory (see build_from_sorted) and then written out page
+    # by page over a fresh file.
+    def _load_sorted(self, keys, values, fill_factor=1.0):
+        # Converting to arrays checks every key and value fits in 64 bits
+        # before the old tree is overwritten
+        keys = array('q', keys)
+        if values is None:
+            values = array('q', [NO_VALUE]) * len(keys)
+        else:
+            values = array('q', [_stored_value(value) for value in values])
+        built = btree.build_from_sorted(keys, self.t, fill_factor, values)
+
+        # Every old page is dropped, dirty or not
+        self._cache.clear()
+        self._dirty.clear()
+        self._page_count = 1
+        self._free_head = 0
+        self._begin()
+        try:
+            self.root = self._store(built)
+            self.size = self.count_keys(built)
+        finally:
+            self._commit()
+
+    def _store(self, built):
+        node = self._new_node(built['leaf'])
+        node['keys'] = array('q', built['keys'])
+        node['values'] = array('q', built['values'])
+        for child in built['children']:
+            node['children'].append(self._store(child))
+        # Written out straight away rather than kept in the pool
+        self._write(node)
+        self._forget(node.page_no)
+        return node
+
+
+# A value as it is kept in a page
+def _stored_value(value):
+    if value is None:
+        return NO_VALUE
+    if value == NO_VALUE:
+        raise ValueError(f"{NO_VALUE} is reserved for a missing value")
+    INT64.pack(value)
+    return value
+
+
+class DiskCursor(btree.Cursor):
+    def _entry(self, node, i):
+        if not self.items:
+            return node['keys'][i]
+        value = node['values'][i]
+        return node['keys'][i], None if value == NO_VALUE else value
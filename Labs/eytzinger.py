@@ -0,0 +1,175 @@
+# Read-only search index in Eytzinger (BFS) order
+# tree.freeze() copies a tree's keys and values into a FrozenIndex: one
+# array of keys laid out like the level-order array of bt.py (the children
+# of slot i are 2*i+1 and 2*i+2) and holding the keys of a complete binary
+# search tree, plus a list of values in the same order. The top of the
+# tree sits together at the front of the array, so the first levels of
+# every search stay in cache, and there are no node objects to chase.
+#
+# Integer keys are stored as int64 and float keys as float64 (array module);
+# any other keys in a plain list. With NumPy installed, search_many() and
+# get_many() search a whole batch of numeric keys at once, one vector step
+# per level.
+#
+# A search walks down with no branch on the comparison,
+#   i = 2*i + 1 + (keys[i] < key)
+# until it falls off the bottom. The first key >= 'key' is then the last
+# slot where the walk went left: with j = i + 1 (1-based numbering), strip
+# the trailing 1 bits of j (the right turns) and the 0 bit above them.
+from array import array
+
+import tree_loader
+from ordered import MISSING, sort_batch
+from snapshot import INT64_MAX, INT64_MIN
+
+bt = tree_loader.load("bt")
+np = bt.np
+
+
+# j >> (trailing ones of j, plus one): the lowest 0 bit of j is ~j & (j + 1)
+def _last_left(j):
+    return j // (2 * (~j & (j + 1)))
+
+
+class FrozenIndex:
+    """An immutable sorted map in Eytzinger layout (see above)"""
+
+    def __init__(self, keys, values=None):
+        keys, values = sort_batch(keys, values)
+        n = len(keys)
+        order = bt.traversal_order(n, "inorder")
+        # Slot order[r] holds the r-th smallest key
+        slot_keys = [None] * n
+        slot_values = [None] * n
+        for rank, slot in enumerate(order):
+            slot_keys[slot] = keys[rank]
+            slot_values[slot] = values[rank]
+        if all(type(key) is int and INT64_MIN <= key <= INT64_MAX for key in keys):
+            slot_keys = array('q', slot_keys)
+        elif all(type(key) is float for key in keys):
+            slot_keys = array('d', slot_keys)
+        self.keys = slot_keys
+        self.values = slot_values
+        self._np_keys = None
+        self._np_values = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return self.search(key)
+
+    def __iter__(self):
+        return self.range()
+
+    # ----------------------------------------------------------------------
+    # ---- SEARCH ----
+    # ----------------------------------------------------------------------
+    def lower_bound(self, key):
+        """Slot of the first key >= key, or -1 if every key is smaller"""
+        keys = self.keys
+        n = len(keys)
+        i = 0
+        while i < n:
+            i = 2 * i + 1 + (keys[i] < key)
+        return _last_left(i + 1) - 1
+
+    def search(self, key):
+        i = self.lower_bound(key)
+        return i >= 0 and self.keys[i] == key
+
+    def get(self, key, default=None):
+        i = self.lower_bound(key)
+        if i >= 0 and self.keys[i] == key:
+            return self.values[i]
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    # Slots of many keys at once (-1 where absent), as a NumPy array
+    def _find_batch(self, queries):
+        if self._np_keys is None:
+            self._np_keys = np.asarray(self.keys)
+        keys = self._np_keys
+        n = len(keys)
+        queries = np.asarray(queries, dtype=keys.dtype)
+        i = np.zeros(len(queries), dtype=np.int64)
+        if n:
+            # Every level but the last is full; on the last, a walk that
+            # lands past the end has fallen off and stays put
+            for _ in range(n.bit_length()):
+                live = i < n
+                step = 2 * i + 1 + (keys[np.minimum(i, n - 1)] < queries)
+                i = np.where(live, step, i)
+        j = i + 1
+        i = j // (2 * (~j & (j + 1))) - 1
+        hit = i >= 0
+        hit[hit] = keys[i[hit]] == queries[hit]
+        return np.where(hit, i, -1)
+
+    def _batch_ready(self, queries):
+        if np is None or not isinstance(self.keys, array):
+            return False
+        if self.keys.typecode == 'd':
+            return all(type(key) is float for key in queries)
+        return all(type(key) is int and INT64_MIN <= key <= INT64_MAX for key in queries)
+
+    def search_many(self, keys):
+        """Return a list of booleans, one per key, in the order given"""
+        keys = list(keys)
+        if self._batch_ready(keys):
+            return (self._find_batch(keys) >= 0).tolist()
+        return [self.search(key) for key in keys]
+
+    def get_many(self, keys, default=None):
+        """Return a list of values, one per key, in the order given"""
+        keys = list(keys)
+        if not self._batch_ready(keys):
+            return [self.get(key, default) for key in keys]
+        slots = self._find_batch(keys)
+        if self._np_values is None:
+            self._np_values = np.empty(len(self.values) + 1, dtype=object)
+            self._np_values[:-1] = self.values
+        # Slot -1 reads the extra last entry, which holds the default
+        self._np_values[-1] = default
+        return self._np_values[slots].tolist()
+
+    # ----------------------------------------------------------------------
+    # ---- ORDERED ACCESS ----
+    # ----------------------------------------------------------------------
+    # The slot after slot i in key order (-1 after the largest key): the
+    # leftmost slot of the right subtree, or else the nearest ancestor
+    # that i lies to the left of
+    def _next_slot(self, i):
+        n = len(self.keys)
+        child = 2 * i + 2
+        if child < n:
+            while 2 * child + 1 < n:
+                child = 2 * child + 1
+            return child
+        return _last_left(i + 1) - 1
+
+    def range(self, lo=None, hi=None):
+        """Yield the keys k with lo <= k < hi in ascending order"""
+        for key, _ in self.items(lo, hi):
+            yield key
+
+    def items(self, lo=None, hi=None):
+        """Like range(), but yield (key, value) pairs"""
+        keys, values = self.keys, self.values
+        if lo is None:
+            i = 0 if keys else -1
+            while 0 <= i and 2 * i + 1 < len(keys):
+                i = 2 * i + 1
+        else:
+            i = self.lower_bound(lo)
+        while i >= 0:
+            key = keys[i]
+            if hi is not None and key >= hi:
+                return
+            yield key, values[i]
+            i = self._next_slot(i)
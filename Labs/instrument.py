@@ -0,0 +1,310 @@
+# Opt-in counters for the work a tree does
+# instrument.enable(tree) counts, for every insert, delete, search and get
+# on that tree:
+#   comparisons  key comparisons against the key of the operation
+#   nodes        nodes looked at on the way (BST/AVL/Red-Black: nodes whose
+#                key was compared; B-tree/B+ tree: nodes searched with bisect)
+#   events       structural work: left_rotate / right_rotate (AVL and
+#                Red-Black), passes of the fix_insert / fix_delete loops
+#                (Red-Black), split_child / merge / borrow_prev / borrow_next
+#                (B-tree and B+ tree)
+# Totals are kept per operation type, together with a histogram of each
+# count per operation. snapshot() returns them as a dictionary and export()
+# as Prometheus text, ready to be scraped.
+#
+# Nothing is added to the trees' code paths until enable() is called: it
+# swaps counting wrappers in for the rotation, split and merge functions
+# (and for the B-tree's bisect), and disable() puts the originals back. The
+# one hook that stays is a None check once per pass of the Red-Black
+# fix-up loops. The key of an operation is wrapped in a probe that counts
+# its own comparisons. An insert is counted as a search for the key (with
+# the probe) followed by the insert itself (with the plain key, so the
+# probe never ends up stored in the tree); its structural events are
+# counted during the insert. Batched calls are counted key by key when
+# they fall back to single-key operations; bulk rebuilds are not counted.
+# Counting is not thread-safe.
+import tree_loader
+
+# Histogram bucket upper bounds (counts per operation)
+BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+OPERATIONS = ("insert", "delete", "search", "get")
+BINARY_TREES = ("bst", "avl", "rb")
+
+# The stats of the operation in progress, if any
+_current = None
+# Trees being counted, and the (owner, name, original) of every swap made
+_enabled = 0
+_patches = []
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.total = 0
+        self.count = 0
+
+    def add(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    # Cumulative (upper bound, count) pairs, as Prometheus has them
+    def buckets(self):
+        running = 0
+        out = []
+        for bound, count in zip(BUCKETS + ("+Inf",), self.counts):
+            running += count
+            out.append((bound, running))
+        return out
+
+
+class TreeStats:
+    """The counters of one instrumented tree"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.count_nodes_by_key = kind in BINARY_TREES
+        self.reset()
+
+    def reset(self):
+        self.operations = {}    # op -> {"count", "comparisons", "nodes", "events": {...}}
+        self.histograms = {}    # (metric, op) -> Histogram
+        self._start_op()
+
+    def _start_op(self):
+        self._comparisons = 0
+        self._nodes = 0
+        self._events = {}
+        self._last = None
+        self._probing = False
+
+    def _event(self, name):
+        self._events[name] = self._events.get(name, 0) + 1
+
+    def _finish_op(self, op):
+        totals = self.operations.get(op)
+        if totals is None:
+            totals = self.operations[op] = {"count": 0, "comparisons": 0, "nodes": 0, "events": {}}
+        totals["count"] += 1
+        totals["comparisons"] += self._comparisons
+        totals["nodes"] += self._nodes
+        for name, count in self._events.items():
+            totals["events"][name] = totals["events"].get(name, 0) + count
+        for metric, value in (("comparisons", self._comparisons), ("nodes", self._nodes),
+                              ("events", sum(self._events.values()))):
+            histogram = self.histograms.get((metric, op))
+            if histogram is None:
+                histogram = self.histograms[(metric, op)] = Histogram()
+            histogram.add(value)
+        self._start_op()
+
+    def snapshot(self):
+        """The counters so far, as plain dictionaries and lists"""
+        events = {}
+        for totals in self.operations.values():
+            for name, count in totals["events"].items():
+                events[name] = events.get(name, 0) + count
+        return {
+            "tree": self.kind,
+            "operations": {op: dict(totals, events=dict(totals["events"]))
+                           for op, totals in self.operations.items()},
+            "events": events,
+            "histograms": {
+                f"{metric}/{op}": {"buckets": histogram.buckets(), "sum": histogram.total,
+                                   "count": histogram.count}
+                for (metric, op), histogram in self.histograms.items()
+            },
+        }
+
+    def export(self, prefix="tree"):
+        """The counters in the Prometheus text format"""
+        tree = f'tree="{self.kind}"'
+        lines = [f"# TYPE {prefix}_operations_total counter"]
+        for op, totals in sorted(self.operations.items()):
+            lines.append(f'{prefix}_operations_total{{{tree},op="{op}"}} {totals["count"]}')
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for op, totals in sorted(self.operations.items()):
+            for name, count in sorted(totals["events"].items()):
+                lines.append(f'{prefix}_events_total{{{tree},op="{op}",event="{name}"}} {count}')
+        for metric in ("comparisons", "nodes", "events"):
+            name = f"{prefix}_{metric}_per_operation"
+            lines.append(f"# TYPE {name} histogram")
+            for op in sorted(self.operations):
+                histogram = self.histograms[(metric, op)]
+                labels = f'{tree},op="{op}"'
+                for bound, count in histogram.buckets():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------------------
+# ---- PROBE KEY ----
+# ----------------------------------------------------------------------
+# Stands in for the key of an operation and counts every comparison made
+# with it. Comparisons the other way round (stored < probe) reach it too,
+# as the reflected operation. For binary trees, a comparison with a key
+# other than the last one compared means a new node.
+class _Probe:
+    __slots__ = ("key", "stats")
+
+    def __init__(self, key, stats):
+        self.key = key
+        self.stats = stats
+
+    def _count(self, other):
+        stats = self.stats
+        stats._comparisons += 1
+        if stats.count_nodes_by_key and other is not stats._last:
+            stats._nodes += 1
+            stats._last = other
+
+    def __lt__(self, other):
+        self._count(other)
+        return self.key < other
+
+    def __le__(self, other):
+        self._count(other)
+        return self.key <= other
+
+    def __gt__(self, other):
+        self._count(other)
+        return self.key > other
+
+    def __ge__(self, other):
+        self._count(other)
+        return self.key >= other
+
+    def __eq__(self, other):
+        self._count(other)
+        return self.key == other
+
+    def __ne__(self, other):
+        self._count(other)
+        return self.key != other
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return repr(self.key)
+
+
+# ----------------------------------------------------------------------
+# ---- SWAPPING THE WRAPPERS IN AND OUT ----
+# ----------------------------------------------------------------------
+def _counting_event(name, original):
+    def counted(*args, **kwargs):
+        if _current is not None:
+            _current._event(name)
+        return original(*args, **kwargs)
+    counted.__name__ = original.__name__
+    counted.__doc__ = original.__doc__
+    return counted
+
+def _counting_bisect(original):
+    def counted(*args, **kwargs):
+        if _current is not None and _current._probing:
+            _current._nodes += 1
+        return original(*args, **kwargs)
+    counted.__name__ = original.__name__
+    return counted
+
+def _fix_step(name):
+    if _current is not None:
+        _current._event(name)
+
+def _swap(owner, name, replacement):
+    _patches.append((owner, name, owner.__dict__.get(name)))
+    setattr(owner, name, replacement)
+
+def _install():
+    avl = tree_loader.load("avl")
+    rb = tree_loader.load("rb")
+    btree = tree_loader.load("btree")
+    for owner in (avl, rb.RedBlackTree):
+        for name in ("left_rotate", "right_rotate"):
+            _swap(owner, name, _counting_event(name, getattr(owner, name)))
+    _swap(rb.RedBlackTree, "_fix_step", staticmethod(_fix_step))
+    for owner in (btree.BTree, btree.BPlusTree):
+        for name in ("split_child", "merge", "borrow_prev", "borrow_next"):
+            if name in owner.__dict__:
+                _swap(owner, name, _counting_event(name, owner.__dict__[name]))
+    for name in ("bisect_left", "bisect_right"):
+        _swap(btree, name, _counting_bisect(getattr(btree, name)))
+
+def _uninstall():
+    while _patches:
+        owner, name, original = _patches.pop()
+        setattr(owner, name, original)
+
+
+# ----------------------------------------------------------------------
+# ---- PER TREE ----
+# ----------------------------------------------------------------------
+def _kind_of(tree):
+    for kind in tree_loader.TREES:
+        if type(tree) is tree_loader.tree_class(kind):
+            return kind
+    raise TypeError(f"cannot instrument a {type(tree).__name__}; "
+                    f"use one of: {', '.join(tree_loader.TREES)}")
+
+def _counted_op(tree, stats, op):
+    method = getattr(type(tree), op)
+    search = type(tree).search
+
+    def counted(key, *args):
+        global _current
+        if _current is not None:
+            # Called from inside another counted operation
+            return method(tree, key, *args)
+        _current = stats
+        try:
+            stats._probing = True
+            if op == "insert":
+                search(tree, _Probe(key, stats))
+                stats._probing = False
+                return method(tree, key, *args)
+            return method(tree, _Probe(key, stats), *args)
+        finally:
+            _current = None
+            stats._finish_op(op)
+    return counted
+
+def enable(tree):
+    """Start counting the work done by tree; returns its TreeStats"""
+    global _enabled
+    stats = getattr(tree, "_instrument_stats", None)
+    if stats is not None:
+        return stats
+    stats = TreeStats(_kind_of(tree))
+    if _enabled == 0:
+        _install()
+    _enabled += 1
+    for op in OPERATIONS:
+        setattr(tree, op, _counted_op(tree, stats, op))
+    tree._instrument_stats = stats
+    return stats
+
+def disable(tree):
+    """Stop counting for tree (its TreeStats keeps what was counted)"""
+    global _enabled
+    stats = tree.__dict__.pop("_instrument_stats", None)
+    if stats is None:
+        return
+    for op in OPERATIONS:
+        del tree.__dict__[op]
+    _enabled -= 1
+    if _enabled == 0:
+        _uninstall()
+
+def stats(tree):
+    """The TreeStats of an instrumented tree, or None"""
+    return getattr(tree, "_instrument_stats", None)
@@ -0,0 +1,406 @@
+# Ordered access and the sorted-map interface shared by the tree classes
+# Each tree class supplies:
+#   cursor(items=False)      a cursor for that tree (described below)
+#   insert(key, value=None)  add key, or replace the value of an existing key;
+#                            returns True if the key is new
+#   delete(key)              remove key; returns True if it was there
+#   get(key, default=None)   the value stored under key
+#   _load_sorted(keys, values)  replace the contents with ascending unique keys
+# and may override _lookup_many() with a batched search (see search_many)
+# and _snapshot_meta() with what load() needs to recreate it.
+# A cursor sits *between* two keys, like a bookmark:
+#   seek_first() / seek_end()  move before the smallest / after the largest key
+#   seek(key)                  moves before the first key >= key
+#   next()                     returns the key after the cursor and moves past it
+#   prev()                     returns the key before the cursor and moves back
+# next() and prev() raise StopIteration at either end, and a cursor is also a
+# plain forward iterator. A cursor made with items=True returns (key, value)
+# pairs instead of keys. Changing the tree invalidates its open cursors.
+# PathCursor below is such a cursor for binary trees without parent links.
+
+from bisect import bisect_left, bisect_right
+
+from snapshot import read_snapshot, write_snapshot
+
+# Marks "no default given" (None is a valid stored value)
+MISSING = object()
+
+
+def sort_batch(keys, values=None):
+    """Sort a batch of keys (and matching values) by key. A repeated key
+    keeps its last value, as if the pairs were inserted one at a time."""
+    keys = list(keys)
+    if values is None:
+        values = [None] * len(keys)
+    else:
+        values = list(values)
+        if len(values) != len(keys):
+            raise ValueError("keys and values must have the same length")
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    out_keys = []
+    out_values = []
+    for i in order:
+        if out_keys and keys[i] == out_keys[-1]:
+            out_values[-1] = values[i]
+        else:
+            out_keys.append(keys[i])
+            out_values.append(values[i])
+    return out_keys, out_values
+
+
+def unique_sorted(keys, values=None):
+    """Check that keys ascend and drop repeats (a repeated key keeps its
+    last value, like insert()); returns the keys and values as two new
+    lists. Raises ValueError if a key is smaller than the one before."""
+    keys = list(keys)
+    if values is None:
+        values = [None] * len(keys)
+    else:
+        values = list(values)
+        if len(values) != len(keys):
+            raise ValueError("keys and values must have the same length")
+    out_keys = []
+    out_values = []
+    for key, value in zip(keys, values):
+        if out_keys and key <= out_keys[-1]:
+            if key < out_keys[-1]:
+                raise ValueError("from_sorted() needs keys in ascending order")
+            out_values[-1] = value
+        else:
+            out_keys.append(key)
+            out_values.append(value)
+    return out_keys, out_values
+
+
+# Cursor for a binary search tree whose nodes have no parent links: it
+# keeps the path from the root down to the node holding the next key (an
+# empty path means "at the end"). The tree says how to read a node through
+# four accessors, left(node), right(node), key(node) and value(node), and
+# what stands for "no child" (nil). Climbing back up needs no node
+# identity: the next key after a node with no right subtree is at its
+# nearest ancestor with a larger key, and the previous one at its nearest
+# ancestor with a smaller key.
+class PathCursor:
+    def __init__(self, root, left, right, key, value, items=False, nil=None):
+        self.root = root
+        self.left = left
+        self.right = right
+        self.key = key
+        self.value = value
+        self.items = items
+        self.nil = nil
+        self.path = []
+        self.seek_first()
+
+    def _entry(self, node):
+        return (self.key(node), self.value(node)) if self.items else self.key(node)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+
+    def seek_first(self):
+        left, nil = self.left, self.nil
+        self.path = []
+        node = self.root
+        while node != nil:
+            self.path.append(node)
+            node = left(node)
+
+    def seek_end(self):
+        self.path = []
+
+    def seek(self, key):
+        # Stop before the first key >= 'key': the deepest node on the
+        # search path where the walk turned left
+        node_key, nil = self.key, self.nil
+        self.path = []
+        keep = 0
+        node = self.root
+        while node != nil:
+            self.path.append(node)
+            if key <= node_key(node):
+                keep = len(self.path)
+                node = self.left(node)
+            else:
+                node = self.right(node)
+        del self.path[keep:]
+
+    def next(self):
+        path = self.path
+        if not path:
+            raise StopIteration
+        node = path[-1]
+        last = self.key(node)
+        entry = (last, self.value(node)) if self.items else last
+        child = self.right(node)
+        nil = self.nil
+        if child != nil:
+            # Successor is the leftmost node of the right subtree
+            left = self.left
+            while child != nil:
+                path.append(child)
+                child = left(child)
+        else:
+            # Climb until we come up out of a left subtree
+            key = self.key
+            path.pop()
+            while path and key(path[-1]) < last:
+                path.pop()
+        return entry
+
+    def prev(self):
+        left, right, key, nil = self.left, self.right, self.key, self.nil
+        path = self.path
+        if not path:
+            # From the end: the predecessor is the largest key
+            node = self.root
+            if node == nil:
+                raise StopIteration
+            while node != nil:
+                path.append(node)
+                node = right(node)
+            return self._entry(path[-1])
+        node = left(path[-1])
+        if node != nil:
+            # Predecessor is the rightmost node of the left subtree
+            while node != nil:
+                path.append(node)
+                node = right(node)
+            return self._entry(path[-1])
+        # Climb until we come up out of a right subtree
+        first = key(path[-1])
+        depth = len(path) - 1
+        while depth > 0 and key(path[depth - 1]) > first:
+            depth -= 1
+        if depth == 0:
+            raise StopIteration
+        del path[depth:]
+        return self._entry(path[-1])
+
+
+# Look up many keys in one walk over a binary search tree: the batch is
+# sorted, and at each node it is split (with bisect) into the part that
+# goes left and the part that goes right, so a path shared by several keys
+# is walked only once. Nodes are read through accessors, as in PathCursor.
+# Returns the node holding each key (or nil), in the order given.
+def find_sorted(root, keys, left, right, key, nil=None):
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    batch = [keys[i] for i in order]
+    found = [nil] * len(batch)
+    stack = [(root, 0, len(batch))]
+    while stack:
+        node, lo, hi = stack.pop()
+        if node is nil or lo >= hi:
+            continue
+        node_key = key(node)
+        first = bisect_left(batch, node_key, lo, hi)
+        last = bisect_right(batch, node_key, first, hi)
+        for j in range(first, last):
+            found[order[j]] = node
+        stack.append((left(node), lo, first))
+        stack.append((right(node), last, hi))
+    return found
+
+
+class OrderedMixin:
+    # A batch at least this large compared with the tree is merged with the
+    # existing keys and the tree is rebuilt in one O(n + k) pass, instead of
+    # paying one root-to-leaf descent (and its rebalancing) per key
+    rebuild_fraction = 0.25
+
+    def __iter__(self):
+        return self.cursor()
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """Yield the keys k with lo <= k < hi, in descending order if reverse.
+
+        Either bound may be None for "unbounded". The walk starts with one
+        seek and then steps key by key, so it touches O(log n + k) nodes.
+        """
+        return self._walk(lo, hi, reverse, False)
+
+    def items(self, lo=None, hi=None, reverse=False):
+        """Like range(), but yield (key, value) pairs"""
+        return self._walk(lo, hi, reverse, True)
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        for _, value in self.items():
+            yield value
+
+    def _walk(self, lo, hi, reverse, items):
+        cursor = self.cursor(items)
+        if not reverse:
+            if lo is not None:
+                cursor.seek(lo)
+            for entry in cursor:
+                key = entry[0] if items else entry
+                if hi is not None and key >= hi:
+                    return
+                yield entry
+        else:
+            if hi is None:
+                cursor.seek_end()
+            else:
+                cursor.seek(hi)
+            while True:
+                try:
+                    entry = cursor.prev()
+                except StopIteration:
+                    return
+                key = entry[0] if items else entry
+                if lo is not None and key < lo:
+                    return
+                yield entry
+
+    # ---- Sorted-map interface ----
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def pop(self, key, default=MISSING):
+        """Remove key and return its value (or default if it is missing)"""
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        self.delete(key)
+        return value
+
+    def setdefault(self, key, default=None):
+        """Return the value of key, storing default first if it is missing"""
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            self.insert(key, default)
+            return default
+        return value
+
+    def update(self, other=()):
+        """Insert (key, value) pairs from a mapping or an iterable of pairs"""
+        if hasattr(other, "items"):
+            other = other.items()
+        for key, value in other:
+            self.insert(key, value)
+
+    # ---- Batched operations ----
+
+    def _rebuild_pays_off(self, batch_size):
+        return batch_size >= self.rebuild_fraction * len(self)
+
+    def insert_many(self, keys, values=None):
+        """Insert a batch of keys (with matching values, if given).
+        Returns how many keys were new."""
+        keys, values = sort_batch(keys, values)
+        if not self._rebuild_pays_off(len(keys)):
+            insert = self.insert
+            return sum(insert(key, value) for key, value in zip(keys, values))
+
+        # One merge pass over the existing items and the batch
+        before = len(self)
+        merged_keys = []
+        merged_values = []
+        batch = 0
+        for key, value in self.items():
+            while batch < len(keys) and keys[batch] < key:
+                merged_keys.append(keys[batch])
+                merged_values.append(values[batch])
+                batch += 1
+            if batch < len(keys) and keys[batch] == key:
+                value = values[batch]
+                batch += 1
+            merged_keys.append(key)
+            merged_values.append(value)
+        merged_keys.extend(keys[batch:])
+        merged_values.extend(values[batch:])
+        self._load_sorted(merged_keys, merged_values)
+        return len(merged_keys) - before
+
+    def delete_many(self, keys):
+        """Delete a batch of keys. Returns how many were present."""
+        keys = sorted(keys)
+        if not self._rebuild_pays_off(len(keys)):
+            delete = self.delete
+            return sum(delete(key) for key in keys)
+
+        before = len(self)
+        kept_keys = []
+        kept_values = []
+        batch = 0
+        for key, value in self.items():
+            while batch < len(keys) and keys[batch] < key:
+                batch += 1
+            if batch < len(keys) and keys[batch] == key:
+                continue
+            kept_keys.append(key)
+            kept_values.append(value)
+        self._load_sorted(kept_keys, kept_values)
+        return before - len(kept_keys)
+
+    def search_many(self, keys):
+        """Return a list of booleans, one per key, in the order given"""
+        return [value is not MISSING for value in self._lookup_many(keys)]
+
+    def get_many(self, keys, default=None):
+        """Return a list of values, one per key, in the order given"""
+        return [default if value is MISSING else value for value in self._lookup_many(keys)]
+
+    def _lookup_many(self, keys):
+        get = self.get
+        return [get(key, MISSING) for key in keys]
+
+    # ---- Freezing ----
+
+    def freeze(self):
+        """Return a read-only copy of the contents as a FrozenIndex, laid
+        out for fast searching (see eytzinger.py)"""
+        from eytzinger import FrozenIndex
+        keys = []
+        values = []
+        for key, value in self.items():
+            keys.append(key)
+            values.append(value)
+        return FrozenIndex(keys, values)
+
+    # ---- Snapshots ----
+
+    def save(self, path):
+        """Write the keys and values to a binary snapshot file (see snapshot.py)"""
+        keys = []
+        values = []
+        for key, value in self.items():
+            keys.append(key)
+            values.append(value)
+        with open(path, "wb") as f:
+            write_snapshot(f, keys, values, self._snapshot_meta())
+
+    # Trees that need more than the snapshot to be built (a file, a wrapped
+    # tree) override this with a load() that takes it
+    @classmethod
+    def load(cls, path):
+        """Build a tree from a snapshot written by save(), in linear time"""
+        with open(path, "rb") as f:
+            keys, values, meta = read_snapshot(f)
+        tree = cls(**meta)
+        tree._load_sorted(keys, values)
+        return tree
+
+    # Keyword arguments for the constructor that give an empty tree of the
+    # same shape, stored in the snapshot
+    def _snapshot_meta(self):
+        return {}
@@ -0,0 +1,419 @@
+# Persistent (copy-on-write) AVL and Red-Black trees
+# avl.py and "Red-Black Tree.py" rebalance by changing nodes in place. Here
+# a node is never changed once it is made: an update copies only the nodes
+# on the path from the root to the change (O(log n) of them) and shares
+# every other subtree with the previous version. So:
+#   - snapshot() is O(1): it just keeps the current root
+#   - a snapshot, or a cursor/range scan started on one, never sees later
+#     updates, however long it runs
+#   - old versions cost memory only for the paths that changed since
+#
+# The AVL functions follow avl.py, building new nodes instead of rotating
+# old ones. The Red-Black functions are the functional algorithms: insert
+# is Okasaki's (a red-red pair below a black node is rebuilt as a red node
+# with two black children), using the balance step from Kahrs' version, and
+# delete is Kahrs' (the removed node's two subtrees are joined, and
+# balleft/balright repair the black height on the way back up). Both kinds
+# of tree work as sorted maps (see ordered.py).
+from operator import attrgetter
+
+from ordered import OrderedMixin, PathCursor
+
+RED = "R"
+BLACK = "B"
+
+
+def size(node):
+    return node.size if node is not None else 0
+
+
+def height(node):
+    return node.height if node is not None else 0
+
+
+# ----------------------------------------------------------------------
+# ---- AVL ----
+# ----------------------------------------------------------------------
+class AVLNode:
+    """An immutable AVL node; height and size are computed when it is made"""
+    __slots__ = ("key", "value", "left", "right", "height", "size")
+
+    def __init__(self, key, value, left=None, right=None):
+        self.key = key
+        self.value = value
+        self.left = left
+        self.right = right
+        self.height = 1 + max(height(left), height(right))
+        self.size = 1 + size(left) + size(right)
+
+
+# A node with these fields, rotated if its subtrees differ in height by two
+def avl_balance(key, value, left, right):
+    if height(left) > height(right) + 1:
+        if height(left.left) >= height(left.right):
+            # Single right rotation
+            return AVLNode(left.key, left.value, left.left,
+                           AVLNode(key, value, left.right, right))
+        # Left-right case
+        mid = left.right
+        return AVLNode(mid.key, mid.value,
+                       AVLNode(left.key, left.value, left.left, mid.left),
+                       AVLNode(key, value, mid.right, right))
+    if height(right) > height(left) + 1:
+        if height(right.right) >= height(right.left):
+            # Single left rotation
+            return AVLNode(right.key, right.value,
+                           AVLNode(key, value, left, right.left), right.right)
+        # Right-left case
+        mid = right.left
+        return AVLNode(mid.key, mid.value,
+                       AVLNode(key, value, left, mid.left),
+                       AVLNode(right.key, right.value, mid.right, right.right))
+    return AVLNode(key, value, left, right)
+
+
+# Returns (new root, True if the key was added)
+def avl_insert(node, key, value=None):
+    if node is None:
+        return AVLNode(key, value), True
+    if key < node.key:
+        left, added = avl_insert(node.left, key, value)
+        return avl_balance(node.key, node.value, left, node.right), added
+    if key > node.key:
+        right, added = avl_insert(node.right, key, value)
+        return avl_balance(node.key, node.value, node.left, right), added
+    return AVLNode(key, value, node.left, node.right), False
+
+
+# Returns (new root, True if the key was removed); a missing key copies nothing
+def avl_delete(node, key):
+    if node is None:
+        return None, False
+    if key < node.key:
+        left, removed = avl_delete(node.left, key)
+        if not removed:
+            return node, False
+        return avl_balance(node.key, node.value, left, node.right), True
+    if key > node.key:
+        right, removed = avl_delete(node.right, key)
+        if not removed:
+            return node, False
+        return avl_balance(node.key, node.value, node.left, right), True
+    if node.left is None:
+        return node.right, True
+    if node.right is None:
+        return node.left, True
+    # Two children: the successor takes this node's place
+    right, successor = avl_pop_min(node.right)
+    return avl_balance(successor.key, successor.value, node.left, right), True
+
+
+# Remove the smallest node; returns (new root, the removed node)
+def avl_pop_min(node):
+    if node.left is None:
+        return node.right, node
+    left, smallest = avl_pop_min(node.left)
+    return avl_balance(node.key, node.value, left, node.right), smallest
+
+
+def avl_build(keys, values, lo, hi):
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    return AVLNode(keys[mid], values[mid],
+                   avl_build(keys, values, lo, mid),
+                   avl_build(keys, values, mid + 1, hi))
+
+
+# ----------------------------------------------------------------------
+# ---- RED-BLACK ----
+# ----------------------------------------------------------------------
+class RBNode:
+    """An immutable Red-Black node; size is computed when it is made"""
+    __slots__ = ("color", "key", "value", "left", "right", "size")
+
+    def __init__(self, color, left, key, value, right):
+        self.color = color
+        self.key = key
+        self.value = value
+        self.left = left
+        self.right = right
+        self.size = 1 + size(left) + size(right)
+
+
+def is_red(node):
+    return node is not None and node.color == RED
+
+
+def is_black(node):
+    return node is not None and node.color == BLACK
+
+
+def blacken(node):
+    if node is None or node.color == BLACK:
+        return node
+    return RBNode(BLACK, node.left, node.key, node.value, node.right)
+
+
+# Kahrs' sub1: a black node turned red (its black height drops by one)
+def redden(node):
+    if not is_black(node):
+        raise AssertionError("red-black invariant broken")
+    return RBNode(RED, node.left, node.key, node.value, node.right)
+
+
+# A black node with these fields, fixing a red-red pair just below it
+def rb_balance(left, key, value, right):
+    if is_red(left) and is_red(right):
+        return RBNode(RED, blacken(left), key, value, blacken(right))
+    if is_red(left):
+        if is_red(left.left):
+            a = left.left
+            return RBNode(RED, RBNode(BLACK, a.left, a.key, a.value, a.right),
+                          left.key, left.value,
+                          RBNode(BLACK, left.right, key, value, right))
+        if is_red(left.right):
+            b = left.right
+            return RBNode(RED, RBNode(BLACK, left.left, left.key, left.value, b.left),
+                          b.key, b.value,
+                          RBNode(BLACK, b.right, key, value, right))
+    if is_red(right):
+        if is_red(right.right):
+            b = right.right
+            return RBNode(RED, RBNode(BLACK, left, key, value, right.left),
+                          right.key, right.value,
+                          RBNode(BLACK, b.left, b.key, b.value, b.right))
+        if is_red(right.left):
+            a = right.left
+            return RBNode(RED, RBNode(BLACK, left, key, value, a.left),
+                          a.key, a.value,
+                          RBNode(BLACK, a.right, right.key, right.value, right.right))
+    return RBNode(BLACK, left, key, value, right)
+
+
+# Returns (new root, True if the key was added); the root may come back red
+def rb_insert(node, key, value=None):
+    if node is None:
+        return RBNode(RED, None, key, value, None), True
+    if key < node.key:
+        left, added = rb_insert(node.left, key, value)
+        if node.color == BLACK:
+            return rb_balance(left, node.key, node.value, node.right), added
+        return RBNode(RED, left, node.key, node.value, node.right), added
+    if key > node.key:
+        right, added = rb_insert(node.right, key, value)
+        if node.color == BLACK:
+            return rb_balance(node.left, node.key, node.value, right), added
+        return RBNode(RED, node.left, node.key, node.value, right), added
+    return RBNode(node.color, node.left, key, value, node.right), False
+
+
+# The left subtree lost one level of black height: restore it
+def rb_balance_left(left, key, value, right):
+    if is_red(left):
+        return RBNode(RED, blacken(left), key, value, right)
+    if is_black(right):
+        return rb_balance(left, key, value, redden(right))
+    if is_red(right) and is_black(right.left):
+        mid = right.left
+        return RBNode(RED, RBNode(BLACK, left, key, value, mid.left),
+                      mid.key, mid.value,
+                      rb_balance(mid.right, right.key, right.value, redden(right.right)))
+    raise AssertionError("red-black invariant broken")
+
+
+# The right subtree lost one level of black height: restore it
+def rb_balance_right(left, key, value, right):
+    if is_red(right):
+        return RBNode(RED, left, key, value, blacken(right))
+    if is_black(left):
+        return rb_balance(redden(left), key, value, right)
+    if is_red(left) and is_black(left.right):
+        mid = left.right
+        return RBNode(RED, rb_balance(redden(left.left), left.key, left.value, mid.left),
+                      mid.key, mid.value,
+                      RBNode(BLACK, mid.right, key, value, right))
+    raise AssertionError("red-black invariant broken")
+
+
+# Join two subtrees of equal black height, every key of a below every key of b
+def rb_join(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if is_red(a) and is_red(b):
+        mid = rb_join(a.right, b.left)
+        if is_red(mid):
+            return RBNode(RED, RBNode(RED, a.left, a.key, a.value, mid.left),
+                          mid.key, mid.value,
+                          RBNode(RED, mid.right, b.key, b.value, b.right))
+        return RBNode(RED, a.left, a.key, a.value, RBNode(RED, mid, b.key, b.value, b.right))
+    if is_black(a) and is_black(b):
+        mid = rb_join(a.right, b.left)
+        if is_red(mid):
+            return RBNode(RED, RBNode(BLACK, a.left, a.key, a.value, mid.left),
+                          mid.key, mid.value,
+                          RBNode(BLACK, mid.right, b.key, b.value, b.right))
+        return rb_balance_left(a.left, a.key, a.value, RBNode(BLACK, mid, b.key, b.value, b.right))
+    if is_red(b):
+        return RBNode(RED, rb_join(a, b.left), b.key, b.value, b.right)
+    return RBNode(RED, a.left, a.key, a.value, rb_join(a.right, b))
+
+
+# Returns (new root, True if the key was removed). Removing a key from a
+# black-rooted subtree lowers its black height by one, which the caller
+# repairs; a missing key copies nothing.
+def rb_delete(node, key):
+    if node is None:
+        return None, False
+    if key < node.key:
+        left, removed = rb_delete(node.left, key)
+        if not removed:
+            return node, False
+        if is_black(node.left):
+            return rb_balance_left(left, node.key, node.value, node.right), True
+        return RBNode(RED, left, node.key, node.value, node.right), True
+    if key > node.key:
+        right, removed = rb_delete(node.right, key)
+        if not removed:
+            return node, False
+        if is_black(node.right):
+            return rb_balance_right(node.left, node.key, node.value, right), True
+        return RBNode(RED, node.left, node.key, node.value, right), True
+    return rb_join(node.left, node.right), True
+
+
+# Balanced build from sorted keys: as in RedBlackTree._load_sorted, only
+# the deepest level (when it is not the root) is red
+def rb_build(keys, values, lo, hi, depth, deepest):
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    color = RED if depth == deepest and depth > 1 else BLACK
+    return RBNode(color, rb_build(keys, values, lo, mid, depth + 1, deepest),
+                  keys[mid], values[mid],
+                  rb_build(keys, values, mid + 1, hi, depth + 1, deepest))
+
+
+# ----------------------------------------------------------------------
+# ---- TREE OBJECTS ----
+# ----------------------------------------------------------------------
+class PersistentTree(OrderedMixin):
+    """Shared part of the two persistent trees: a handle on one version.
+    insert/delete move the handle to a new version; snapshot() returns
+    another handle on the current one."""
+
+    def __init__(self, root=None):
+        self.root = root
+
+    def snapshot(self):
+        return type(self)(self.root)
+
+    def __len__(self):
+        return size(self.root)
+
+    def _find(self, key):
+        node = self.root
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return node
+        return None
+
+    def search(self, key):
+        return self._find(key) is not None
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def get(self, key, default=None):
+        node = self._find(key)
+        return default if node is None else node.value
+
+    def rank(self, key):
+        """Number of keys smaller than key"""
+        smaller = 0
+        node = self.root
+        while node is not None:
+            if key <= node.key:
+                node = node.left
+            else:
+                smaller += size(node.left) + 1
+                node = node.right
+        return smaller
+
+    def select(self, i):
+        """The i-th smallest key (0-based; negative i counts from the end)"""
+        node = self.root
+        if i < 0:
+            i += size(node)
+        if not 0 <= i < size(node):
+            raise IndexError("select index out of range")
+        while True:
+            left = size(node.left)
+            if i < left:
+                node = node.left
+            elif i == left:
+                return node.key
+            else:
+                i -= left + 1
+                node = node.right
+
+    def count(self, lo=None, hi=None):
+        """Number of keys k with lo <= k < hi (None = unbounded)"""
+        upper = len(self) if hi is None else self.rank(hi)
+        lower = 0 if lo is None else self.rank(lo)
+        return max(0, upper - lower)
+
+    # The cursor walks the version that is current when it is made
+    def cursor(self, items=False):
+        return Cursor(self.root, items)
+
+    # range()/items() are generators, which would only make their cursor on
+    # the first next(): pin the version they scan when they are called
+    def _walk(self, lo, hi, reverse, items):
+        return OrderedMixin._walk(self.snapshot(), lo, hi, reverse, items)
+
+
+class PersistentAVLTree(PersistentTree):
+    def insert(self, key, value=None):
+        self.root, added = avl_insert(self.root, key, value)
+        return added
+
+    def delete(self, key):
+        self.root, removed = avl_delete(self.root, key)
+        return removed
+
+    def _load_sorted(self, keys, values):
+        self.root = avl_build(keys, values, 0, len(keys))
+
+
+class PersistentRedBlackTree(PersistentTree):
+    def insert(self, key, value=None):
+        root, added = rb_insert(self.root, key, value)
+        self.root = blacken(root)
+        return added
+
+    def delete(self, key):
+        root, removed = rb_delete(self.root, key)
+        if removed:
+            self.root = blacken(root)
+        return removed
+
+    def _load_sorted(self, keys, values):
+        self.root = rb_build(keys, values, 0, len(keys), 1, len(keys).bit_length())
+
+
+# ----------------------------------------------------------------------
+# ---- CURSOR ----
+# ----------------------------------------------------------------------
+# A PathCursor (see ordered.py). Nodes never change, so the cursor stays
+# valid while the tree moves on.
+class Cursor(PathCursor):
+    def __init__(self, root, items=False):
+        super().__init__(root, attrgetter("left"), attrgetter("right"),
+                         attrgetter("key"), attrgetter("value"), items)
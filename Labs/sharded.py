@@ -0,0 +1,248 @@
+# A tree split across worker processes
+# One Python process runs one tree on one core (the GIL). ShardedTree
+# splits the keys between N worker processes, each owning an ordinary tree
+# (any type in tree_loader.TREES), so N cores work on a batch at once.
+#
+# Keys are routed to a shard by hash, or by key range when 'boundaries'
+# (N-1 ascending split keys) are given. Range scans ask every shard that
+# can hold part of the range and merge the answers: a k-way merge for hash
+# shards, a plain concatenation for range shards.
+#
+# Workers talk to the front end over pipes, one message per shard per
+# call: the *_many calls split a batch by shard, send every shard its part
+# before waiting for any answer, and so the shards run in parallel and the
+# pipe cost is paid once per batch rather than once per key. Single-key
+# calls work too, but cost a round trip each.
+#
+# Keys on different shards are only compared with each other when a range
+# scan merges them, so every new key is first compared with one key the
+# tree already holds: a key that does not compare with the others fails at
+# insert, not in a later items().
+import heapq
+import multiprocessing
+from bisect import bisect_right
+from operator import itemgetter
+
+import tree_loader
+from ordered import MISSING, OrderedMixin, sort_batch
+
+
+# ----------------------------------------------------------------------
+# ---- WORKER ----
+# ----------------------------------------------------------------------
+def _serve(conn, kind, options):
+    tree = tree_loader.make_tree(kind, **options)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        op, args = message
+        try:
+            if op == "items":
+                result = list(tree.items(*args))
+            elif op == "lookup":
+                # MISSING would not survive the pipe: send (found, value)
+                result = [(value is not MISSING, None if value is MISSING else value)
+                          for value in tree._lookup_many(*args)]
+            elif op == "len":
+                result = len(tree)
+            else:
+                result = getattr(tree, op)(*args)
+        except Exception as error:
+            conn.send((False, error))
+        else:
+            conn.send((True, result))
+    conn.close()
+
+
+class ShardedTree(OrderedMixin):
+    """A sorted map spread over 'shards' worker processes, each holding a
+    tree of type 'kind'. Call close() (or use a with block) when done."""
+
+    def __init__(self, kind="avl", shards=None, boundaries=None, **options):
+        if boundaries is not None:
+            boundaries = list(boundaries)
+            if boundaries != sorted(boundaries):
+                raise ValueError("boundaries must be in ascending order")
+            shards = len(boundaries) + 1
+        elif shards is None:
+            shards = multiprocessing.cpu_count()
+        self.kind = kind
+        self.options = options
+        self.boundaries = boundaries
+        self._sample = MISSING     # a key the tree holds, for _check_key
+        self.conns = []
+        self.workers = []
+        for _ in range(shards):
+            ours, theirs = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_serve, args=(theirs, kind, options), daemon=True)
+            worker.start()
+            theirs.close()
+            self.conns.append(ours)
+            self.workers.append(worker)
+
+    def close(self):
+        for conn, worker in zip(self.conns, self.workers):
+            if not conn.closed:
+                conn.send(None)
+                conn.close()
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----------------------------------------------------------------------
+    # ---- ROUTING ----
+    # ----------------------------------------------------------------------
+    def shard_of(self, key):
+        if self.boundaries is None:
+            return hash(key) % len(self.conns)
+        return bisect_right(self.boundaries, key)
+
+    # Send each (shard, op, args) first, then collect the answers in order
+    def _call(self, requests):
+        for shard, op, args in requests:
+            self.conns[shard].send((op, args))
+        results = []
+        failure = None
+        for shard, _, _ in requests:
+            ok, result = self.conns[shard].recv()
+            if not ok and failure is None:
+                failure = result
+            results.append(result)
+        if failure is not None:
+            raise failure
+        return results
+
+    # Raise TypeError if key does not compare with the keys in the tree (see
+    # the note at the top); returns the sample key to keep once it is in
+    def _check_key(self, key):
+        if self._sample is MISSING:
+            return key
+        try:
+            key < self._sample
+        except TypeError:
+            raise TypeError(f"key {key!r} does not compare with the keys in the tree") from None
+        return self._sample
+
+    # Split keys (and values) by shard: {shard: (positions, keys, values)}
+    def _split(self, keys, values=None):
+        parts = {}
+        for pos, key in enumerate(keys):
+            shard = self.shard_of(key)
+            part = parts.get(shard)
+            if part is None:
+                part = parts[shard] = ([], [], [])
+            part[0].append(pos)
+            part[1].append(key)
+            if values is not None:
+                part[2].append(values[pos])
+        return parts
+
+    # ----------------------------------------------------------------------
+    # ---- SINGLE KEYS ----
+    # ----------------------------------------------------------------------
+    def insert(self, key, value=None):
+        sample = self._check_key(key)
+        result = self._call([(self.shard_of(key), "insert", (key, value))])[0]
+        self._sample = sample
+        return result
+
+    def delete(self, key):
+        return self._call([(self.shard_of(key), "delete", (key,))])[0]
+
+    # The default stays here: the caller may compare it by identity
+    def get(self, key, default=None):
+        value = self._lookup_many([key])[0]
+        return default if value is MISSING else value
+
+    def search(self, key):
+        return self._call([(self.shard_of(key), "search", (key,))])[0]
+
+    def __contains__(self, key):
+        return self.search(key)
+
+    def __len__(self):
+        return sum(self._call([(shard, "len", ()) for shard in range(len(self.conns))]))
+
+    # ----------------------------------------------------------------------
+    # ---- BATCHES ----
+    # ----------------------------------------------------------------------
+    def insert_many(self, keys, values=None):
+        keys, values = sort_batch(keys, values)
+        if not keys:
+            return 0
+        # sort_batch has compared the batch with itself: one key will do
+        sample = self._check_key(keys[0])
+        parts = self._split(keys, values)
+        requests = [(shard, "insert_many", (part[1], part[2])) for shard, part in parts.items()]
+        result = sum(self._call(requests))
+        self._sample = sample
+        return result
+
+    def delete_many(self, keys):
+        parts = self._split(list(keys))
+        requests = [(shard, "delete_many", (part[1],)) for shard, part in parts.items()]
+        return sum(self._call(requests))
+
+    def _lookup_many(self, keys):
+        keys = list(keys)
+        parts = self._split(keys)
+        shards = list(parts)
+        answers = self._call([(shard, "lookup", (parts[shard][1],)) for shard in shards])
+        found = [MISSING] * len(keys)
+        for shard, answer in zip(shards, answers):
+            for pos, (here, value) in zip(parts[shard][0], answer):
+                if here:
+                    found[pos] = value
+        return found
+
+    def _load_sorted(self, keys, values):
+        parts = self._split(keys, values)
+        requests = [(shard, "_load_sorted", ([], [])) for shard in range(len(self.conns))]
+        for shard, part in parts.items():
+            requests[shard] = (shard, "_load_sorted", (part[1], part[2]))
+        self._call(requests)
+        self._sample = keys[0] if keys else MISSING
+
+    # ----------------------------------------------------------------------
+    # ---- RANGES ----
+    # ----------------------------------------------------------------------
+    # The shards that can hold keys in [lo, hi)
+    def _shards_for(self, lo, hi):
+        if self.boundaries is None:
+            return list(range(len(self.conns)))
+        first = 0 if lo is None else bisect_right(self.boundaries, lo)
+        last = len(self.conns) - 1 if hi is None else bisect_right(self.boundaries, hi)
+        return list(range(first, last + 1))
+
+    def _walk(self, lo, hi, reverse, items):
+        shards = self._shards_for(lo, hi)
+        if reverse:
+            shards.reverse()
+        parts = self._call([(shard, "items", (lo, hi, reverse)) for shard in shards])
+        if self.boundaries is None:
+            merged = heapq.merge(*parts, key=itemgetter(0), reverse=reverse)
+        else:
+            merged = (entry for part in parts for entry in part)
+        if items:
+            return merged
+        return (key for key, _ in merged)
+
+    def __iter__(self):
+        return self._walk(None, None, False, False)
+
+    def inorder(self):
+        """All keys in ascending order, gathered from every shard"""
+        return list(self)
+
+    def cursor(self, items=False):
+        raise TypeError("a sharded tree has no cursor; use range() or items()")
+
+    def _snapshot_meta(self):
+        meta = {"kind": self.kind, "shards": len(self.conns), "boundaries": self.boundaries}
+        meta.update(self.options)
+        return meta
@@ -0,0 +1,112 @@
+# Binary snapshots of a tree's contents
+# A snapshot holds the keys and values in ascending key order as two
+# arrays, plus a little metadata about the structure (for example the
+# B-tree degree). Loading bulk-builds the tree from the sorted arrays in
+# linear time: no search, rotation or split per key.
+#
+# Layout (little-endian):
+#   header    magic (8 bytes), version (uint16), key kind (uint8),
+#             value kind (uint8), count (uint64), metadata length (uint32)
+#   metadata  JSON object
+#   keys      length (uint64), data
+#   values    length (uint64), data
+#   checksum  crc32 of everything above (uint32)
+# Keys and values are each stored as packed int64 or float64 when every
+# one of them has that type, as nothing at all when they are all None, and
+# pickled otherwise.
+import json
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+
+MAGIC = b"LABSNAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHBBQI")
+LENGTH = struct.Struct("<Q")
+CHECKSUM = struct.Struct("<I")
+
+# How a column of keys or values is stored
+KIND_NONE = 0      # all None, no data
+KIND_INT64 = 1
+KIND_FLOAT64 = 2
+KIND_PICKLE = 3
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def _encode(column):
+    if all(item is None for item in column):
+        return KIND_NONE, b""
+    if all(type(item) is int and INT64_MIN <= item <= INT64_MAX for item in column):
+        packed = array('q', column)
+    elif all(type(item) is float for item in column):
+        packed = array('d', column)
+    else:
+        return KIND_PICKLE, pickle.dumps(column, pickle.HIGHEST_PROTOCOL)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return (KIND_INT64 if packed.typecode == 'q' else KIND_FLOAT64), packed.tobytes()
+
+
+def _decode(kind, data, count):
+    if kind == KIND_NONE:
+        return [None] * count
+    if kind == KIND_PICKLE:
+        return pickle.loads(data)
+    if kind not in (KIND_INT64, KIND_FLOAT64):
+        raise ValueError(f"unknown snapshot column kind {kind}")
+    packed = array('q' if kind == KIND_INT64 else 'd', data)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
+
+
+def write_snapshot(f, keys, values, meta=None):
+    """Write sorted keys and their values to the binary file f"""
+    if len(keys) != len(values):
+        raise ValueError("keys and values must have the same length")
+    meta = json.dumps(meta or {}).encode()
+    key_kind, key_data = _encode(keys)
+    value_kind, value_data = _encode(values)
+
+    parts = [
+        HEADER.pack(MAGIC, VERSION, key_kind, value_kind, len(keys), len(meta)),
+        meta,
+        LENGTH.pack(len(key_data)), key_data,
+        LENGTH.pack(len(value_data)), value_data,
+    ]
+    crc = 0
+    for part in parts:
+        crc = zlib.crc32(part, crc)
+        f.write(part)
+    f.write(CHECKSUM.pack(crc))
+
+
+def read_snapshot(f):
+    """Read a snapshot from the binary file f; returns (keys, values, meta)"""
+    data = f.read()
+    if len(data) < HEADER.size + CHECKSUM.size:
+        raise ValueError("snapshot is truncated")
+    magic, version, key_kind, value_kind, count, meta_len = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a tree snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    (crc,) = CHECKSUM.unpack_from(data, len(data) - CHECKSUM.size)
+    if zlib.crc32(memoryview(data)[:-CHECKSUM.size]) != crc:
+        raise ValueError("snapshot checksum mismatch")
+
+    pos = HEADER.size
+    meta = json.loads(data[pos:pos + meta_len])
+    pos += meta_len
+    columns = []
+    for kind in (key_kind, value_kind):
+        (length,) = LENGTH.unpack_from(data, pos)
+        pos += LENGTH.size
+        columns.append(_decode(kind, data[pos:pos + length], count))
+        pos += length
+    keys, values = columns
+    return keys, values, meta
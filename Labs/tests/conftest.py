@@ -0,0 +1,7 @@
+# The lab modules import each other by plain name from Labs/
+import os
+import sys
+
+LAB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if LAB_DIR not in sys.path:
+    sys.path.insert(0, LAB_DIR)
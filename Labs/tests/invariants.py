@@ -0,0 +1,127 @@
+# Structural checks shared by the tests
+
+
+def check_btree(tree):
+    """Check the B-tree rules on 'tree' and return its keys in order"""
+    t = tree.t
+    keys = []
+    leaf_depths = set()
+
+    def visit(node, lo, hi, depth, is_root):
+        node_keys = list(node['keys'])
+        assert len(node['values']) == len(node_keys)
+        assert len(node_keys) <= 2 * t - 1
+        if not is_root:
+            assert len(node_keys) >= t - 1
+        assert node_keys == sorted(set(node_keys))
+        assert all((lo is None or lo < key) and (hi is None or key < hi) for key in node_keys)
+        if node['leaf']:
+            leaf_depths.add(depth)
+            keys.extend(node_keys)
+            return
+        children = list(node['children'])
+        assert len(children) == len(node_keys) + 1
+        bounds = [lo] + node_keys + [hi]
+        for i, child in enumerate(children):
+            visit(child, bounds[i], bounds[i + 1], depth + 1, False)
+            if i < len(node_keys):
+                keys.append(node_keys[i])
+
+    visit(tree.root, None, None, 0, True)
+    assert len(leaf_depths) <= 1
+    assert len(keys) == len(tree)
+    return keys
+
+
+def check_bplus(tree):
+    """Check the B+ tree rules on 'tree', including the leaf chain, and
+    return its keys in order"""
+    t = tree.t
+    leaves = []
+    leaf_depths = set()
+
+    def visit(node, lo, hi, depth, is_root):
+        node_keys = list(node['keys'])
+        assert len(node_keys) <= 2 * t - 1
+        if not is_root:
+            assert len(node_keys) >= t - 1
+        assert node_keys == sorted(set(node_keys))
+        if node['leaf']:
+            assert len(node['values']) == len(node_keys)
+            assert all((lo is None or lo <= key) and (hi is None or key < hi) for key in node_keys)
+            leaf_depths.add(depth)
+            leaves.append(node)
+            return
+        children = node['children']
+        assert len(children) == len(node_keys) + 1
+        bounds = [lo] + node_keys + [hi]
+        for i, child in enumerate(children):
+            visit(child, bounds[i], bounds[i + 1], depth + 1, False)
+
+    visit(tree.root, None, None, 0, True)
+    assert len(leaf_depths) == 1
+
+    # The chain links exactly the leaves of the tree, left to right
+    chain = []
+    leaf = tree.first_leaf()
+    assert leaf['prev'] is None
+    while leaf is not None:
+        if chain:
+            assert leaf['prev'] is chain[-1]
+        chain.append(leaf)
+        leaf = leaf['next']
+    assert len(chain) == len(leaves)
+    assert all(a is b for a, b in zip(chain, leaves))
+    assert chain[-1] is tree.last_leaf()
+
+    keys = [key for leaf in chain for key in leaf['keys']]
+    assert keys == sorted(set(keys))
+    assert len(keys) == len(tree)
+    return keys
+
+
+def check_avl(root, fields, nil=None):
+    """Check the AVL rules on the tree under 'root' and return its keys in
+    order. fields(node) gives (key, left, right, height, size); 'nil' is
+    what stands for "no child"."""
+    keys = []
+
+    def visit(node, lo, hi):
+        if node == nil:
+            return 0, 0
+        key, left, right, node_height, node_size = fields(node)
+        assert (lo is None or lo < key) and (hi is None or key < hi)
+        left_height, left_size = visit(left, lo, key)
+        keys.append(key)
+        right_height, right_size = visit(right, key, hi)
+        assert abs(left_height - right_height) <= 1
+        assert node_height == 1 + max(left_height, right_height)
+        assert node_size == 1 + left_size + right_size
+        return node_height, node_size
+
+    visit(root, None, None)
+    return keys
+
+
+def check_rb(root, fields, nil=None):
+    """Check the Red-Black rules on the tree under 'root' and return its
+    keys in order. fields(node) gives (key, left, right, is_red, size)."""
+    keys = []
+
+    # Returns (black height, size)
+    def visit(node, lo, hi, parent_red):
+        if node == nil:
+            return 1, 0
+        key, left, right, red, node_size = fields(node)
+        assert (lo is None or lo < key) and (hi is None or key < hi)
+        assert not (red and parent_red)
+        left_black, left_size = visit(left, lo, key, red)
+        keys.append(key)
+        right_black, right_size = visit(right, key, hi, red)
+        assert left_black == right_black
+        assert node_size == 1 + left_size + right_size
+        return left_black + (not red), node_size
+
+    assert root == nil or not fields(root)[3]
+    visit(root, None, None, False)
+    return keys
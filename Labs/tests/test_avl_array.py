@@ -0,0 +1,23 @@
+import pytest
+
+from avl_array import ArrayAVLTree
+
+
+# A rebuild that fails on a key the int64 column rejects must leave the
+# tree as it was, not empty
+def test_failed_rebuild_leaves_the_tree_unchanged():
+    tree = ArrayAVLTree.bulk_load(range(10), [key * 2 for key in range(10)])
+    with pytest.raises(TypeError):
+        tree.insert_many([1.5, 2.5, 3.5])
+    assert len(tree) == 10
+    assert list(tree.items()) == [(key, key * 2) for key in range(10)]
+    assert tree.select(4) == 4 and tree.rank(7) == 7
+    tree.insert(10, 20)
+    assert list(tree) == list(range(11))
+
+
+def test_bulk_load_builds_a_balanced_tree():
+    tree = ArrayAVLTree.bulk_load(range(1000))
+    assert len(tree) == 1000
+    assert tree._height[tree.root] == (1000).bit_length()
+    assert list(tree.range(10, 20)) == list(range(10, 20))
@@ -0,0 +1,59 @@
+import random
+from bisect import bisect_left
+
+import pytest
+
+import tree_loader
+from invariants import check_bplus
+
+btree = tree_loader.load("btree")
+
+
+def walk_forward(tree):
+    cursor = btree.LeafCursor(tree, items=True)
+    return list(cursor)
+
+
+def walk_backward(tree):
+    cursor = btree.LeafCursor(tree, items=True)
+    cursor.seek_end()
+    items = []
+    while True:
+        try:
+            items.append(cursor.prev())
+        except StopIteration:
+            return items
+
+
+# Random inserts, then deletes down to a handful of keys, so leaves split,
+# merge and borrow from both sides; after every round the leaf chain must
+# hold exactly the sorted keys, walked either way
+@pytest.mark.parametrize("t", [2, 3])
+@pytest.mark.parametrize("seed", range(5))
+def test_leaf_walk_after_random_updates(t, seed):
+    rng = random.Random(seed)
+    tree = btree.BPlusTree(t)
+    model = {}
+    for size in (300, 40, 250, 5, 0):
+        while len(model) < size:
+            key = rng.randrange(1000)
+            tree.insert(key, -key)
+            model[key] = -key
+        for key in rng.sample(sorted(model), len(model) - size):
+            assert tree.delete(key)
+            del model[key]
+        # A key that is not there changes nothing
+        assert not tree.delete(1000)
+
+        expected = sorted(model.items())
+        keys = [key for key, _ in expected]
+        assert check_bplus(tree) == keys
+        assert walk_forward(tree) == expected
+        assert walk_backward(tree) == expected[::-1]
+
+        cursor = btree.LeafCursor(tree)
+        for probe in rng.sample(range(-5, 1005), 20):
+            cursor.seek(probe)
+            assert list(cursor) == keys[bisect_left(keys, probe):]
+        lo, hi = sorted(rng.sample(range(1000), 2))
+        assert list(tree.range(lo, hi, reverse=True)) == [k for k in reversed(keys) if lo <= k < hi]
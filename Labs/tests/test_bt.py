@@ -0,0 +1,65 @@
+from collections import deque
+
+import pytest
+
+import tree_loader
+
+bt = tree_loader.load("bt")
+
+ORDERS = {"inorder": bt.inorder, "preorder": bt.preorder, "postorder": bt.postorder}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if bt.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(bt, "np", None)
+    return request.param
+
+
+def level_order(root):
+    order = []
+    queue = deque([root] if root else [])
+    while queue:
+        node = queue.popleft()
+        order.append(node["data"])
+        queue.extend(child for child in (node["left"], node["right"]) if child)
+    return order
+
+
+# The closed-form permutations against the recursive traversals of the
+# same level-order array, built as linked nodes
+@pytest.mark.parametrize("n", range(65))
+def test_traversal_order_matches_the_recursive_traversals(n, backend):
+    root = bt.insert_level_order(list(range(n)), 0, n)
+    assert level_order(root) == list(range(n))
+    for kind, traverse in ORDERS.items():
+        assert list(bt.traversal_order(n, kind)) == traverse(root)
+
+
+@pytest.mark.parametrize("n", [0, 1, 6, 31, 64])
+def test_implicit_tree_gathers_the_values(n, backend):
+    values = [f"v{i}" for i in range(n)]
+    root = bt.insert_level_order(values, 0, n)
+    tree = bt.ImplicitTree(values)
+    assert len(tree) == n
+    assert tree.height() == n.bit_length()
+    for kind, traverse in ORDERS.items():
+        assert getattr(tree, kind)() == traverse(root)
+
+
+@pytest.mark.skipif(bt.np is None, reason="NumPy is not installed")
+def test_implicit_tree_keeps_numpy_arrays():
+    values = bt.np.arange(10, 30)
+    result = bt.ImplicitTree(values).inorder()
+    assert isinstance(result, bt.np.ndarray)
+    assert result.tolist() == bt.inorder(bt.insert_level_order(values.tolist(), 0, 20))
+
+
+def test_links():
+    tree = bt.ImplicitTree(list(range(6)))
+    assert (tree.left(0), tree.right(0), tree.parent(0)) == (1, 2, None)
+    assert (tree.left(2), tree.right(2), tree.parent(5)) == (5, None, 2)
+    assert tree.left(3) is None
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+import disk_btree
+from disk_btree import DiskBTree
+from invariants import check_btree
+
+
+def test_missing_value_reads_back_as_none(tmp_path):
+    path = tmp_path / "tree.db"
+    with DiskBTree(path, t=3) as tree:
+        tree.insert(1)
+        tree.insert(2, 0)
+        tree.insert(3, -7)
+        assert tree.get(1) is None
+        assert tree.get(2) == 0
+        assert tree.get(4, "absent") == "absent"
+        assert tree[1] is None
+        assert tree.get_many([1, 2, 4], "absent") == [None, 0, "absent"]
+        assert list(tree.items()) == [(1, None), (2, 0), (3, -7)]
+    with DiskBTree(path) as tree:
+        assert list(tree.items()) == [(1, None), (2, 0), (3, -7)]
+
+
+def test_reserved_value_is_rejected(tmp_path):
+    with DiskBTree(tmp_path / "tree.db", t=3) as tree:
+        tree.insert(1, 10)
+        with pytest.raises(ValueError):
+            tree.insert(2, disk_btree.NO_VALUE)
+        with pytest.raises(ValueError):
+            tree.insert(1, disk_btree.NO_VALUE)
+        assert list(tree.items()) == [(1, 10)]
+
+
+def test_splits_across_file_growth_and_reopen(tmp_path):
+    path = tmp_path / "tree.db"
+    rng = random.Random(11)
+    keys = rng.sample(range(-10**6, 10**6), 3000)
+    expected = {key: key * 3 for key in keys}
+    with DiskBTree(path, t=2) as tree:
+        initial = path.stat().st_size
+        for key in keys:
+            assert tree.insert(key, key * 3)
+        assert path.stat().st_size > initial
+        assert check_btree(tree) == sorted(expected)
+
+    with DiskBTree(path) as tree:
+        assert tree.t == 2
+        assert len(tree) == len(expected)
+        assert check_btree(tree) == sorted(expected)
+        assert list(tree.items()) == sorted(expected.items())
+        for key in keys[::2]:
+            assert tree.delete(key)
+            del expected[key]
+        assert not tree.delete(10**7)
+
+    with DiskBTree(path) as tree:
+        assert check_btree(tree) == sorted(expected)
+        assert all(tree.get(key) == value for key, value in expected.items())
+
+
+def test_reopen_rejects_a_different_degree(tmp_path):
+    path = tmp_path / "tree.db"
+    DiskBTree(path, t=3).close()
+    with pytest.raises(ValueError):
+        DiskBTree(path, t=4)
+    with DiskBTree(path) as tree:
+        assert tree.t == 3
+
+
+def test_freed_pages_are_reused(tmp_path):
+    path = tmp_path / "tree.db"
+    with DiskBTree(path, t=2) as tree:
+        tree.insert_many(range(500))
+        pages = tree._page_count
+        tree.delete_many(range(0, 500, 2))
+        tree.insert_many(range(1000, 1250))
+        assert tree._page_count <= pages + 2
+        check_btree(tree)
+
+
+def test_eviction_writes_back_dirty_pages(tmp_path):
+    path = tmp_path / "tree.db"
+    page_size = disk_btree.page_size_for(2)
+    rng = random.Random(12)
+    keys = rng.sample(range(100_000), 2000)
+    with DiskBTree(path, t=2, cache_bytes=4 * page_size) as tree:
+        for key in keys:
+            tree.insert(key, key + 1)
+            info = tree.cache_info()
+            assert info["pages"] <= 4
+            assert info["dirty"] <= info["pages"]
+        assert tree.evictions > 0
+        assert tree.misses > 0
+        # Every page evicted while dirty was written back, or these reads
+        # would find the old contents of the file
+        assert all(tree.get(key) == key + 1 for key in keys)
+        check_btree(tree)
+        # Overwrite values only: no split, but the pages become dirty again
+        for key in keys:
+            assert not tree.insert(key, -key)
+    with DiskBTree(path) as tree:
+        assert sorted(tree.items()) == sorted((key, -key) for key in keys)
+
+
+def test_bulk_load_replaces_the_file(tmp_path):
+    path = tmp_path / "tree.db"
+    with DiskBTree(path, t=3) as tree:
+        tree.insert_many(range(100))
+    with DiskBTree.bulk_load(path, [5, 1, 3], [50, None, 30]) as tree:
+        assert list(tree.items()) == [(1, None), (3, 30), (5, 50)]
+    with DiskBTree(path) as tree:
+        assert list(tree.items()) == [(1, None), (3, 30), (5, 50)]
+        check_btree(tree)
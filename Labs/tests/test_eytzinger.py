@@ -0,0 +1,90 @@
+import random
+from bisect import bisect_left
+
+import pytest
+
+import eytzinger
+from eytzinger import FrozenIndex
+
+HAVE_NUMPY = eytzinger.np is not None
+
+
+# Run each test with NumPy, if it is installed, and with the plain Python
+# fallback
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if not HAVE_NUMPY:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(eytzinger, "np", None)
+        monkeypatch.setattr(eytzinger.bt, "np", None)
+    return request.param
+
+
+def key_sets():
+    rng = random.Random(23)
+    yield []
+    yield [5]
+    yield rng.sample(range(-1000, 1000), 300)
+    yield [rng.uniform(-10, 10) for _ in range(100)]
+    yield [f"k{i:03}" for i in rng.sample(range(500), 77)]
+    for n in range(1, 18):
+        yield list(range(0, 2 * n, 2))
+
+
+def probes(keys):
+    if not keys:
+        return [0, 1, -1]
+    if isinstance(keys[0], str):
+        return keys + ["", "k", "k0005", "zzz"]
+    if isinstance(keys[0], float):
+        return keys + [-11.0, 0.5, 11.0] + [key + 1e-9 for key in keys[:10]]
+    return keys + [key + 1 for key in keys] + [min(keys) - 1, max(keys) + 1]
+
+
+@pytest.mark.parametrize("keys", list(key_sets()), ids=lambda keys: f"{len(keys)} keys")
+def test_matches_bisect_on_a_sorted_list(keys, backend):
+    values = [f"v{key}" for key in keys]
+    index = FrozenIndex(keys, values)
+    ordered = sorted(keys)
+    expected = dict(zip(keys, values))
+    queries = probes(keys)
+    assert len(index) == len(keys)
+
+    for query in queries:
+        rank = bisect_left(ordered, query)
+        slot = index.lower_bound(query)
+        if rank == len(ordered):
+            assert slot == -1
+        else:
+            assert index.keys[slot] == ordered[rank]
+        assert index.search(query) == (query in expected)
+        assert (query in index) == (query in expected)
+        assert index.get(query, "none") == expected.get(query, "none")
+
+    assert index.search_many(queries) == [query in expected for query in queries]
+    assert index.get_many(queries, "none") == [expected.get(query, "none") for query in queries]
+
+    assert list(index) == ordered
+    assert list(index.items()) == [(key, expected[key]) for key in ordered]
+    for lo, hi in zip(queries[::7], queries[3::7]):
+        lo, hi = min(lo, hi), max(lo, hi)
+        assert list(index.range(lo, hi)) == ordered[bisect_left(ordered, lo):bisect_left(ordered, hi)]
+        assert list(index.items(lo, None)) == [(key, expected[key]) for key in ordered
+                                                if key >= lo]
+
+
+def test_batch_with_keys_outside_the_column_type(backend):
+    index = FrozenIndex([1, 2, 3], ["a", "b", "c"])
+    queries = [2, 2.0, 1 << 70, 3]
+    assert index.search_many(queries) == [True, True, False, True]
+    assert index.get_many(queries) == ["b", "b", None, "c"]
+    assert index.get_many([]) == []
+
+
+def test_missing_key_raises_key_error():
+    index = FrozenIndex([1, 2])
+    assert index[2] is None
+    with pytest.raises(KeyError):
+        index[3]
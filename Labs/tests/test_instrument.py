@@ -0,0 +1,99 @@
+import pytest
+
+import instrument
+import tree_loader
+
+MISSING = object()
+
+
+# Every attribute enable() may swap, as it is before any tree is counted
+def patch_points():
+    avl = tree_loader.load("avl")
+    rb = tree_loader.load("rb")
+    btree = tree_loader.load("btree")
+    owners = [(avl, ("left_rotate", "right_rotate")),
+              (rb.RedBlackTree, ("left_rotate", "right_rotate", "_fix_step")),
+              (btree, ("bisect_left", "bisect_right"))]
+    for cls in (btree.BTree, btree.BPlusTree):
+        owners.append((cls, ("split_child", "merge", "borrow_prev", "borrow_next")))
+    return {(owner, name): vars(owner).get(name, MISSING)
+            for owner, names in owners for name in names}
+
+
+def test_disable_restores_every_original():
+    before = patch_points()
+    trees = [tree_loader.make_tree(kind) for kind in ("avl", "rb", "bplus")]
+    for tree in trees:
+        instrument.enable(tree)
+    assert instrument.enable(trees[0]) is instrument.stats(trees[0])
+    assert patch_points() != before
+
+    instrument.disable(trees[0])
+    assert patch_points() != before   # the other trees are still counted
+    for tree in trees[1:]:
+        instrument.disable(tree)
+    instrument.disable(trees[0])      # a second disable does nothing
+
+    after = patch_points()
+    assert all(after[point] is before[point] for point in before)
+    for tree in trees:
+        assert instrument.stats(tree) is None
+        assert not {"insert", "delete", "search", "get"} & set(vars(tree))
+
+
+def test_rejects_other_trees():
+    with pytest.raises(TypeError):
+        instrument.enable(object())
+
+
+# A BST search compares == and then < at each node it passes, and only ==
+# at the node it finds; delete compares != and then <
+def test_bst_counters_and_histograms():
+    tree = tree_loader.make_tree("bst")
+    stats = instrument.enable(tree)
+    try:
+        for key in (2, 1, 3):
+            tree.insert(key)
+        assert tree.search(3)
+        assert not tree.search(0)
+        assert tree.delete(1)
+        assert tree.get(2) is None
+    finally:
+        instrument.disable(tree)
+    tree.insert(5)   # no longer counted
+
+    snapshot = stats.snapshot()
+    assert snapshot["tree"] == "bst"
+    assert snapshot["operations"] == {
+        "insert": {"count": 3, "comparisons": 4, "nodes": 2, "events": {}},
+        "search": {"count": 2, "comparisons": 7, "nodes": 4, "events": {}},
+        "delete": {"count": 1, "comparisons": 3, "nodes": 2, "events": {}},
+        "get": {"count": 1, "comparisons": 1, "nodes": 1, "events": {}},
+    }
+    insert = snapshot["histograms"]["comparisons/insert"]
+    assert insert["sum"] == 4 and insert["count"] == 3
+    assert insert["buckets"][:4] == [(0, 1), (1, 1), (2, 3), (4, 3)]
+    assert insert["buckets"][-1] == ("+Inf", 3)
+    search = snapshot["histograms"]["comparisons/search"]
+    assert search["buckets"][:4] == [(0, 0), (1, 0), (2, 0), (4, 2)]
+
+    text = stats.export()
+    assert 'tree_operations_total{tree="bst",op="insert"} 3' in text
+    assert 'tree_comparisons_per_operation_bucket{tree="bst",op="search",le="4"} 2' in text
+
+
+def test_structural_events():
+    avl = tree_loader.make_tree("avl")
+    btree = tree_loader.make_tree("btree", t=2)
+    stats = [instrument.enable(avl), instrument.enable(btree)]
+    try:
+        for key in (1, 2, 3):
+            avl.insert(key)
+        for key in (1, 2, 3, 4):
+            btree.insert(key)
+    finally:
+        instrument.disable(avl)
+        instrument.disable(btree)
+    assert stats[0].snapshot()["events"] == {"left_rotate": 1}
+    assert stats[1].snapshot()["events"] == {"split_child": 1}
+    assert list(avl) == [1, 2, 3] and list(btree) == [1, 2, 3, 4]
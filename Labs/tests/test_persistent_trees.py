@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from invariants import check_avl, check_rb
+from persistent_trees import RED, PersistentAVLTree, PersistentRedBlackTree
+
+
+def avl_fields(node):
+    return node.key, node.left, node.right, node.height, node.size
+
+
+def rb_fields(node):
+    return node.key, node.left, node.right, node.color == RED, node.size
+
+
+def check(tree):
+    if isinstance(tree, PersistentAVLTree):
+        return check_avl(tree.root, avl_fields)
+    return check_rb(tree.root, rb_fields)
+
+
+TREES = [PersistentAVLTree, PersistentRedBlackTree]
+
+
+# Random inserts and deletes (present and absent keys, and repeated
+# inserts), checked against a dict after every step
+@pytest.mark.parametrize("cls", TREES)
+@pytest.mark.parametrize("seed", range(4))
+def test_random_updates_keep_the_invariants(cls, seed):
+    rng = random.Random(seed)
+    tree = cls()
+    model = {}
+    for step in range(1500):
+        key = rng.randrange(300)
+        if rng.random() < 0.55:
+            assert tree.insert(key, step) == (key not in model)
+            model[key] = step
+        else:
+            assert tree.delete(key) == (key in model)
+            model.pop(key, None)
+        if step % 50 == 0 or step > 1400:
+            assert check(tree) == sorted(model)
+    assert dict(tree.items()) == model
+    assert [tree.select(i) for i in range(len(tree))] == sorted(model)
+    while model:
+        key = rng.choice(sorted(model))
+        assert tree.delete(key)
+        del model[key]
+        assert check(tree) == sorted(model)
+    assert tree.root is None
+
+
+@pytest.mark.parametrize("cls", TREES)
+def test_old_versions_do_not_change(cls):
+    rng = random.Random(17)
+    tree = cls()
+    versions = []
+    model = {}
+    for step in range(600):
+        key = rng.randrange(200)
+        if rng.random() < 0.6:
+            tree.insert(key, step)
+            model[key] = step
+        else:
+            tree.delete(key)
+            model.pop(key, None)
+        if step % 60 == 0:
+            versions.append((tree.snapshot(), dict(model)))
+
+    for old, expected in versions:
+        assert dict(old.items()) == expected
+        assert check(old) == sorted(expected)
+
+
+@pytest.mark.parametrize("cls", TREES)
+def test_scan_sees_the_version_it_started_on(cls):
+    tree = cls()
+    tree.insert_many(range(100))
+    assert check(tree) == list(range(100))
+    scan = tree.range(10, 20)
+    first = next(scan)
+    tree.delete_many(range(100))
+    tree.insert(15, "new")
+    assert [first, *scan] == list(range(10, 20))
+    assert list(tree.items()) == [(15, "new")]
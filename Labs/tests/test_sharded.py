@@ -0,0 +1,67 @@
+import multiprocessing
+import random
+
+import pytest
+
+import sharded
+from sharded import ShardedTree
+
+LAYOUTS = {"hash": {"shards": 3}, "range": {"boundaries": [100, 200]}}
+
+
+# Workers started the platform's default way, and by spawn (a fresh
+# interpreter that imports sharded, as on Windows and macOS)
+@pytest.fixture(params=["default", "spawn"])
+def start_method(request, monkeypatch):
+    if request.param == "spawn":
+        monkeypatch.setattr(sharded, "multiprocessing", multiprocessing.get_context("spawn"))
+    return request.param
+
+
+@pytest.mark.parametrize("layout", sorted(LAYOUTS))
+def test_matches_a_dict(layout, start_method):
+    rng = random.Random(18)
+    model = {}
+    with ShardedTree("avl", **LAYOUTS[layout]) as tree:
+        keys = rng.sample(range(300), 150)
+        assert tree.insert_many(keys, [-key for key in keys]) == 150
+        model.update((key, -key) for key in keys)
+        for key in rng.sample(range(300), 40):
+            assert tree.insert(key, key) == (key not in model)
+            model[key] = key
+        gone = rng.sample(range(300), 60)
+        for key in gone[:20]:
+            assert tree.delete(key) == (key in model)
+            model.pop(key, None)
+        assert tree.delete_many(gone[20:]) == sum(key in model for key in gone[20:])
+        for key in gone[20:]:
+            model.pop(key, None)
+
+        assert len(tree) == len(model)
+        assert list(tree.items()) == sorted(model.items())
+        assert list(tree.range(50, 250, reverse=True)) == sorted(
+            (key for key in model if 50 <= key < 250), reverse=True)
+        assert [tree.get(key, "none") for key in range(300)] == [
+            model.get(key, "none") for key in range(300)]
+        assert tree.search_many(range(300)) == [key in model for key in range(300)]
+        workers = list(tree.workers)
+
+    # Shutdown stops every worker
+    assert not any(worker.is_alive() for worker in workers)
+    assert not set(workers) & set(multiprocessing.active_children())
+
+
+@pytest.mark.parametrize("layout", sorted(LAYOUTS))
+def test_key_that_does_not_compare_fails_at_insert(layout):
+    with ShardedTree("avl", **LAYOUTS[layout]) as tree:
+        tree.insert(5)
+        # A string on another shard than 5, where no shard would compare it
+        # with 5 until items() merges them
+        word = next(word for word in map(str, range(100))
+                    if layout == "range" or tree.shard_of(word) != tree.shard_of(5))
+        with pytest.raises(TypeError):
+            tree.insert(word)
+        with pytest.raises(TypeError):
+            tree.insert_many([word, word + "x"])
+        assert tree.insert_many([1, 2]) == 2
+        assert list(tree) == [1, 2, 5]
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import tree_loader
+from avl_array import ArrayAVLTree
+from disk_btree import DiskBTree
+from persistent_trees import PersistentAVLTree, PersistentRedBlackTree
+from threadsafe import ConcurrentBTree, LockedTree
+from wal import DurableTree
+
+KEYS = random.Random(14).sample(range(10_000), 500)
+EXPECTED = sorted((key, key * 3 if key % 5 else None) for key in KEYS)
+
+
+def fill(tree):
+    for key in KEYS:
+        tree.insert(key, key * 3 if key % 5 else None)
+    return tree
+
+
+def saved(tree, tmp_path):
+    path = str(tmp_path / "tree.snap")
+    fill(tree).save(path)
+    return path
+
+
+@pytest.mark.parametrize("kind", sorted(tree_loader.TREES))
+def test_round_trip_registered_trees(kind, tmp_path):
+    cls = tree_loader.tree_class(kind)
+    loaded = cls.load(saved(cls(), tmp_path))
+    assert type(loaded) is cls
+    assert list(loaded.items()) == EXPECTED
+
+
+@pytest.mark.parametrize("cls", [ArrayAVLTree, PersistentAVLTree, PersistentRedBlackTree,
+                                 ConcurrentBTree])
+def test_round_trip_other_trees(cls, tmp_path):
+    loaded = cls.load(saved(cls(), tmp_path))
+    assert list(loaded.items()) == EXPECTED
+
+
+def test_round_trip_keeps_the_btree_degree(tmp_path):
+    btree = tree_loader.tree_class("btree")
+    assert btree.load(saved(btree(t=5), tmp_path)).t == 5
+
+
+def test_disk_btree_loads_into_a_file(tmp_path):
+    with DiskBTree(str(tmp_path / "a.db"), t=8) as tree:
+        path = saved(tree, tmp_path)
+    with DiskBTree.load(path, str(tmp_path / "b.db")) as loaded:
+        assert loaded.t == 8
+        assert list(loaded.items()) == EXPECTED
+    with DiskBTree(str(tmp_path / "b.db")) as reopened:
+        assert list(reopened.items()) == EXPECTED
+
+
+def test_locked_tree_loads_into_the_tree_given(tmp_path):
+    avl = tree_loader.load("avl")
+    path = saved(LockedTree(avl.AVLTree()), tmp_path)
+    loaded = LockedTree.load(path, avl.AVLTree())
+    assert isinstance(loaded.tree, avl.AVLTree)
+    assert list(loaded.items()) == EXPECTED
+
+
+def test_durable_tree_starts_from_the_snapshot(tmp_path):
+    avl = tree_loader.load("avl")
+    directory = str(tmp_path / "wal")
+    with DurableTree(avl.AVLTree(), directory) as tree:
+        path = saved(tree, tmp_path)
+    with pytest.raises(ValueError):
+        DurableTree.load(path, avl.AVLTree(), directory)
+
+    directory = str(tmp_path / "fresh")
+    with DurableTree.load(path, avl.AVLTree(), directory) as loaded:
+        assert list(loaded.items()) == EXPECTED
+    # The snapshot is the checkpoint, so it survives a restart
+    with DurableTree(avl.AVLTree(), directory) as reopened:
+        assert list(reopened.items()) == EXPECTED
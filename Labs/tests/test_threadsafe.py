@@ -0,0 +1,78 @@
+import random
+import threading
+
+from invariants import check_btree
+from threadsafe import ConcurrentBTree
+
+WRITERS = 4
+SCANNERS = 2
+
+
+# Run each target in its own thread, all starting together, and re-raise
+# the first error any of them hit
+def run_together(targets):
+    start = threading.Barrier(len(targets))
+    errors = []
+
+    def run(target):
+        start.wait()
+        try:
+            target()
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def test_concurrent_insert_delete_and_scan():
+    # Small nodes, so splits, merges and borrows happen all the time. The
+    # even keys are loaded up front and never touched; writer w owns the
+    # odd keys 2j+1 with j % WRITERS == w.
+    tree = ConcurrentBTree(t=2)
+    stable = list(range(0, 2000, 2))
+    tree.insert_many(stable, [-key for key in stable])
+    owned = [list(range(2 * w + 1, 2000, 2 * WRITERS)) for w in range(WRITERS)]
+    kept = [set() for _ in range(WRITERS)]
+    writing = threading.Event()
+    writing.set()
+    done = []
+
+    def writer(w):
+        def work():
+            rng = random.Random(w)
+            keys = owned[w]
+            for _ in range(3):
+                rng.shuffle(keys)
+                for key in keys:
+                    assert tree.insert(key, key) == (key not in kept[w])
+                    kept[w].add(key)
+                for key in rng.sample(keys, len(keys) // 2):
+                    assert tree.delete(key)
+                    kept[w].discard(key)
+            done.append(w)
+            if len(done) == WRITERS:
+                writing.clear()
+        return work
+
+    def scanner():
+        while writing.is_set():
+            keys = list(tree.range())
+            assert keys == sorted(set(keys))
+            assert set(stable) <= set(keys)
+            for key in stable[::97]:
+                assert tree.get(key) == -key
+
+    run_together([writer(w) for w in range(WRITERS)] + [scanner] * SCANNERS)
+
+    expected = {key: -key for key in stable}
+    for w in range(WRITERS):
+        expected.update((key, key) for key in kept[w])
+    assert check_btree(tree) == sorted(expected)
+    assert dict(tree.items()) == expected
+    assert len(tree) == len(expected)
@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+import tree_batch
+import tree_loader
+from tree_batch import ingest, read_words, replay
+
+
+@pytest.mark.parametrize("text", [
+    "", "   ", "12", "1 22 333 4444", "  1 22\n333\t4444  ", "abcdefgh ij",
+    "1 22 333 4444\n", "a\n\nb  c",
+])
+@pytest.mark.parametrize("block", [1, 2, 3, 4, 7])
+def test_read_words_joins_words_split_across_blocks(text, block):
+    chunks = list(read_words(io.StringIO(text), block))
+    assert [word for words in chunks for word in words] == text.split()
+
+
+def test_read_words_carries_a_word_over_block_boundaries():
+    # Blocks: "1 2" "2 3" "33 " "444" "4"; the last word has no whitespace
+    # after it and comes out once the input ends
+    assert list(read_words(io.StringIO("1 22 333 4444"), 3)) == [
+        ["1"], ["22"], ["333"], [], [], ["4444"]]
+
+
+def test_ingest_inserts_every_key(monkeypatch):
+    monkeypatch.setattr(tree_batch, "BLOCK", 3)
+    tree = tree_loader.make_tree("avl")
+    count, added = ingest(tree, io.StringIO("5 3 17\n3 100 2.5 -1"), chunk=2)
+    assert (count, added) == (7, 6)
+    assert list(tree) == [-1, 2.5, 3, 5, 17, 100]
+
+
+def test_ingest_rejects_a_bad_key():
+    with pytest.raises(ValueError):
+        ingest(tree_loader.make_tree("avl"), io.StringIO("1 [2] 3"))
+
+
+# Parse errors sit in the middle of chunks (chunk=3), between runs that
+# are applied as batches; every reply must stay on its request's line
+def test_replay_keeps_replies_in_order():
+    ops = "\n".join([
+        "# a comment, then a blank line",
+        "",
+        "INSERT 1 one",
+        "FROB 2",
+        "INSERT 2 two",
+        "GET 1",
+        "GET",
+        "GET 2",
+        "RANGE null null 1 2",
+        "DELETE 1",
+        "LEN",
+        "QUIT",
+        "INSERT 3",
+    ])
+    out = io.StringIO()
+    tree = tree_loader.make_tree("avl")
+    assert replay(tree, io.StringIO(ops), out, chunk=3) == (9, 3)
+    assert out.getvalue().splitlines() == [
+        "OK true",
+        "ERR unknown command FROB",
+        "OK true",
+        'OK "one"',
+        "ERR GET takes 1 arguments",
+        'OK "two"',
+        "ERR RANGE takes 2 to 3 arguments",
+        "OK true",
+        "OK 1",
+    ]
+    assert list(tree.items()) == [(2, "two")]
+
+
+# Long runs of one kind go through the batched calls (see MIN_RUN)
+def test_replay_with_batched_runs():
+    keys = list(range(40))
+    ops = "".join(f"INSERT {key}\n" for key in keys) + "INSERT x\n" + \
+        "".join(f"SEARCH {key}\n" for key in keys + [99])
+    out = io.StringIO()
+    tree = tree_loader.make_tree("btree")
+    assert replay(tree, io.StringIO(ops), out, chunk=25) == (82, 1)
+    replies = out.getvalue().splitlines()
+    assert replies[:40] == ["OK true"] * 40
+    assert replies[40].startswith("ERR ")
+    assert replies[41:] == ["OK true"] * 40 + ["OK false"]
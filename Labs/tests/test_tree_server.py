@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+import tree_server
+from avl import AVLTree
+from tree_server import TreeServer, apply_requests, parse_request
+
+
+class BrokenWriter:
+    """A stream writer whose client has gone away"""
+
+    def __init__(self):
+        self.closed = False
+
+    def write(self, data):
+        raise ConnectionResetError("client went away")
+
+    async def drain(self):
+        raise ConnectionResetError("client went away")
+
+    def close(self):
+        self.closed = True
+
+
+# More pipelined requests than the reply queue holds, sent to a client
+# that is gone: the connection must still end, not wait for queue room
+@pytest.mark.parametrize("eof", [True, False])
+def test_connection_ends_when_the_client_is_gone(eof):
+    async def run():
+        server = TreeServer(AVLTree())
+        server.requests = asyncio.Queue()
+        server._batcher = asyncio.ensure_future(server._run_batches())
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"PING\n" * (3 * tree_server.MAX_PENDING))
+        if eof:
+            reader.feed_eof()
+        writer = BrokenWriter()
+        try:
+            await asyncio.wait_for(server._handle(reader, writer), 5)
+        finally:
+            server.stop()
+        assert writer.closed
+
+    asyncio.run(run())
+
+
+def test_range_without_a_limit_is_capped():
+    tree = AVLTree.bulk_load(range(3 * tree_server.RANGE_LIMIT))
+    requests = [parse_request("RANGE null null"), parse_request("RANGE 10 null 5"),
+                parse_request(f"RANGE null null {2 * tree_server.RANGE_LIMIT}")]
+    capped, limited, raised = [json.loads(line[3:]) for line in apply_requests(tree, requests)]
+    assert len(capped) == tree_server.RANGE_LIMIT
+    assert limited == [[key, None] for key in range(10, 15)]
+    assert len(raised) == 2 * tree_server.RANGE_LIMIT
+
+
+def test_range_limit_has_a_maximum():
+    parse_request(f"RANGE null null {tree_server.MAX_RANGE_LIMIT}")
+    with pytest.raises(ValueError):
+        parse_request(f"RANGE null null {tree_server.MAX_RANGE_LIMIT + 1}")
+
+
+# A value JSON cannot encode gets an error reply of its own; the rest of
+# the batch is still answered, in order
+def test_value_that_cannot_be_sent_back():
+    tree = AVLTree.bulk_load(range(40), [{key} if key == 7 else key for key in range(40)])
+    requests = [parse_request(f"GET {key}") for key in range(20)] + [parse_request("RANGE 5 9")]
+    replies = apply_requests(tree, requests)
+    assert len(replies) == 21
+    assert replies[7].startswith("ERR ") and replies[20].startswith("ERR ")
+    assert [json.loads(line[3:]) for i, line in enumerate(replies[:20]) if i != 7] == \
+        [key for key in range(20) if key != 7]
+
+
+def test_server_survives_a_value_that_cannot_be_sent_back():
+    async def run():
+        server = TreeServer(AVLTree.bulk_load([1, 2], [{1}, 2]))
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET 1\nGET 2\nQUIT\n")
+            lines = [line async for line in reader]
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.stop()
+        assert lines[0].startswith(b"ERR ") and lines[1] == b"OK 2\n"
+
+    asyncio.run(run())
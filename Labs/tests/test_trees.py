@@ -0,0 +1,459 @@
+import random
+
+import pytest
+
+import tree_loader
+from invariants import check_avl, check_bplus, check_btree, check_rb
+
+KINDS = sorted(tree_loader.TREES)
+
+avl = tree_loader.load("avl")
+bst = tree_loader.load("bst")
+btree = tree_loader.load("btree")
+rb = tree_loader.load("rb")
+
+
+def check_bst(root):
+    keys = []
+
+    def visit(node, lo, hi):
+        if node is None:
+            return
+        key = node["data"]
+        assert (lo is None or lo < key) and (hi is None or key < hi)
+        visit(node["left"], lo, key)
+        keys.append(key)
+        visit(node["right"], key, hi)
+
+    visit(root, None, None)
+    return keys
+
+
+def check_red_black(tree):
+    nil = tree.nil
+    assert nil.color == rb.BLACK and nil.size == 0
+
+    # Every child points back at its parent
+    def visit(node, parent):
+        if node is nil:
+            return
+        assert node.parent is parent
+        visit(node.left, node)
+        visit(node.right, node)
+
+    visit(tree.root, None)
+    return check_rb(tree.root, lambda node: (node.key, node.left, node.right,
+                                             node.color == rb.RED, node.size), nil)
+
+
+def check(tree):
+    """Check the rules of any registered tree and return its keys in order"""
+    if isinstance(tree, bst.BinarySearchTree):
+        keys = check_bst(tree.root)
+    elif isinstance(tree, avl.AVLTree):
+        keys = check_avl(tree.root, lambda node: (node["key"], node["left"], node["right"],
+                                                  node["height"], node["size"]))
+    elif isinstance(tree, rb.RedBlackTree):
+        keys = check_red_black(tree)
+    elif isinstance(tree, btree.BPlusTree):
+        keys = check_bplus(tree)
+    else:
+        keys = check_btree(tree)
+    assert len(tree) == len(keys)
+    return keys
+
+
+# ----------------------------------------------------------------------
+# ---- RED-BLACK TREE ----
+# ----------------------------------------------------------------------
+@pytest.mark.parametrize("seed", range(4))
+def test_red_black_random_updates(seed):
+    rng = random.Random(seed)
+    tree = rb.RedBlackTree()
+    model = {}
+    for step in range(2000):
+        key = rng.randrange(400)
+        if rng.random() < 0.55:
+            tree.insert(key, step)
+            model[key] = step
+        else:
+            tree.delete(key)
+            model.pop(key, None)
+        if step % 100 == 0:
+            assert check(tree) == sorted(model)
+    assert dict(tree.items()) == model
+    for key in list(model):
+        tree.delete(key)
+    assert tree.root is tree.nil and check(tree) == []
+
+
+def test_red_black_trees_are_independent():
+    first, second = rb.RedBlackTree(), rb.RedBlackTree()
+    assert first.nil is not second.nil
+    first.insert_many(range(0, 100, 2))
+    second.insert_many(range(1, 100, 2))
+    first.delete(10)
+    assert check(first) == [key for key in range(0, 100, 2) if key != 10]
+    assert check(second) == list(range(1, 100, 2))
+    # Slotted nodes: no per-node __dict__
+    assert not hasattr(first.root, "__dict__")
+
+
+# ----------------------------------------------------------------------
+# ---- ITERATIVE BST ----
+# ----------------------------------------------------------------------
+# Sorted input makes a path of 2500 nodes, far deeper than the recursion
+# limit: insert, search, delete and inorder must not recurse
+def test_bst_degenerate_tree_needs_no_recursion():
+    n = 2500
+    root = None
+    for key in range(n):
+        root = bst.insert(root, key)
+    assert list(bst.inorder(root)) == list(range(n))
+    assert bst.search(root, n - 1) and not bst.search(root, n)
+    for key in range(0, n, 2):
+        root = bst.delete(root, key)
+    root = bst.delete(root, n)
+    assert list(bst.inorder(root)) == list(range(1, n, 2))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_bst_module_functions_match_a_set(seed):
+    rng = random.Random(seed)
+    root = None
+    model = set()
+    for _ in range(1500):
+        key = rng.randrange(200)
+        if rng.random() < 0.5:
+            root = bst.insert(root, key, -key)
+            model.add(key)
+        else:
+            root = bst.delete(root, key)
+            model.discard(key)
+        assert bst.search(root, key) == (key in model)
+    assert check_bst(root) == list(bst.inorder(root)) == sorted(model)
+    assert all(bst.find(root, key)["payload"] == -key for key in model)
+
+
+# ----------------------------------------------------------------------
+# ---- BULK LOADING ----
+# ----------------------------------------------------------------------
+def tree_height(root):
+    if root is None:
+        return 0
+    return 1 + max(tree_height(root["left"]), tree_height(root["right"]))
+
+
+@pytest.mark.parametrize("module", [bst, avl], ids=["bst", "avl"])
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 8, 100, 1023])
+def test_module_bulk_load_is_balanced(module, n):
+    rng = random.Random(n)
+    keys = rng.sample(range(10 * n + 1), n)
+    values = [-key for key in sorted(keys)]
+    cls = bst.BinarySearchTree if module is bst else avl.AVLTree
+    key_name, value_name = ("data", "payload") if module is bst else ("key", "value")
+    for root in (module.bulk_load(keys, [-key for key in keys]),
+                 module.from_sorted(sorted(keys), values)):
+        assert tree_height(root) == n.bit_length()
+        assert check(cls(root)) == sorted(keys)
+        nodes = module.find_many(root, sorted(keys))
+        assert [node[value_name] for node in nodes] == values
+        assert [node[key_name] for node in nodes] == sorted(keys)
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_bulk_load_classmethods(kind):
+    cls = tree_loader.tree_class(kind)
+    # A repeated key keeps its last value, as with insert()
+    tree = cls.bulk_load([5, 3, 9, 3, 1], ["a", "b", "c", "d", "e"])
+    assert list(tree.items()) == [(1, "e"), (3, "d"), (5, "a"), (9, "c")]
+    assert check(tree) == [1, 3, 5, 9]
+
+    tree = cls.from_sorted([1, 2, 2, 4], "wxyz")
+    assert list(tree.items()) == [(1, "w"), (2, "y"), (4, "z")]
+    assert len(cls.from_sorted([])) == 0
+
+    with pytest.raises(ValueError):
+        cls.from_sorted([1, 3, 2])
+    with pytest.raises(ValueError):
+        cls.bulk_load([1, 2], ["only one"])
+
+    tree = cls.bulk_load(range(500, 0, -1))
+    assert check(tree) == list(range(1, 501))
+    tree.insert(0)
+    tree.delete(250)
+    assert check(tree) == [key for key in range(501) if key != 250]
+
+
+def count_nodes(node):
+    if node['leaf']:
+        return 1
+    return 1 + sum(count_nodes(child) for child in node['children'])
+
+
+# Every size from empty up to a few levels, for small degrees and both
+# ends of the fill factor range
+@pytest.mark.parametrize("cls", [btree.BTree, btree.BPlusTree], ids=["btree", "bplus"])
+@pytest.mark.parametrize("t", [2, 3, 5])
+@pytest.mark.parametrize("fill_factor", [0.01, 0.5, 1.0])
+def test_btree_bottom_up_build(cls, t, fill_factor):
+    for n in list(range(60)) + [200, 1000]:
+        tree = cls.from_sorted(range(n), [-key for key in range(n)], t=t, fill_factor=fill_factor)
+        assert check(tree) == list(range(n))
+        assert tree.get(n // 2, "none") == (-(n // 2) if n else "none")
+    with pytest.raises(ValueError):
+        cls.from_sorted(range(10), fill_factor=0)
+
+
+def test_btree_fill_factor_sets_the_leaf_fill():
+    full = btree.BTree.from_sorted(range(1000), t=4, fill_factor=1.0)
+    half = btree.BTree.from_sorted(range(1000), t=4, fill_factor=0.5)
+    # Keys are spread evenly over the leaves: full ones hold 2t-1 = 7 keys
+    # or one fewer, half-full ones about 4
+    assert count_nodes(full.root) < count_nodes(half.root)
+    assert {len(leaf['keys']) for leaf in leaves(full.root)} <= {6, 7}
+    assert {len(leaf['keys']) for leaf in leaves(half.root)} <= {3, 4}
+
+
+def leaves(node):
+    if node['leaf']:
+        return [node]
+    return [leaf for child in node['children'] for leaf in leaves(child)]
+
+
+# Trees of different degrees side by side, each checked against a dict
+# through random inserts and deletes (the node searches are bisects)
+@pytest.mark.parametrize("cls", [btree.BTree, btree.BPlusTree], ids=["btree", "bplus"])
+def test_btree_degree_is_per_tree(cls):
+    rng = random.Random(6)
+    trees = {t: cls(t) for t in (2, 3, 16, 64)}
+    model = {}
+    for step in range(3000):
+        key = rng.randrange(1500)
+        if rng.random() < 0.6:
+            added = {tree.insert(key, step) for tree in trees.values()}
+            assert added == {key not in model}
+            model[key] = step
+        else:
+            removed = {tree.delete(key) for tree in trees.values()}
+            assert removed == {key in model}
+            model.pop(key, None)
+    for t, tree in trees.items():
+        assert tree.t == t
+        assert check(tree) == sorted(model)
+        assert all(tree.get(key) == value for key, value in model.items())
+        assert not any(tree.search(key) for key in range(1500, 1510))
+    with pytest.raises(ValueError):
+        cls(1)
+
+
+# ----------------------------------------------------------------------
+# ---- RANGES AND CURSORS ----
+# ----------------------------------------------------------------------
+def random_tree(kind, rng, n=300, **options):
+    tree = tree_loader.make_tree(kind, **options)
+    keys = rng.sample(range(0, 10 * n, 2), n)
+    for key in keys:
+        tree.insert(key, -key)
+    return tree, sorted(keys)
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_range_matches_a_sorted_list(kind):
+    rng = random.Random(7)
+    tree, keys = random_tree(kind, rng)
+    bounds = [None, -1, 0, 1, 301, 302, keys[-1], keys[-1] + 1] + rng.sample(range(3000), 20)
+    for lo in bounds:
+        for hi in bounds:
+            expected = [key for key in keys if (lo is None or lo <= key) and (hi is None or key < hi)]
+            assert list(tree.range(lo, hi)) == expected
+            assert list(tree.range(lo, hi, reverse=True)) == expected[::-1]
+    assert list(tree.items(100, 120)) == [(key, -key) for key in keys if 100 <= key < 120]
+    assert list(tree) == list(tree.keys()) == keys
+    assert list(tree.values()) == [-key for key in keys]
+
+
+# A cursor sits between two keys; keep the index of the key after it and
+# check every move against the sorted list
+@pytest.mark.parametrize("kind", KINDS)
+def test_cursor_walks_like_an_index(kind):
+    rng = random.Random(77)
+    options = {"t": 3} if kind in ("btree", "bplus") else {}
+    tree, keys = random_tree(kind, rng, n=200, **options)
+    for items in (False, True):
+        cursor = tree.cursor(items)
+        entry = (lambda i: (keys[i], -keys[i])) if items else keys.__getitem__
+        pos = 0
+        for _ in range(2000):
+            move = rng.random()
+            if move < 0.05:
+                probe = rng.randrange(-5, 4005)
+                cursor.seek(probe)
+                pos = sum(key < probe for key in keys)
+            elif move < 0.07:
+                cursor.seek_first()
+                pos = 0
+            elif move < 0.09:
+                cursor.seek_end()
+                pos = len(keys)
+            elif move < 0.55:
+                if pos == len(keys):
+                    with pytest.raises(StopIteration):
+                        cursor.next()
+                else:
+                    assert cursor.next() == entry(pos)
+                    pos += 1
+            else:
+                if pos == 0:
+                    with pytest.raises(StopIteration):
+                        cursor.prev()
+                else:
+                    assert cursor.prev() == entry(pos - 1)
+                    pos -= 1
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_empty_tree_ranges(kind):
+    tree = tree_loader.make_tree(kind)
+    assert list(tree) == list(tree.range(1, 5, reverse=True)) == []
+    cursor = tree.cursor()
+    cursor.seek(3)
+    with pytest.raises(StopIteration):
+        cursor.next()
+    with pytest.raises(StopIteration):
+        cursor.prev()
+
+
+# ----------------------------------------------------------------------
+# ---- ORDER STATISTICS ----
+# ----------------------------------------------------------------------
+@pytest.mark.parametrize("kind", ["avl", "rb"])
+def test_rank_select_count(kind):
+    rng = random.Random(8)
+    tree, _ = random_tree(kind, rng)
+    for key in rng.sample(range(3000), 150):
+        tree.delete(key)
+    keys = check(tree)   # sizes are checked along with the rest
+    n = len(keys)
+    for i, key in enumerate(keys):
+        assert tree.select(i) == key
+        assert tree.select(i - n) == key
+        assert tree.rank(key) == i
+        assert tree.rank(key + 1) == i + 1
+    for bad in (n, -n - 1):
+        with pytest.raises(IndexError):
+            tree.select(bad)
+    bounds = [None, -1, 0, 1500, 1501, 6000] + rng.sample(range(3000), 10)
+    for lo in bounds:
+        for hi in bounds:
+            assert tree.count(lo, hi) == sum(
+                (lo is None or lo <= key) and (hi is None or key < hi) for key in keys)
+
+
+# ----------------------------------------------------------------------
+# ---- SORTED MAP ----
+# ----------------------------------------------------------------------
+# Every mapping call made on the tree and on a dict side by side
+@pytest.mark.parametrize("kind", KINDS)
+def test_mapping_api_matches_a_dict(kind):
+    rng = random.Random(9)
+    tree = tree_loader.make_tree(kind)
+    model = {}
+    missing = object()
+    for step in range(3000):
+        key = rng.randrange(250)
+        op = rng.randrange(8)
+        if op == 0:
+            tree[key] = model[key] = step
+        elif op == 1:
+            if key in model:
+                assert tree[key] == model[key]
+            else:
+                with pytest.raises(KeyError):
+                    tree[key]
+        elif op == 2:
+            if key in model:
+                del tree[key]
+                del model[key]
+            else:
+                with pytest.raises(KeyError):
+                    del tree[key]
+        elif op == 3:
+            assert tree.pop(key, missing) == model.pop(key, missing)
+        elif op == 4:
+            if key in model:
+                assert tree.pop(key) == model.pop(key)
+            else:
+                with pytest.raises(KeyError):
+                    tree.pop(key)
+        elif op == 5:
+            assert tree.setdefault(key, step) == model.setdefault(key, step)
+        elif op == 6:
+            batch = {rng.randrange(250): step for _ in range(3)}
+            pairs = list(batch.items()) if step % 2 else batch
+            tree.update(pairs)
+            model.update(batch)
+        else:
+            assert tree.get(key, missing) == model.get(key, missing)
+            assert (key in tree) == (key in model)
+        assert len(tree) == len(model)
+    assert check(tree) == sorted(model)
+    assert list(tree.items()) == sorted(model.items())
+
+
+# ----------------------------------------------------------------------
+# ---- BATCHES ----
+# ----------------------------------------------------------------------
+# Small batches go key by key, large ones rebuild the tree from a merge
+# (see rebuild_fraction); both must give what one call per key would
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("batch_size, rebuilds", [(10, False), (300, True)])
+def test_batch_updates(kind, batch_size, rebuilds):
+    rng = random.Random(batch_size)
+    tree = tree_loader.make_tree(kind)
+    model = {}
+    loads = []
+    load_sorted = tree._load_sorted
+
+    def counted_load(*args):
+        loads.append(1)
+        load_sorted(*args)
+    tree._load_sorted = counted_load
+
+    tree.insert_many(range(0, 1200, 3), range(400))
+    model.update(zip(range(0, 1200, 3), range(400)))
+    assert check(tree) == sorted(model)
+    for round_ in range(4):
+        del loads[:]
+        # Repeated keys and keys already there: the last value wins
+        keys = [rng.randrange(1200) for _ in range(batch_size)]
+        values = [(round_, i) for i in range(batch_size)]
+        new = len(set(keys) - set(model))
+        assert tree.insert_many(keys, values) == new
+        model.update(zip(keys, values))
+        assert check(tree) == sorted(model)
+        assert bool(loads) == (rebuilds and batch_size >= tree.rebuild_fraction * (len(model) - new))
+
+        del loads[:]
+        gone = [rng.randrange(1200) for _ in range(batch_size)]
+        present = set(gone) & set(model)
+        assert tree.delete_many(gone) == len(present)
+        for key in present:
+            del model[key]
+        assert check(tree) == sorted(model)
+        assert bool(loads) == (rebuilds and batch_size >= tree.rebuild_fraction * (len(model) + len(present)))
+
+        probes = [rng.randrange(-10, 1210) for _ in range(batch_size)] + keys[:5] * 2
+        assert tree.search_many(probes) == [key in model for key in probes]
+        assert tree.get_many(probes, "none") == [model.get(key, "none") for key in probes]
+    assert list(tree.items()) == sorted(model.items())
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_empty_batches(kind):
+    tree = tree_loader.make_tree(kind)
+    assert tree.insert_many([]) == 0
+    assert tree.delete_many([]) == 0
+    assert tree.search_many([]) == tree.get_many([]) == []
+    assert tree.insert_many([2, 1]) == 2
+    assert tree.delete_many([]) == 0 and list(tree) == [1, 2]
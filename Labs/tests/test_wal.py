@@ -0,0 +1,188 @@
+import os
+
+import pytest
+
+import tree_loader
+import wal
+from wal import DurableTree
+
+avl = tree_loader.load("avl")
+
+
+def open_tree(directory, **options):
+    return DurableTree(avl.AVLTree(), str(directory), **options)
+
+
+# Make the records so far durable and drop the tree without a clean close,
+# as a crash would
+def crash(tree):
+    tree.sync()
+    tree.log.close()
+
+
+def log_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".log"))
+
+
+# Byte offset of record number n (0-based) in a log file
+def record_start(path, n):
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    for _ in range(n):
+        length, _ = wal.RECORD.unpack_from(data, pos)
+        pos += wal.RECORD.size + length
+    return pos
+
+
+def test_recovers_every_synced_record(tmp_path):
+    tree = open_tree(tmp_path, group_size=1000)
+    for key in range(100):
+        tree.insert(key, str(key))
+    tree.delete(5)
+    tree.insert_many([200, 201], ["a", "b"])
+    tree.delete_many([0, 1, 2])
+    crash(tree)
+
+    expected = {key: str(key) for key in range(3, 100) if key != 5}
+    expected.update({200: "a", 201: "b"})
+    with open_tree(tmp_path) as tree:
+        assert dict(tree.items()) == expected
+
+
+def test_updates_return_what_the_tree_returns(tmp_path):
+    with open_tree(tmp_path) as tree:
+        assert tree.insert(1, "a") is True
+        assert tree.insert(1, "b") is False
+        assert tree.delete(2) is False
+        assert tree.delete(1) is True
+        assert tree.insert_many([1, 2, 3]) == 3
+        assert tree.insert_many([3, 4]) == 1
+        assert tree.delete_many([4, 5]) == 1
+
+
+def test_del_item(tmp_path):
+    with open_tree(tmp_path) as tree:
+        tree[5] = 1
+        del tree[5]
+        assert 5 not in tree
+        with pytest.raises(KeyError):
+            del tree[5]
+    with open_tree(tmp_path) as tree:
+        assert len(tree) == 0
+
+
+# Keep only 'kept' bytes of the last record: part of its header, the
+# header alone, or part of its payload (negative: all but that many bytes)
+@pytest.mark.parametrize("kept", [2, 8, 9, -1])
+def test_record_cut_short_ends_the_log(tmp_path, kept):
+    tree = open_tree(tmp_path)
+    for key in range(10):
+        tree.insert(key, key)
+    crash(tree)
+    path = tmp_path / log_files(tmp_path)[-1]
+    start = record_start(path, 9)
+    with open(path, "r+b") as f:
+        f.truncate(start + kept if kept >= 0 else path.stat().st_size + kept)
+    records, good = wal.read_log(path)
+    assert len(records) == 9 and good == start
+
+    with open_tree(tmp_path) as tree:
+        assert list(tree) == list(range(9))
+        # The torn record was cut off, so new records follow the last good one
+        assert path.stat().st_size == good
+        tree.insert(50, 50)
+    with open_tree(tmp_path) as tree:
+        assert list(tree) == list(range(9)) + [50]
+
+
+def test_bad_checksum_ends_the_log(tmp_path):
+    tree = open_tree(tmp_path)
+    for key in range(10):
+        tree.insert(key, key)
+    crash(tree)
+    path = tmp_path / log_files(tmp_path)[-1]
+    # Flip a byte in the payload of the seventh record: it and everything
+    # after it are dropped
+    pos = record_start(path, 6)
+    with open(path, "r+b") as f:
+        f.seek(pos + wal.RECORD.size)
+        byte = f.read(1)[0]
+        f.seek(pos + wal.RECORD.size)
+        f.write(bytes([byte ^ 0xFF]))
+
+    records, good = wal.read_log(path)
+    assert len(records) == 6 and good == pos
+    with open_tree(tmp_path) as tree:
+        assert list(tree) == list(range(6))
+        assert path.stat().st_size == pos
+
+
+def test_replay_after_checkpoint(tmp_path):
+    tree = open_tree(tmp_path, group_size=1, checkpoint_every=25)
+    for key in range(60):
+        tree.insert(key, key * 2)
+    tree.delete(3)
+    crash(tree)
+
+    # Two checkpoints were taken; only the log written since the last one is left
+    assert os.path.exists(tmp_path / wal.CHECKPOINT)
+    assert log_files(tmp_path) == ["wal-2.log"]
+    records, _ = wal.read_log(tmp_path / "wal-2.log")
+    assert len(records) == 11
+
+    expected = {key: key * 2 for key in range(60) if key != 3}
+    with open_tree(tmp_path, checkpoint_every=25) as tree:
+        assert dict(tree.items()) == expected
+        assert tree.logged == 11
+        tree.insert(100, 0)
+    with open_tree(tmp_path) as tree:
+        expected[100] = 0
+        assert dict(tree.items()) == expected
+
+
+def test_log_left_over_from_before_the_checkpoint_is_ignored(tmp_path):
+    tree = open_tree(tmp_path, checkpoint_every=1000)
+    for key in range(10):
+        tree.insert(key, key)
+    crash(tree)
+    with open(tmp_path / "wal-0.log", "rb") as f:
+        old_log = f.read()
+
+    tree = open_tree(tmp_path)
+    tree.delete(0)
+    tree.checkpoint()
+    crash(tree)
+    # A crash between the checkpoint rename and removing the old log
+    # leaves the old log behind: it must not be replayed again
+    with open(tmp_path / "wal-0.log", "wb") as f:
+        f.write(old_log)
+
+    with open_tree(tmp_path) as tree:
+        assert list(tree) == list(range(1, 10))
+    assert "wal-0.log" not in log_files(tmp_path)
+
+
+def test_checkpoint_is_replaced_atomically(tmp_path, monkeypatch):
+    tree = open_tree(tmp_path)
+    tree.insert_many(range(10))
+    tree.checkpoint()
+    tree.insert(10)
+    tree.sync()
+
+    # A crash just before the rename: the new checkpoint only exists as
+    # the temporary file, and the old checkpoint and logs still hold
+    # everything
+    def crash_before_rename(src, dst):
+        raise OSError("crash")
+    monkeypatch.setattr(wal.os, "replace", crash_before_rename)
+    with pytest.raises(OSError):
+        tree.checkpoint()
+    monkeypatch.undo()
+    assert os.path.exists(tmp_path / (wal.CHECKPOINT + ".tmp"))
+
+    # A torn temporary file is never read either
+    with open(tmp_path / (wal.CHECKPOINT + ".tmp"), "r+b") as f:
+        f.truncate(10)
+    with open_tree(tmp_path) as tree:
+        assert list(tree) == list(range(11))
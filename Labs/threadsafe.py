@@ -0,0 +1,432 @@
+# Sharing trees between threads
+#   RWLock         a readers-writer lock: many readers or one writer
+#   LockedTree     wraps any tree object (BST, AVL, Red-Black, ...) behind
+#                  one RWLock, so lookups run side by side and an update
+#                  waits for them to finish
+#   ConcurrentBTree
+#                  a B-Tree with one latch (an RWLock) per node and top-down
+#                  latch crabbing: an operation holds the latch of the node
+#                  it is in and of the child it moves to, and lets go of the
+#                  parent as soon as the child is safe. insert splits full
+#                  children and delete fills thin ones on the way down
+#                  (see insert_non_full and fill in B-tree.py), so nothing
+#                  ever has to travel back up and a parent is always safe to
+#                  release once the step below it is done.
+# Range scans (range, items, iteration, save) copy their result while they
+# hold the lock, so they see one consistent state. A cursor takes no locks:
+# LockedTree does not offer one, and ConcurrentBTree.cursor() is only safe
+# while no other thread is updating the tree.
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import tree_loader
+from ordered import MISSING, OrderedMixin, sort_batch
+from snapshot import read_snapshot
+
+btree = tree_loader.load("btree")
+
+
+class RWLock:
+    """A readers-writer lock. A waiting writer keeps new readers out, so a
+    steady stream of lookups cannot starve updates."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+# ----------------------------------------------------------------------
+# ---- ONE LOCK PER TREE ----
+# ----------------------------------------------------------------------
+class LockedTree(OrderedMixin):
+    """A tree object guarded by a readers-writer lock. Every call takes the
+    lock once, so pop, setdefault and update are atomic as well."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.lock = RWLock()
+
+    # ---- Reads ----
+
+    def get(self, key, default=None):
+        with self.lock.read_locked():
+            return self.tree.get(key, default)
+
+    def search(self, key):
+        with self.lock.read_locked():
+            return key in self.tree
+
+    def __contains__(self, key):
+        return self.search(key)
+
+    def __len__(self):
+        with self.lock.read_locked():
+            return len(self.tree)
+
+    def _lookup_many(self, keys):
+        with self.lock.read_locked():
+            return self.tree._lookup_many(keys)
+
+    def rank(self, key):
+        with self.lock.read_locked():
+            return self.tree.rank(key)
+
+    def select(self, i):
+        with self.lock.read_locked():
+            return self.tree.select(i)
+
+    def count(self, lo=None, hi=None):
+        with self.lock.read_locked():
+            return self.tree.count(lo, hi)
+
+    def _walk(self, lo, hi, reverse, items):
+        with self.lock.read_locked():
+            return iter(list(self.tree._walk(lo, hi, reverse, items)))
+
+    def __iter__(self):
+        return self._walk(None, None, False, False)
+
+    def cursor(self, items=False):
+        raise TypeError("cursors cannot be shared between threads; use range() or items()")
+
+    # ---- Updates ----
+
+    def insert(self, key, value=None):
+        with self.lock.write_locked():
+            return self.tree.insert(key, value)
+
+    def delete(self, key):
+        with self.lock.write_locked():
+            return self.tree.delete(key)
+
+    def insert_many(self, keys, values=None):
+        with self.lock.write_locked():
+            return self.tree.insert_many(keys, values)
+
+    def delete_many(self, keys):
+        with self.lock.write_locked():
+            return self.tree.delete_many(keys)
+
+    def pop(self, key, default=MISSING):
+        with self.lock.write_locked():
+            return self.tree.pop(key, default)
+
+    def setdefault(self, key, default=None):
+        with self.lock.write_locked():
+            return self.tree.setdefault(key, default)
+
+    def update(self, other=()):
+        with self.lock.write_locked():
+            self.tree.update(other)
+
+    def _load_sorted(self, keys, values):
+        with self.lock.write_locked():
+            self.tree._load_sorted(keys, values)
+
+    # The snapshot does not say what was wrapped: pass that tree in
+    @classmethod
+    def load(cls, path, tree):
+        """Fill 'tree' (a new, empty tree) from a snapshot written by save()
+        and wrap it"""
+        with open(path, "rb") as f:
+            keys, values, _ = read_snapshot(f)
+        tree._load_sorted(keys, values)
+        return cls(tree)
+
+
+# ----------------------------------------------------------------------
+# ---- LATCH CRABBING B-TREE ----
+# ----------------------------------------------------------------------
+class ConcurrentBTree(btree.BTree):
+    """A B-Tree that any number of threads may search and update at once.
+
+    Latches are always taken top-down (and left to right among siblings),
+    and an operation never waits for a node above one it holds, so two
+    operations can never wait on each other in a cycle."""
+
+    def __init__(self, t=btree.T_VALUE):
+        # Guards self.root: held until the root is known not to change
+        self.root_latch = RWLock()
+        # Updates share it, range scans take it alone
+        self.scan_gate = RWLock()
+        self.size_lock = threading.Lock()
+        super().__init__(t)
+
+    def _new_node(self, is_leaf):
+        node = super()._new_node(is_leaf)
+        node['latch'] = RWLock()
+        return node
+
+    def _add_size(self, delta):
+        with self.size_lock:
+            self.size += delta
+
+    # Latch the root of the tree, holding root_latch while we do
+    def _latch_root(self, write):
+        self.root_latch.acquire_write() if write else self.root_latch.acquire_read()
+        node = self.root
+        node['latch'].acquire_write() if write else node['latch'].acquire_read()
+        return node
+
+    # ----------------------------------------------------------------------
+    # ---- SEARCH ----
+    # ----------------------------------------------------------------------
+    def get(self, key, default=None):
+        node = self._latch_root(write=False)
+        self.root_latch.release_read()
+        while True:
+            keys = node['keys']
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                value = node['values'][i]
+                node['latch'].release_read()
+                return value
+            if node['leaf']:
+                node['latch'].release_read()
+                return default
+            child = node['children'][i]
+            child['latch'].acquire_read()
+            node['latch'].release_read()
+            node = child
+
+    def search(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def find(self, key):
+        raise TypeError("find() hands out a node without its latch; use get()")
+
+    def _lookup_many(self, keys):
+        get = self.get
+        return [get(key, MISSING) for key in keys]
+
+    # ----------------------------------------------------------------------
+    # ---- INSERT ----
+    # ----------------------------------------------------------------------
+    def insert(self, key, value=None):
+        with self.scan_gate.read_locked():
+            root = self._latch_root(write=True)
+            try:
+                if len(root['keys']) == 2 * self.t - 1:
+                    # Split the root under a new one (nobody else can see
+                    # the new root or the new sibling yet)
+                    new_root = self._new_node(is_leaf=False)
+                    new_root['latch'].acquire_write()
+                    new_root['children'].insert(0, root)
+                    self.split_child(new_root, 0, root)
+                    self.root = new_root
+                    root['latch'].release_write()
+                    root = new_root
+            finally:
+                # The root is not full now, so this insert will not replace it
+                self.root_latch.release_write()
+            added = self._insert_latched(root, key, value)
+        if added:
+            self._add_size(1)
+        return added
+
+    # insert_non_full() with latches: 'node' is latched and not full, and
+    # each full child is split while both it and its parent are held
+    def _insert_latched(self, node, key, value):
+        full = 2 * self.t - 1
+        while True:
+            keys = node['keys']
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                node['values'][i] = value
+                node['latch'].release_write()
+                return False
+            if node['leaf']:
+                keys.insert(i, key)
+                node['values'].insert(i, value)
+                node['latch'].release_write()
+                return True
+
+            child = node['children'][i]
+            child['latch'].acquire_write()
+            if len(child['keys']) == full:
+                self.split_child(node, i, child)
+                if key > keys[i]:
+                    sibling = node['children'][i + 1]
+                    sibling['latch'].acquire_write()
+                    child['latch'].release_write()
+                    child = sibling
+                elif key == keys[i]:
+                    node['values'][i] = value
+                    child['latch'].release_write()
+                    node['latch'].release_write()
+                    return False
+            node['latch'].release_write()
+            node = child
+
+    # ----------------------------------------------------------------------
+    # ---- DELETE ----
+    # ----------------------------------------------------------------------
+    def delete(self, key):
+        with self.scan_gate.read_locked():
+            root = self._latch_root(write=True)
+            # A root with two or more keys keeps at least one whatever this
+            # delete does to it, so it stays the root
+            if root['leaf'] or len(root['keys']) >= 2:
+                self.root_latch.release_write()
+                root_held = False
+            else:
+                root_held = True
+            removed = self._delete_latched(root, key, root_held)
+        if removed:
+            self._add_size(-1)
+        return removed
+
+    # _delete() with latches, one level per pass. 'node' is latched and
+    # (unless it is the root) has at least t keys. Each pass latches the
+    # children it may touch (children[idx] and its neighbours, for fill()
+    # and merge()), does the same step as _delete(), and moves down.
+    def _delete_latched(self, node, key, root_held):
+        t = self.t
+        while True:
+            keys = node['keys']
+            idx = bisect_left(keys, key)
+            found = idx < len(keys) and keys[idx] == key
+            if node['leaf']:
+                if found:
+                    keys.pop(idx)
+                    node['values'].pop(idx)
+                node['latch'].release_write()
+                if root_held:
+                    self.root_latch.release_write()
+                return found
+
+            children = node['children']
+            held = children[max(idx - 1, 0):idx + 2]
+            for child in held:
+                child['latch'].acquire_write()
+
+            if found:
+                if len(children[idx]['keys']) >= t:
+                    pred, pred_value = self._read_edge(children[idx], -1)
+                    keys[idx] = pred
+                    node['values'][idx] = pred_value
+                    key, nxt = pred, children[idx]
+                elif len(children[idx + 1]['keys']) >= t:
+                    succ, succ_value = self._read_edge(children[idx + 1], 0)
+                    keys[idx] = succ
+                    node['values'][idx] = succ_value
+                    key, nxt = succ, children[idx + 1]
+                else:
+                    self.merge(node, idx)
+                    nxt = children[idx]
+            else:
+                if len(children[idx]['keys']) < t:
+                    self.fill(node, idx)
+                if idx > len(keys):
+                    nxt = children[idx - 1]
+                elif idx < len(keys) and key > keys[idx]:
+                    nxt = children[idx + 1]
+                else:
+                    nxt = children[idx]
+
+            # Let go of everything but the child we move into. A sibling
+            # merged away is unreachable, and no one can be waiting for it:
+            # they would have to hold 'node' first.
+            for child in held:
+                if child is not nxt:
+                    child['latch'].release_write()
+            if root_held:
+                if not keys:
+                    self.root = nxt
+                    self._free(node)
+                self.root_latch.release_write()
+                root_held = False
+            node['latch'].release_write()
+            node = nxt
+
+    # The last (side=-1) or first (side=0) key and value under 'node', which
+    # the caller has latched. The walk below it crabs with read latches.
+    def _read_edge(self, node, side):
+        cur = node
+        while not cur['leaf']:
+            child = cur['children'][side]
+            child['latch'].acquire_read()
+            if cur is not node:
+                cur['latch'].release_read()
+            cur = child
+        entry = cur['keys'][side], cur['values'][side]
+        if cur is not node:
+            cur['latch'].release_read()
+        return entry
+
+    # ----------------------------------------------------------------------
+    # ---- WHOLE-TREE OPERATIONS ----
+    # ----------------------------------------------------------------------
+    # Batches go through insert()/delete() one key at a time (in key order),
+    # so other threads keep working between the keys
+    def insert_many(self, keys, values=None):
+        keys, values = sort_batch(keys, values)
+        insert = self.insert
+        return sum(insert(key, value) for key, value in zip(keys, values))
+
+    def delete_many(self, keys):
+        delete = self.delete
+        return sum(delete(key) for key in sorted(keys))
+
+    def _load_sorted(self, keys, values, fill_factor=1.0):
+        root = btree.build_from_sorted(keys, self.t, fill_factor, values)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node['latch'] = RWLock()
+            stack.extend(node['children'])
+        with self.scan_gate.write_locked(), self.root_latch.write_locked():
+            # Searches already inside the old tree finish there
+            self.root = root
+            self.size = self.count_keys(root)
+
+    def _walk(self, lo, hi, reverse, items):
+        with self.scan_gate.write_locked():
+            return iter(list(super()._walk(lo, hi, reverse, items)))
+
+    def __iter__(self):
+        return self._walk(None, None, False, False)
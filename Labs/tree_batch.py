@@ -0,0 +1,146 @@
+# Replay a file of tree operations without the interactive menus
+# The menus read one command at a time, and an insert takes the whole
+# line at once. tree_batch reads an operations file, or stdin, a chunk at
+# a time. Each chunk is applied as a batch and its results are written in
+# one go, so memory stays bounded however long the input is.
+#
+# Operations use the tree_server protocol, one per line:
+#   INSERT key [value] / SEARCH key / GET key / DELETE key / RANGE lo hi [limit] / LEN
+# and every result is the line the server would send back ("OK ..." or
+# "ERR ..."). Blank lines and lines starting with '#' are skipped.
+# With --ingest the input is just keys separated by any whitespace,
+# including one huge line, and they are all inserted.
+#
+# A summary with the throughput goes to stderr at the end.
+#
+# Usage: python tree_batch.py [--tree avl] [--degree T] [OPS_FILE | -]
+#                             [--output FILE | --no-results] [--chunk N]
+#                             [--ingest] [--load SNAPSHOT] [--save SNAPSHOT]
+import argparse
+import sys
+import time
+
+import tree_loader
+from tree_server import apply_requests, format_error, parse_key, parse_request, parse_word
+
+CHUNK = 65536           # operations (or keys) per batch
+BLOCK = 1 << 20         # characters read at a time with --ingest
+
+
+# Yield lists of at most 'chunk' request lines
+def read_requests(stream, chunk):
+    lines = []
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.upper() == "QUIT":
+            break
+        lines.append(line)
+        if len(lines) == chunk:
+            yield lines
+            lines = []
+    if lines:
+        yield lines
+
+# Yield the whitespace-separated words of the stream, a block at a time;
+# a word cut off at the end of a block is carried over to the next one
+def read_words(stream, block=BLOCK):
+    rest = ""
+    while True:
+        text = stream.read(block)
+        if not text:
+            break
+        words = (rest + text).split()
+        rest = words.pop() if words and not text[-1].isspace() else ""
+        yield words
+    if rest:
+        yield [rest]
+
+def replay(tree, stream, out, chunk=CHUNK):
+    """Apply every request in the stream; returns (operations, errors)"""
+    count = errors = 0
+    for lines in read_requests(stream, chunk):
+        requests = []
+        replies = [None] * len(lines)
+        for pos, line in enumerate(lines):
+            try:
+                requests.append((pos, parse_request(line)))
+            except ValueError as error:
+                replies[pos] = format_error(error)
+        for (pos, _), reply in zip(requests, apply_requests(tree, [request for _, request in requests])):
+            replies[pos] = reply
+        errors += sum(reply.startswith("ERR") for reply in replies)
+        count += len(lines)
+        if out is not None:
+            out.write("".join(replies))
+    return count, errors
+
+def ingest(tree, stream, chunk=CHUNK):
+    """Insert every key in the stream; returns (keys read, keys new)"""
+    count = added = 0
+    pending = []
+    for words in read_words(stream):
+        pending.extend(parse_key(parse_word(word)) for word in words)
+        while len(pending) >= chunk:
+            added += tree.insert_many(pending[:chunk])
+            count += chunk
+            del pending[:chunk]
+    added += tree.insert_many(pending)
+    count += len(pending)
+    return count, added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a file of operations to a lab tree")
+    parser.add_argument("ops", nargs="?", default="-", help="operations file, or - for stdin (default)")
+    parser.add_argument("--tree", choices=sorted(tree_loader.TREES), default="avl")
+    parser.add_argument("--degree", type=int, help="minimum degree t of the B-tree or B+ tree")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="operations per batch (default: %(default)s)")
+    parser.add_argument("--output", help="write the results here instead of stdout")
+    parser.add_argument("--no-results", action="store_true", help="do not write the results")
+    parser.add_argument("--ingest", action="store_true", help="the input is keys to insert, not operations")
+    parser.add_argument("--load", metavar="SNAPSHOT", help="start from this snapshot instead of an empty tree")
+    parser.add_argument("--save", metavar="SNAPSHOT", help="save the tree here at the end")
+    args = parser.parse_args(argv)
+    if args.chunk < 1:
+        parser.error("--chunk must be at least 1")
+
+    options = {"t": args.degree} if args.tree in ("btree", "bplus") and args.degree else {}
+    if args.load:
+        tree = tree_loader.tree_class(args.tree).load(args.load)
+    else:
+        tree = tree_loader.make_tree(args.tree, **options)
+
+    stream = sys.stdin if args.ops == "-" else open(args.ops)
+    out = None
+    if not args.no_results and not args.ingest:
+        out = sys.stdout if args.output is None else open(args.output, "w")
+    start = time.perf_counter()
+    try:
+        if args.ingest:
+            try:
+                count, added = ingest(tree, stream, args.chunk)
+            except (TypeError, ValueError) as error:
+                parser.exit(1, f"{parser.prog}: bad key in the input: {error}\n")
+            detail = f"{added:,} new"
+        else:
+            count, errors = replay(tree, stream, out, args.chunk)
+            detail = f"{errors:,} errors"
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not None and out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - start
+
+    if args.save:
+        tree.save(args.save)
+    rate = count / seconds if seconds else 0
+    print(f"{count:,} {'keys' if args.ingest else 'operations'} in {seconds:.3f} s "
+          f"({rate:,.0f}/s), {detail}; the {args.tree} tree holds {len(tree):,} keys",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Loader for the lab modules
+# Some lab files ("Red-Black Tree.py", "B-tree.py") have names that cannot
+# appear in an import statement, so other scripts load them through here.
+import importlib
+import importlib.util
+import os
+import sys
+
+LAB_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# short name -> (module name, file name)
+MODULES = {
+    "bst": ("bst", "bst.py"),
+    "avl": ("avl", "avl.py"),
+    "rb": ("red_black_tree", "Red-Black Tree.py"),
+    "btree": ("b_tree", "B-tree.py"),
+    "bt": ("bt", "bt.py"),
+}
+
+# tree type -> (short module name, class name), for make_tree()
+TREES = {
+    "bst": ("bst", "BinarySearchTree"),
+    "avl": ("avl", "AVLTree"),
+    "rb": ("rb", "RedBlackTree"),
+    "btree": ("btree", "BTree"),
+    "bplus": ("btree", "BPlusTree"),
+}
+
+
+def load(name):
+    """Return the lab module registered under the short name 'name'"""
+    module_name, file_name = MODULES[name]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    if LAB_DIR not in sys.path:
+        sys.path.insert(0, LAB_DIR)
+    if module_name + ".py" == file_name:
+        return importlib.import_module(module_name)
+
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(LAB_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
+
+
+def tree_class(kind):
+    """Return the tree class registered under 'kind' (see TREES)"""
+    module_name, class_name = TREES[kind]
+    return getattr(load(module_name), class_name)
+
+
+def make_tree(kind, **options):
+    """Return a new, empty tree object of the type named 'kind' (see TREES);
+    options go to its constructor (for example t= for the B-tree)"""
+    return tree_class(kind)(**options)
@@ -0,0 +1,322 @@
+# Network service for the lab trees
+# The menus in the tree modules serve one person, one line at a time.
+# tree_server runs one tree behind an asyncio server, so that many clients
+# can use it at once over TCP or a Unix socket.
+#
+# Protocol: one request per line, one reply per line, in the same order.
+# Clients may send many requests without waiting for the replies
+# (pipelining).
+#   INSERT key [value]   -> OK true / OK false     (true if the key was new)
+#   SEARCH key           -> OK true / OK false
+#   GET key              -> OK value               (null if absent)
+#   DELETE key           -> OK true / OK false     (true if it was present)
+#   RANGE lo hi [limit]  -> OK [[key, value], ...] (lo <= key < hi; null = open;
+#                                                  at most RANGE_LIMIT items
+#                                                  unless a limit is given, and
+#                                                  never more than MAX_RANGE_LIMIT)
+#   LEN                  -> OK count
+#   PING                 -> OK "PONG"
+#   QUIT                 -> closes the connection
+# Keys and values are JSON (42, 2.5, "name"); a bare word is read as a
+# string. Keys must be numbers or strings. Errors come back as "ERR message".
+#
+# Requests from every connection go into one queue. A single task takes
+# everything waiting there and applies it as a batch: runs of reads,
+# inserts or deletes become one get_many/insert_many/delete_many call.
+# The tree is only ever touched by that task, so it needs no lock.
+#
+# Usage: python tree_server.py [--tree avl] [--host 127.0.0.1] [--port 7878]
+#                              [--unix PATH] [--degree T]
+import argparse
+import asyncio
+import json
+from itertools import islice
+
+import tree_loader
+from ordered import MISSING
+
+MAX_BATCH = 4096        # requests applied per batch
+MAX_PENDING = 1024      # unanswered requests per connection before we stop reading
+RANGE_LIMIT = 1000      # items in a RANGE reply when the request sets no limit
+MAX_RANGE_LIMIT = 100_000   # largest limit a RANGE request may set
+
+OPS = {"INSERT": (1, 2), "SEARCH": (1, 1), "GET": (1, 1), "DELETE": (1, 1),
+       "RANGE": (2, 3), "LEN": (0, 0), "PING": (0, 0)}
+
+
+# ----------------------------------------------------------------------
+# ---- PROTOCOL ----
+# ----------------------------------------------------------------------
+def parse_word(text):
+    """Read one word of a request: JSON if it parses, else a plain string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def parse_key(value):
+    """Return value if it can be a key; raises ValueError if not"""
+    if type(value) not in (int, float, str) or value != value:
+        raise ValueError(f"keys must be numbers or strings, not {json.dumps(value)}")
+    return value
+
+def parse_request(line):
+    """Split a request line into (op, args); raises ValueError if malformed"""
+    parts = line.split(None, 1)
+    if not parts:
+        raise ValueError("empty request")
+    op = parts[0].upper()
+    if op not in OPS:
+        raise ValueError(f"unknown command {parts[0]}")
+    rest = parts[1] if len(parts) > 1 else ""
+    least, most = OPS[op]
+
+    if op == "INSERT":
+        # The value is the rest of the line, so it may contain spaces
+        words = rest.split(None, 1)
+        args = [parse_word(word) for word in words]
+    else:
+        args = [parse_word(word) for word in rest.split()]
+    if not least <= len(args) <= most:
+        raise ValueError(f"{op} takes {least}" + (f" to {most}" if most > least else "")
+                         + " arguments")
+
+    if op == "RANGE":
+        for bound in args[:2]:
+            if bound is not None:
+                parse_key(bound)
+        if len(args) == 3 and (type(args[2]) is not int or not 0 <= args[2] <= MAX_RANGE_LIMIT):
+            raise ValueError(f"the RANGE limit must be a whole number up to {MAX_RANGE_LIMIT}")
+    elif args:
+        parse_key(args[0])
+    if op == "INSERT" and len(args) == 1:
+        args.append(None)
+    return op, args
+
+def format_reply(result):
+    return "OK " + json.dumps(result) + "\n"
+
+def format_error(error):
+    return "ERR " + (str(error) or type(error).__name__).replace("\n", " ") + "\n"
+
+
+# ----------------------------------------------------------------------
+# ---- SERVER ----
+# ----------------------------------------------------------------------
+# Put an item on a connection's reply queue, waiting for room unless the
+# sender stops first: then nothing will ever make room. Returns False if
+# the item was not queued.
+async def _put_reply(replies, item, sender):
+    if not replies.full():
+        replies.put_nowait(item)
+        return True
+    put = asyncio.ensure_future(replies.put(item))
+    try:
+        await asyncio.wait((put, sender), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        queued = put.done()
+        if not queued:
+            put.cancel()
+    return queued
+
+class TreeServer:
+    """Serves one tree (any object with the OrderedMixin interface) to
+    many clients; see the protocol above"""
+
+    def __init__(self, tree, max_batch=MAX_BATCH):
+        self.tree = tree
+        self.max_batch = max_batch
+        self.requests = None
+        self._batcher = None
+        self.batches = 0
+        self.applied = 0
+
+    async def serve(self, host="127.0.0.1", port=7878, unix=None):
+        """Run until cancelled"""
+        server = await self.start(host, port, unix)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.stop()
+
+    async def start(self, host="127.0.0.1", port=7878, unix=None):
+        """Start listening and return the asyncio server"""
+        self.requests = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._run_batches())
+        if unix is not None:
+            return await asyncio.start_unix_server(self._handle, path=unix)
+        return await asyncio.start_server(self._handle, host, port)
+
+    def stop(self):
+        """Stop applying requests (after the listening server is closed)"""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+
+    # ---- One connection ----
+    # The reader queues each request with a future for its reply; the
+    # writer sends the replies in request order as they are ready. If the
+    # writer stops early (the client went away), so does the reader.
+    async def _handle(self, reader, writer):
+        replies = asyncio.Queue(MAX_PENDING)
+        sender = asyncio.ensure_future(self._send_replies(replies, writer))
+        loop = asyncio.get_running_loop()
+        try:
+            while not sender.done():
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode("utf-8", "replace").strip()
+                if line.upper() == "QUIT":
+                    break
+                reply = loop.create_future()
+                try:
+                    op, args = parse_request(line)
+                except ValueError as error:
+                    reply.set_result(format_error(error))
+                else:
+                    self.requests.put_nowait((op, args, reply))
+                if not await _put_reply(replies, reply, sender):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            await _put_reply(replies, None, sender)
+            await sender
+
+    async def _send_replies(self, replies, writer):
+        try:
+            while True:
+                reply = await replies.get()
+                if reply is None:
+                    break
+                writer.write((await reply).encode())
+                # drain() also raises once the connection is lost
+                if replies.empty() or writer.is_closing():
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # ---- Batching ----
+    async def _run_batches(self):
+        while True:
+            batch = [await self.requests.get()]
+            # Let the other connections queue what they have already read
+            await asyncio.sleep(0)
+            while len(batch) < self.max_batch and not self.requests.empty():
+                batch.append(self.requests.get_nowait())
+            self.apply(batch)
+
+    def apply(self, batch):
+        """Apply a list of (op, args, reply future) in order, answering each"""
+        self.batches += 1
+        self.applied += len(batch)
+        replies = apply_requests(self.tree, [(op, args) for op, args, _ in batch])
+        for (_, _, reply), result in zip(batch, replies):
+            if not reply.done():
+                reply.set_result(result)
+
+
+# ----------------------------------------------------------------------
+# ---- APPLYING REQUESTS ----
+# ----------------------------------------------------------------------
+# Shorter runs are applied key by key: a batched call has a fixed cost
+MIN_RUN = 16
+
+# Which batched call a request joins
+_GROUPS = {"SEARCH": "read", "GET": "read", "INSERT": "insert", "DELETE": "delete"}
+
+def apply_requests(tree, requests):
+    """Apply parsed (op, args) requests to tree in order and return one
+    reply line per request. Runs of reads, inserts or deletes are applied
+    as one batched call each."""
+    replies = []
+    start = 0
+    while start < len(requests):
+        group = _GROUPS.get(requests[start][0])
+        end = start + 1
+        if group is not None:
+            while end < len(requests) and _GROUPS.get(requests[end][0]) == group:
+                end += 1
+        run = requests[start:end]
+        start = end
+        if group is not None and len(run) >= MIN_RUN:
+            # A value that cannot be sent back fails here too; only reads
+            # return values, so answering them again one at a time is safe
+            try:
+                formatted = [format_reply(result) for result in _apply_batch(tree, group, run)]
+            except Exception:
+                pass  # find the request at fault: answer the run one at a time
+            else:
+                replies.extend(formatted)
+                continue
+        for op, args in run:
+            try:
+                replies.append(format_reply(_apply_one(tree, op, args)))
+            except Exception as error:
+                replies.append(format_error(error))
+    return replies
+
+def _apply_batch(tree, group, run):
+    keys = [args[0] for _, args in run]
+    if group == "read":
+        found = tree._lookup_many(keys)
+        return [(value is not MISSING) if op == "SEARCH" else (None if value is MISSING else value)
+                for (op, _), value in zip(run, found)]
+    # A key is new (or deleted) if it was there before the run and this is
+    # its first insert (or delete) in the run
+    present = set(key for key, here in zip(keys, tree.search_many(keys)) if here)
+    results = []
+    if group == "insert":
+        for key in keys:
+            results.append(key not in present)
+            present.add(key)
+        tree.insert_many(keys, [args[1] for _, args in run])
+    else:
+        for key in keys:
+            results.append(key in present)
+            present.discard(key)
+        tree.delete_many(keys)
+    return results
+
+def _apply_one(tree, op, args):
+    if op == "SEARCH":
+        return tree.search(args[0])
+    if op == "GET":
+        return tree.get(args[0])
+    if op == "INSERT":
+        return tree.insert(args[0], args[1])
+    if op == "DELETE":
+        return tree.delete(args[0])
+    if op == "RANGE":
+        limit = args[2] if len(args) == 3 else RANGE_LIMIT
+        return [list(item) for item in islice(tree.items(args[0], args[1]), limit)]
+    if op == "LEN":
+        return len(tree)
+    return "PONG"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a lab tree over a line protocol")
+    parser.add_argument("--tree", choices=sorted(tree_loader.TREES), default="avl")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--degree", type=int, help="minimum degree t of the B-tree or B+ tree")
+    args = parser.parse_args(argv)
+
+    options = {"t": args.degree} if args.tree in ("btree", "bplus") and args.degree else {}
+    server = TreeServer(tree_loader.make_tree(args.tree, **options))
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Serving an empty {args.tree} tree on {where}")
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
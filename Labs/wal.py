@@ -0,0 +1,260 @@
+# Write-ahead log and checkpoints for the tree classes
+# DurableTree wraps any of the tree objects (BinarySearchTree, AVLTree,
+# RedBlackTree, BTree) and keeps it recoverable across restarts:
+#   - every insert/delete is appended to a log file
+#   - log records are fsync'ed in groups (group commit): one fsync per
+#     group_size records, or on sync()/close()
+#   - every checkpoint_every records the whole tree is written to a
+#     checkpoint file and a fresh log is started
+# On startup the checkpoint is bulk loaded (linear time) and only the log
+# written after it is replayed, so restart time depends on the log tail,
+# not on how many keys the tree holds.
+#
+# Files in the directory:
+#   checkpoint        a snapshot (see snapshot.py) of the tree as of some
+#                     log number N, written atomically
+#   wal-<n>.log       log records; logs with n >= N are replayed in order
+#
+# A log record is: payload length (uint32), crc32 of payload (uint32),
+# payload. A record cut short by a crash, or with a bad checksum, ends the
+# log; it is cut off there so new records follow the last good one.
+import os
+import pickle
+import struct
+import zlib
+
+from ordered import OrderedMixin
+from snapshot import read_snapshot, write_snapshot
+
+RECORD = struct.Struct("<II")
+
+# Record payloads: (op, argument)
+INSERT = "i"          # (key, value)
+DELETE = "d"          # key
+INSERT_MANY = "I"     # (keys, values)
+DELETE_MANY = "D"     # keys
+
+CHECKPOINT = "checkpoint"
+
+
+def _log_name(n):
+    return f"wal-{n}.log"
+
+
+def _fsync_dir(path):
+    # Makes a rename or a new file in 'path' itself durable (POSIX only)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_log(path):
+    """Return the records of the intact part of a log file, and the byte
+    offset where that part ends"""
+    with open(path, "rb") as f:
+        data = f.read()
+    records = []
+    pos = 0
+    while pos + RECORD.size <= len(data):
+        length, crc = RECORD.unpack_from(data, pos)
+        start = pos + RECORD.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append(pickle.loads(payload))
+        pos = start + length
+    return records, pos
+
+
+class DurableTree(OrderedMixin):
+    """A tree object backed by a write-ahead log in 'directory'.
+
+    'tree' should be a new, empty tree; it is filled with the recovered
+    state. Reads go straight to the tree. Changes are durable once the
+    group they belong to is fsync'ed (see sync())."""
+
+    def __init__(self, tree, directory, group_size=64, checkpoint_every=100_000):
+        self.tree = tree
+        self.directory = directory
+        self.group_size = group_size
+        self.checkpoint_every = checkpoint_every
+        os.makedirs(directory, exist_ok=True)
+
+        self.pending = 0       # records written since the last fsync
+        self.logged = 0        # records in the current log
+        self.log_number = self._recover()
+        self.log = open(self._path(_log_name(self.log_number)), "ab")
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    # ----------------------------------------------------------------------
+    # ---- RECOVERY ----
+    # ----------------------------------------------------------------------
+    # Load the checkpoint, replay the logs written after it, and return the
+    # number of the log to append to
+    def _recover(self):
+        first = 0
+        checkpoint = self._path(CHECKPOINT)
+        if os.path.exists(checkpoint):
+            with open(checkpoint, "rb") as f:
+                keys, values, meta = read_snapshot(f)
+            first = meta["log"]
+            self.tree._load_sorted(keys, values)
+
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith("wal-") and name.endswith(".log"):
+                number = int(name[4:-4])
+                if number < first:
+                    # Already covered by the checkpoint
+                    os.remove(self._path(name))
+                else:
+                    numbers.append(number)
+        numbers.sort()
+
+        for number in numbers:
+            path = self._path(_log_name(number))
+            records, good = read_log(path)
+            for record in records:
+                self._apply(record)
+            self.logged = len(records)
+            if good < os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+        return numbers[-1] if numbers else first
+
+    # Apply one record to the tree and return what the tree call returned
+    def _apply(self, record):
+        op, arg = record
+        tree = self.tree
+        if op == INSERT:
+            return tree.insert(*arg)
+        if op == DELETE:
+            return tree.delete(arg)
+        if op == INSERT_MANY:
+            return tree.insert_many(*arg)
+        if op == DELETE_MANY:
+            return tree.delete_many(arg)
+        raise ValueError(f"unknown log record {op!r}")
+
+    # ----------------------------------------------------------------------
+    # ---- LOGGING ----
+    # ----------------------------------------------------------------------
+    # Apply a change to the tree and append its record. The tree is changed
+    # first so that a change it rejects (say, a key that does not compare
+    # with the others) never reaches the log; nothing counts as durable
+    # before the next fsync either way.
+    def _log(self, op, arg):
+        result = self._apply((op, arg))
+        payload = pickle.dumps((op, arg), pickle.HIGHEST_PROTOCOL)
+        self.log.write(RECORD.pack(len(payload), zlib.crc32(payload)))
+        self.log.write(payload)
+        self.pending += 1
+        self.logged += 1
+        if self.pending >= self.group_size:
+            self.sync()
+        if self.logged >= self.checkpoint_every:
+            self.checkpoint()
+        return result
+
+    def sync(self):
+        """Make every change so far durable (one fsync for the whole group)"""
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        self.pending = 0
+
+    def checkpoint(self):
+        """Write the whole tree to the checkpoint file and start a new log"""
+        self.sync()
+        self.log.close()
+        self.log_number += 1
+
+        keys = []
+        values = []
+        for key, value in self.tree.items():
+            keys.append(key)
+            values.append(value)
+        # Write a temporary file and rename it over the old checkpoint, so a
+        # crash leaves either the old or the new one, never half of one
+        temp = self._path(CHECKPOINT + ".tmp")
+        with open(temp, "wb") as f:
+            write_snapshot(f, keys, values, {"log": self.log_number})
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self._path(CHECKPOINT))
+        _fsync_dir(self.directory)
+
+        self.log = open(self._path(_log_name(self.log_number)), "ab")
+        self.logged = 0
+        os.remove(self._path(_log_name(self.log_number - 1)))
+
+    def close(self):
+        if not self.log.closed:
+            self.sync()
+            self.log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----------------------------------------------------------------------
+    # ---- TREE INTERFACE ----
+    # ----------------------------------------------------------------------
+    def insert(self, key, value=None):
+        return self._log(INSERT, (key, value))
+
+    def delete(self, key):
+        return self._log(DELETE, key)
+
+    # A batch is one log record
+    def insert_many(self, keys, values=None):
+        keys = list(keys)
+        if values is not None:
+            values = list(values)
+        return self._log(INSERT_MANY, (keys, values))
+
+    def delete_many(self, keys):
+        return self._log(DELETE_MANY, list(keys))
+
+    def _load_sorted(self, keys, values):
+        raise TypeError("a DurableTree is only changed through insert/delete")
+
+    @classmethod
+    def load(cls, path, tree, directory, **options):
+        """Start a durable tree in 'directory', which must not hold one yet,
+        from a snapshot written by save(); 'tree' and the options are as
+        for DurableTree(). The snapshot becomes the first checkpoint."""
+        with open(path, "rb") as f:
+            keys, values, _ = read_snapshot(f)
+        durable = cls(tree, directory, **options)
+        if len(durable):
+            durable.close()
+            raise ValueError(f"{directory} already holds a tree")
+        tree._load_sorted(keys, values)
+        durable.checkpoint()
+        return durable
+
+    def get(self, key, default=None):
+        return self.tree.get(key, default)
+
+    def search(self, key):
+        return key in self.tree
+
+    def _lookup_many(self, keys):
+        return self.tree._lookup_many(keys)
+
+    def cursor(self, items=False):
+        return self.tree.cursor(items)
+
+    def __contains__(self, key):
+        return key in self.tree
+
+    def __len__(self):
+        return len(self.tree)